@@ -1 +1,4 @@
 from . import contacts_import  # noqa
+from . import ingest_benchmark  # noqa
+from . import email_idle  # noqa
+from . import macro_benchmark  # noqa
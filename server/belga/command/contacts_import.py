@@ -1,135 +1,395 @@
-import superdesk
 import json
+import time
+import hashlib
+import logging
 
+import superdesk
+from flask import current_app as app
+from pymongo import UpdateOne
 from superdesk import get_resource_service
-import logging
+from superdesk.notification import push_notification
+from superdesk.utc import utcnow
 
 logger = logging.getLogger(__name__)
 
+# number of contacts inserted at once
+BATCH_SIZE = 500
+
+# characters read from the file at once
+CHUNK_SIZE = 64 * 1024
+
+# contact field with hash of the belga contact data, used to detect changes on sync
+HASH_FIELD = 'original_hash'
+
+# contact field set when the contact was deactivated by sync, only such contacts are activated again
+DEACTIVATED_FIELD = 'original_deactivated'
+
+# fields set by get_contact_doc, missing fields are cleared on sync
+CONTACT_FIELDS = (
+    'schema', 'organisation', 'first_name', 'last_name', 'job_title', 'mobile', 'contact_phone', 'fax',
+    'contact_email', 'twitter', 'twitter_personal', 'facebook', 'facebook_personal', 'website',
+    'contact_address', 'notes', 'keywords', 'original_id',
+)
+
+# list fields of contact schema, other fields missing in contact doc are cleared using empty string
+LIST_FIELDS = ('mobile', 'contact_phone', 'contact_email', 'contact_address')
+
+EMAIL_FIELDS = ('email', 'personalEmail')
+PHONE_FIELDS = ('directPhone1', 'directPhone2', 'phoneGeneral', 'personalPhone')
+
+
+def iter_json_array(json_file, chunk_size=CHUNK_SIZE):
+    """Iterate over items of json array in file without loading the whole file.
+
+    :param json_file: text file containing json array
+    :param chunk_size: characters read at once
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # skip whitespace and separators
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ',' or (
+                not started and buffer[pos] == '[')):
+            started = started or buffer[pos] == '['
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        if pos < len(buffer) and started:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # item might continue in next chunk (eg. a number)
+                if end < len(buffer) or eof:
+                    yield item
+                    pos = end
+                    continue
+        elif pos < len(buffer):
+            raise ValueError('json array expected')
+        elif eof:
+            if started:
+                raise ValueError('unterminated json array')
+            return
+        chunk = json_file.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+class DuplicateIndex:
+    """Index of contacts by name/organisation with their emails and phones.
+
+    Contact is duplicate if there is a contact with the same name (or organisation
+    if there is no name) having all emails and phones of the contact.
+    """
+
+    def __init__(self):
+        self._by_key = {}
+
+    def add(self, contact):
+        value = (
+            frozenset(contact.get('contact_email') or []),
+            frozenset(phone.get('number') for phone in contact.get('contact_phone') or []),
+        )
+        for key in self._get_keys(contact):
+            self._by_key.setdefault(key, []).append(value)
+
+    def is_duplicate(self, item):
+        if not item.get('firstName') and not item.get('lastName'):
+            key = ('organisation', item.get('company', ''))
+        else:
+            key = ('name', item.get('firstName', ''), item.get('lastName', ''))
+        emails = {item[field] for field in EMAIL_FIELDS if item.get(field)}
+        phones = {item[field] for field in PHONE_FIELDS if item.get(field)}
+        return any(
+            emails <= contact_emails and phones <= contact_phones
+            for contact_emails, contact_phones in self._by_key.get(key, [])
+        )
+
+    def _get_keys(self, contact):
+        return [
+            ('name', contact.get('first_name'), contact.get('last_name')),
+            ('organisation', contact.get('organisation')),
+        ]
+
+
+def get_duplicate_index(contact_service):
+    """Build duplicate index using single scan of existing contacts."""
+    index = DuplicateIndex()
+    for contact in contact_service.find({}):
+        index.add(contact)
+    return index
+
+
+def is_valid(item):
+    """Contact without name, company and email is not imported."""
+    return any(item.get(field) for field in ('email', 'personalEmail', 'firstName', 'lastName', 'company'))
+
+
+def get_contact_doc(item):
+    """Map belga contact to superdesk contact."""
+    doc = {}
+    # mapping data
+    doc.setdefault('schema', {}).update({"is_active": True,
+                                         "public": item.get("belgaPublic", True)
+                                         })
+    doc['organisation'] = item.get("company", "")
+    doc['first_name'] = item.get("firstName", "")
+    doc['last_name'] = item.get("lastName", "")
+    if item.get('function'):
+        doc['job_title'] = item.get("function")
+    if item.get('mobile247'):
+        doc.setdefault('mobile', []).append({'number': item.get('mobile247'),
+                                             'usage': 'Business',
+                                             'public': True
+                                             })
+    if item.get('personalMobile'):
+        doc.setdefault('mobile', []).append({'number': item.get('personalMobile'),
+                                             'usage': 'Confidential',
+                                             'public': True
+                                             })
+    if item.get('phoneGeneral'):
+        doc.setdefault('contact_phone', []).append({'number': item.get('phoneGeneral'),
+                                                    'usage': 'Business',
+                                                    'public': True
+                                                    })
+    if item.get('directPhone1'):
+        doc.setdefault('contact_phone', []).append({'number': item.get('directPhone1'),
+                                                    'usage': 'Business',
+                                                    'public': True
+                                                    })
+    if item.get('directPhone2'):
+        doc.setdefault('contact_phone', []).append({'number': item.get('directPhone2'),
+                                                    'usage': 'Business',
+                                                    'public': True
+                                                    })
+    if item.get('personalPhone'):
+        doc.setdefault('contact_phone', []).append({'number': item.get('personalPhone'),
+                                                    'usage': 'Confidential',
+                                                    'public': True
+                                                    })
+    doc['fax'] = ''
+    if item.get('email'):
+        doc.setdefault('contact_email', []).append(item.get('email'))
+    if item.get('personalEmail'):
+        doc.setdefault('contact_email', []).append(item.get('personalEmail'))
+    if item.get('twitter'):
+        doc['twitter'] = item.get('twitter')
+    if item.get('personalTwitter'):
+        doc['twitter_personal'] = item.get('personalTwitter')
+    if item.get('facebook'):
+        doc['facebook'] = item.get('facebook')
+    if item.get('personalFacebook'):
+        doc['facebook_personal'] = item.get('personalFacebook')
+    if item.get('url'):
+        doc['website'] = item.get('url')
+    if item.get('professionalAddress'):
+        doc.setdefault('contact_address', []).append(item.get('professionalAddress'))
+    if item.get('professionalAddress'):
+        doc.setdefault('contact_address', []).append(item.get('personalAddress'))
+    if item.get('Comment1'):
+        doc['notes'] = item.get('Comment1', '')
+    if item.get('keywords'):
+        doc['keywords'] = item.get('keywords')
+    # use original_id check and sync the contact from the belga.
+    doc['original_id'] = str(item.get('contactId'))
+    return doc
 
-def import_contacts_via_json_file(path_file):
+
+def import_contacts_via_json_file(path_file, batch_size=BATCH_SIZE):
     """
     Get info contacts in file and add to database
-    :param path_file:
-    :param unit_test:
-    :return:
+
+    Contacts are read from the file one by one and inserted in batches,
+    so memory used doesn't depend on the file size.
+
+    :param path_file: path of json file with contacts
+    :param batch_size: number of contacts inserted at once
+    :return: number of imported contacts
     """
+    contact_service = get_resource_service('contacts')
+    index = get_duplicate_index(contact_service)
+    started = time.monotonic()
+    count_items = 0
+    count_import = 0
+    batch = []
+
+    def insert(batch):
+        contact_service.post(batch)
+        elapsed = time.monotonic() - started
+        logger.info("processed %d items, imported %d items, %.1f items/sec" % (
+            count_items, count_import, count_items / elapsed if elapsed else 0))
+
     with open(path_file, 'rt', encoding='utf-8') as contacts_data:
-        json_data = json.load(contacts_data)
-        contact_service = get_resource_service('contacts')
-        docs = []
-        count_items = len(json_data)
-        count_import = 0
-        for item in json_data:
-
-            # Validate data contacts
-            # contact is not name and email, not import
-            if not item.get('email') and not item.get('personalEmail') and not item.get('firstName') and not item.get(
-                    'lastName') and not item.get('company'):
+        for item in iter_json_array(contacts_data):
+            count_items += 1
+            if not is_valid(item):
                 logger.info("contact (id:%s) is not name, company and email, not import." % str(item.get('contactId')))
                 continue
-            else:
-                # contact same name, email, phone, not import
-                query = {'first_name': item.get('firstName', ''), "last_name": item.get('lastName', '')}
-                # if first and last name is empty, check company
-                if not item.get('firstName') and not item.get('lastName'):
-                    query = ({'organisation': item.get('company', '')})
-                and_query = []
-                if item.get('email'):
-                    and_query.append({"contact_email": item.get('email')})
-                if item.get('personalEmail'):
-                    and_query.append({"contact_email": item.get('personalEmail')})
-                if item.get('directPhone1'):
-                    and_query.append({"contact_phone.number": item.get('directPhone1')})
-                if item.get('directPhone2'):
-                    and_query.append({"contact_phone.number": item.get('directPhone2')})
-                if item.get('phoneGeneral'):
-                    and_query.append({"contact_phone.number": item.get('phoneGeneral')})
-                if item.get('personalPhone'):
-                    and_query.append({"contact_phone.number": item.get('personalPhone')})
-                if and_query:
-                    query.update({"$and": and_query})
-
-                contacts = contact_service.find(query)
-
-                if len(list(contacts)):
-                    logger.info(
-                        "contact (id:%s) is exist, same name(%s %s), email(%s, %s), phone(%s, %s), not import" % (
-                            str(item.get('contactId')), item.get('firstName'), item.get('lastName'),
-                            item.get('email', ''), item.get('personalEmail', ''), item.get('directPhone1', ''),
-                            item.get('directPhone2', '')))
-                    continue
-            doc = {}
-            logger.info("contact (id:%s) is insert successfully:" % str(item.get('contactId')))
-            # mapping data
-            doc.setdefault('schema', {}).update({"is_active": True,
-                                                 "public": item.get("belgaPublic", True)
-                                                 })
-            doc['organisation'] = item.get("company", "")
-            doc['first_name'] = item.get("firstName", "")
-            doc['last_name'] = item.get("lastName", "")
-            if item.get('function'):
-                doc['job_title'] = item.get("function")
-            if item.get('mobile247'):
-                doc.setdefault('mobile', []).append({'number': item.get('mobile247'),
-                                                     'usage': 'Business',
-                                                     'public': True
-                                                     })
-            if item.get('personalMobile'):
-                doc.setdefault('mobile', []).append({'number': item.get('personalMobile'),
-                                                     'usage': 'Confidential',
-                                                     'public': True
-                                                     })
-            if item.get('phoneGeneral'):
-                doc.setdefault('contact_phone', []).append({'number': item.get('phoneGeneral'),
-                                                            'usage': 'Business',
-                                                            'public': True
-                                                            })
-            if item.get('directPhone1'):
-                doc.setdefault('contact_phone', []).append({'number': item.get('directPhone1'),
-                                                            'usage': 'Business',
-                                                            'public': True
-                                                            })
-            if item.get('directPhone2'):
-                doc.setdefault('contact_phone', []).append({'number': item.get('directPhone2'),
-                                                            'usage': 'Business',
-                                                            'public': True
-                                                            })
-            if item.get('personalPhone'):
-                doc.setdefault('contact_phone', []).append({'number': item.get('personalPhone'),
-                                                            'usage': 'Confidential',
-                                                            'public': True
-                                                            })
-            doc['fax'] = ''
-            if item.get('email'):
-                doc.setdefault('contact_email', []).append(item.get('email'))
-            if item.get('personalEmail'):
-                doc.setdefault('contact_email', []).append(item.get('personalEmail'))
-            if item.get('twitter'):
-                doc['twitter'] = item.get('twitter')
-            if item.get('personalTwitter'):
-                doc['twitter_personal'] = item.get('personalTwitter')
-            if item.get('facebook'):
-                doc['facebook'] = item.get('facebook')
-            if item.get('personalFacebook'):
-                doc['facebook_personal'] = item.get('personalFacebook')
-            if item.get('url'):
-                doc['website'] = item.get('url')
-            if item.get('professionalAddress'):
-                doc.setdefault('contact_address', []).append(item.get('professionalAddress'))
-            if item.get('professionalAddress'):
-                doc.setdefault('contact_address', []).append(item.get('personalAddress'))
-            if item.get('Comment1'):
-                doc['notes'] = item.get('Comment1', '')
-            if item.get('keywords'):
-                doc['keywords'] = item.get('keywords')
-            # use original_id check and sync the contact from the belga.
-            doc['original_id'] = str(item.get('contactId'))
+            if index.is_duplicate(item):
+                logger.info(
+                    "contact (id:%s) is exist, same name(%s %s), email(%s, %s), phone(%s, %s), not import" % (
+                        str(item.get('contactId')), item.get('firstName'), item.get('lastName'),
+                        item.get('email', ''), item.get('personalEmail', ''), item.get('directPhone1', ''),
+                        item.get('directPhone2', '')))
+                continue
+            doc = get_contact_doc(item)
+            doc[HASH_FIELD] = get_contact_hash(doc)
+            index.add(doc)
+            batch.append(doc)
             count_import += 1
-            contact_service.post([doc])
-            docs.append(doc)
-        logger.info("number item: " + str(count_items) + ", number imported item: " + str(count_import))
-        return docs
+            if len(batch) >= batch_size:
+                insert(batch)
+                batch = []
+        if batch:
+            insert(batch)
+
+    logger.info("number item: " + str(count_items) + ", number imported item: " + str(count_import))
+    return count_import
+
+
+def get_contact_hash(doc):
+    """Get hash of contact fields, which changes when belga contact data changes."""
+    data = json.dumps({field: doc.get(field) for field in CONTACT_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def get_synced_contacts(contact_service):
+    """Get mapping of ``original_id`` to id, hash, active flag and sync deactivation flag of existing contacts."""
+    contacts = contact_service.find({'original_id': {'$exists': True}})
+    return {
+        contact['original_id']: (
+            contact[superdesk.config.ID_FIELD],
+            contact.get(HASH_FIELD),
+            contact.get('is_active'),
+            bool(contact.get(DEACTIVATED_FIELD)),
+        )
+        for contact in contacts
+    }
+
+
+def get_contact_updates(doc):
+    """Get updates of synced contact fields, fields missing in ``doc`` are cleared."""
+    updates = {}
+    for field in CONTACT_FIELDS:
+        if doc.get(field) is not None:
+            updates[field] = doc[field]
+        else:
+            updates[field] = [] if field in LIST_FIELDS else ''
+    updates[HASH_FIELD] = doc[HASH_FIELD]
+    return updates
+
+
+def bulk_update_contacts(updates):
+    """Update contacts using a single bulk write and reindex them using a single bulk request.
+
+    :param updates: dict of updates by contact id
+    """
+    if not updates:
+        return
+    now = utcnow()
+    collection = app.data.mongo.pymongo('contacts').db['contacts']
+    collection.bulk_write([
+        UpdateOne({superdesk.config.ID_FIELD: _id}, {'$set': dict(changes, **{superdesk.config.LAST_UPDATED: now})})
+        for _id, changes in updates.items()
+    ], ordered=False)
+    contacts = list(collection.find({superdesk.config.ID_FIELD: {'$in': list(updates)}}))
+    app.data._search_backend('contacts').bulk_insert('contacts', contacts)
+    push_notification('contacts:update', _id=[str(_id) for _id in updates])
+
+
+def sync_contacts_via_json_file(path_file, batch_size=BATCH_SIZE, deactivate_missing=False):
+    """
+    Sync contacts in file with database using their ``original_id``
+
+    New contacts are inserted and changed contacts are updated in batches,
+    existing contacts are updated only if their data has changed since the last
+    sync. Contacts deactivated by sync are activated again when they are back
+    in the file, contacts deactivated by users stay inactive. Records without
+    belga id are skipped.
+
+    :param path_file: path of json file with contacts
+    :param batch_size: number of contacts inserted at once
+    :param deactivate_missing: deactivate contacts which are not in the file
+    :return: dict with number of created, updated, unchanged and deactivated contacts
+    """
+    contact_service = get_resource_service('contacts')
+    synced = get_synced_contacts(contact_service)
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'deactivated': 0}
+    seen = set()
+    batch = {}
+    updates = {}
+
+    def insert(batch):
+        contact_service.post(list(batch.values()))
+        for original_id, doc in batch.items():
+            synced[original_id] = (doc[superdesk.config.ID_FIELD], doc[HASH_FIELD], True, False)
+        stats['created'] += len(batch)
+        logger.info("sync progress: %s" % stats)
+
+    def update(updates):
+        bulk_update_contacts(updates)
+        logger.info("sync progress: %s" % stats)
+
+    with open(path_file, 'rt', encoding='utf-8') as contacts_data:
+        for item in iter_json_array(contacts_data):
+            if not is_valid(item):
+                continue
+            if item.get('contactId') is None:
+                logger.info("contact without id is not synced: %s %s %s" % (
+                    item.get('firstName', ''), item.get('lastName', ''), item.get('company', '')))
+                continue
+            doc = get_contact_doc(item)
+            doc[HASH_FIELD] = get_contact_hash(doc)
+            original_id = doc['original_id']
+            seen.add(original_id)
+
+            if original_id not in synced or original_id in batch:
+                batch[original_id] = doc
+                if len(batch) >= batch_size:
+                    insert(batch)
+                    batch = {}
+                continue
+
+            _id, contact_hash, is_active, deactivated = synced[original_id]
+            if contact_hash == doc[HASH_FIELD] and not deactivated:
+                stats['unchanged'] += 1
+                continue
+
+            updates[_id] = get_contact_updates(doc)
+            if deactivated:
+                updates[_id]['is_active'] = True
+                updates[_id][DEACTIVATED_FIELD] = False
+                is_active = True
+            synced[original_id] = (_id, doc[HASH_FIELD], is_active, False)
+            stats['updated'] += 1
+            if len(updates) >= batch_size:
+                update(updates)
+                updates = {}
+        if batch:
+            insert(batch)
+        if updates:
+            update(updates)
+            updates = {}
+
+    if deactivate_missing:
+        for original_id, (_id, _hash, is_active, _deactivated) in synced.items():
+            if original_id not in seen and is_active is not False:
+                updates[_id] = {'is_active': False, DEACTIVATED_FIELD: True}
+                stats['deactivated'] += 1
+                if len(updates) >= batch_size:
+                    update(updates)
+                    updates = {}
+        if updates:
+            update(updates)
+
+    logger.info("contacts synced: %s" % stats)
+    return stats
 
 
 class ContactImportCommand(superdesk.Command):
@@ -140,12 +400,42 @@ class ContactImportCommand(superdesk.Command):
 
     option_list = [
         superdesk.Option('--file', '-f', dest='contacts_file_path',
-                         default='contacts.json')
+                         default='contacts.json'),
+        superdesk.Option('--batch-size', '-b', dest='batch_size', type=int, default=BATCH_SIZE,
+                         help='Number of contacts inserted at once'),
     ]
 
-    def run(self, contacts_file_path):
+    def run(self, contacts_file_path, batch_size=BATCH_SIZE):
         logger.info("import file: " + contacts_file_path)
-        import_contacts_via_json_file(contacts_file_path)
+        import_contacts_via_json_file(contacts_file_path, batch_size)
+
+
+class ContactSyncCommand(superdesk.Command):
+    """Sync contacts from belga to Superdesk.
+
+    Contacts are matched by their belga id, new contacts are created and existing
+    contacts are updated only if they were changed since the last sync.
+
+    Example:
+    ::
+
+        $ python manage.py contact:sync --file contacts.json --deactivate-missing
+
+    """
+
+    option_list = [
+        superdesk.Option('--file', '-f', dest='contacts_file_path',
+                         default='contacts.json'),
+        superdesk.Option('--batch-size', '-b', dest='batch_size', type=int, default=BATCH_SIZE,
+                         help='Number of contacts inserted at once'),
+        superdesk.Option('--deactivate-missing', '-d', dest='deactivate_missing', action='store_true',
+                         default=False, help='Deactivate contacts missing in the file'),
+    ]
+
+    def run(self, contacts_file_path, batch_size=BATCH_SIZE, deactivate_missing=False):
+        logger.info("sync file: " + contacts_file_path)
+        sync_contacts_via_json_file(contacts_file_path, batch_size, deactivate_missing)
 
 
 superdesk.command('contact:import', ContactImportCommand())
+superdesk.command('contact:sync', ContactSyncCommand())
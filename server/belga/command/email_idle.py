@@ -0,0 +1,160 @@
+import time
+import logging
+import threading
+
+import superdesk
+from flask import current_app as app
+from superdesk.errors import IngestEmailError
+from superdesk.io.commands.update_ingest import (
+    is_closed,
+    update_provider,
+    get_task_ttl,
+    get_provider_rule_set,
+    get_provider_routing_scheme,
+)
+
+from belga.io.feeding_services.email_belga import EmailBelgaFeedingService
+from belga.io.feeding_services.imap_pool import wait_for_mail, logout, CONNECTION_ERRORS
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait before reconnecting after an error, doubled after every failed attempt
+RECONNECT_DELAY = 60
+MAX_RECONNECT_DELAY = 15 * 60
+
+
+def is_watched(provider):
+    return (
+        provider.get('feeding_service') == EmailBelgaFeedingService.NAME
+        and provider.get('config', {}).get('persistent')
+        and not is_closed(provider)
+    )
+
+
+def get_watched_providers(provider_name=None):
+    lookup = {'feeding_service': EmailBelgaFeedingService.NAME}
+    if provider_name:
+        lookup['name'] = provider_name
+    providers = superdesk.get_resource_service('ingest_providers').get(req=None, lookup=lookup)
+    return [provider for provider in providers if is_watched(provider)]
+
+
+def trigger_update(provider):
+    """Schedule provider update the same way as ``ingest:update`` does."""
+    kwargs = {
+        'provider': provider,
+        'rule_set': get_provider_rule_set(provider),
+        'routing_scheme': get_provider_routing_scheme(provider),
+    }
+    update_provider.apply_async(expires=get_task_ttl(provider), kwargs=kwargs, serializer='eve/json')
+
+
+def watch_provider(provider, timeout, stop_event=None):
+    """Wait for new emails in provider mailbox and trigger provider update when there are some.
+
+    It runs until the provider is closed, removed or it's not using persistent connection anymore.
+    Provider is reloaded before every reconnect, errors are logged and connecting is retried
+    with increasing delay.
+
+    :param provider: ingest provider
+    :param timeout: seconds to wait for new emails before checking the provider again
+    :param stop_event: optional event to stop watching
+    """
+    service = EmailBelgaFeedingService()
+    providers_service = superdesk.get_resource_service('ingest_providers')
+    provider_id = provider[superdesk.config.ID_FIELD]
+    name = provider.get('name')
+    delay = RECONNECT_DELAY
+    while not _is_stopped(stop_event):
+        # connection is considered working only after it waited for emails successfully
+        working = False
+        try:
+            provider = providers_service.find_one(req=None, _id=provider_id)
+            if not provider or not is_watched(provider):
+                logger.info('Provider {}: not watched anymore'.format(name))
+                return
+
+            imap = service._connect(provider)
+            try:
+                while not _is_stopped(stop_event):
+                    has_mail = wait_for_mail(imap, timeout)
+                    working = True
+                    delay = RECONNECT_DELAY
+                    if has_mail:
+                        logger.info('Provider {}: new emails, updating'.format(name))
+                        trigger_update(provider)
+
+                    provider = providers_service.find_one(req=None, _id=provider_id)
+                    if not provider or not is_watched(provider):
+                        logger.info('Provider {}: not watched anymore'.format(name))
+                        return
+            finally:
+                logout(imap)
+        except CONNECTION_ERRORS as ex:
+            logger.warning('Provider {}: connection lost: {}'.format(name, ex))
+            if working:
+                # reconnect at once, connection was working
+                continue
+        except IngestEmailError as ex:
+            logger.error('Provider {}: can not connect to the mailbox: {}'.format(name, ex))
+        except Exception:
+            logger.exception('Provider {}: unexpected error while watching the mailbox'.format(name))
+
+        _wait(delay, stop_event)
+        delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+
+def _is_stopped(stop_event):
+    return stop_event is not None and stop_event.is_set()
+
+
+def _wait(seconds, stop_event):
+    if stop_event is not None:
+        stop_event.wait(seconds)
+    else:
+        time.sleep(seconds)
+
+
+class EmailIdleCommand(superdesk.Command):
+    """Trigger email ingest as soon as new emails arrive.
+
+    Watches mailboxes of email-belga providers with "Keep connection open" enabled,
+    using IMAP IDLE (or NOOP polling if the server doesn't support it) and schedules
+    provider update when there are new emails. Scheduled updates are still running,
+    so nothing is missed if this command is not running.
+
+    Example:
+    ::
+
+        $ python manage.py email:idle
+        $ python manage.py email:idle --provider "Press releases"
+
+    """
+
+    option_list = [
+        superdesk.Option('--provider', '-p', dest='provider_name'),
+        superdesk.Option('--timeout', '-t', dest='timeout', type=int, default=300,
+                         help='Seconds to idle before checking the provider again'),
+    ]
+
+    def run(self, provider_name=None, timeout=300):
+        providers = get_watched_providers(provider_name)
+        if not providers:
+            logger.info('There are no email providers to watch')
+            return
+
+        flask_app = app._get_current_object()
+        threads = []
+        for provider in providers:
+            thread = threading.Thread(target=self._watch, args=(flask_app, provider, timeout), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+    def _watch(self, flask_app, provider, timeout):
+        with flask_app.app_context():
+            watch_provider(provider, timeout)
+
+
+superdesk.command('email:idle', EmailIdleCommand())
@@ -0,0 +1,67 @@
+import json
+import shutil
+import tempfile
+
+import superdesk
+from belga.io.benchmark import run_benchmark, DB_RESOURCES
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IngestBenchmarkCommand(superdesk.Command):
+    """Measure throughput of Belga feed parsers.
+
+    Every parser is run on a corpus built from test fixtures and items/sec, memory
+    allocated and database calls per item are reported. Use it with a local database
+    populated with vocabularies only.
+
+    Example:
+    ::
+
+        $ python manage.py ingest:benchmark --size 500 --formats afp,dpa,iptc7901_dpa
+
+    """
+
+    option_list = [
+        superdesk.Option('--size', '-s', dest='size', type=int, default=100,
+                         help='Number of files (spreadsheet rows) per format'),
+        superdesk.Option('--formats', '-f', dest='formats', default='',
+                         help='Comma separated list of formats, all formats are used by default'),
+        superdesk.Option('--path', '-p', dest='path', default=None,
+                         help='Directory for the corpus, temporary directory is used by default'),
+        superdesk.Option('--json', dest='as_json', action='store_true', default=False,
+                         help='Print results as json'),
+    ]
+
+    def run(self, size, formats, path=None, as_json=False):
+        names = [name.strip() for name in formats.split(',') if name.strip()]
+        corpus_path = path or tempfile.mkdtemp(prefix='belga_benchmark_')
+        try:
+            results = run_benchmark(corpus_path, size=size, names=names)
+        finally:
+            if not path:
+                shutil.rmtree(corpus_path, ignore_errors=True)
+
+        if as_json:
+            print(json.dumps([result.to_dict() for result in results], indent=2))
+            return
+
+        resources = DB_RESOURCES + ('other',)
+        row = '{:<14} {:>7} {:>7} {:>10} {:>12} {:>10}' + ' {:>13}' * len(resources)
+        print(row.format('format', 'items', 'errors', 'items/sec', 'kB/item', 'peak kB',
+                         *('{} db/item'.format(resource[:5]) for resource in resources)))
+        for result in results:
+            print(row.format(
+                result.name,
+                result.items,
+                result.errors,
+                '{:.1f}'.format(result.items_per_sec),
+                '{:.1f}'.format(result.allocated_kb_per_item),
+                '{:.1f}'.format(result.peak_memory / 1024),
+                *('{:.2f}'.format(result.db_calls_per_item(resource)) for resource in resources)
+            ))
+
+
+superdesk.command('ingest:benchmark', IngestBenchmarkCommand())
@@ -0,0 +1,86 @@
+import json
+
+import superdesk
+from bson import json_util
+
+from belga.macro_profiler import run_macros, benchmark_app
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MacroBenchmarkCommand(superdesk.Command):
+    """Replay sample items through macros and report their cost.
+
+    Items are loaded from a json file (mongo extended json is supported, so it
+    can be exported from the database) and every item is passed through the
+    chain of macros. Time and database calls per macro and items/sec of the chain
+    are reported. Macros can modify the database (eg. create translations or
+    route items), so they run against temporary databases seeded with vocabularies,
+    desks, content profiles and filters of the configured one, which are dropped
+    afterwards.
+
+    Example:
+    ::
+
+        $ python manage.py macros:benchmark --file items.json --macros "Brief internal routing"
+        $ python manage.py macros:benchmark -f items.json -m "Set Default Metadata With Translate" \\
+            --kwargs '{"dest_desk_id": "...", "dest_stage_id": "..."}'
+
+    """
+
+    option_list = [
+        superdesk.Option('--file', '-f', dest='items_file_path', required=True,
+                         help='Json file with list of items'),
+        superdesk.Option('--macros', '-m', dest='macros', required=True,
+                         help='Comma separated list of macro names, run in the given order'),
+        superdesk.Option('--repeat', '-r', dest='repeat', type=int, default=1,
+                         help='Number of times the items are replayed'),
+        superdesk.Option('--kwargs', '-k', dest='macro_kwargs', default='{}',
+                         help='Json object with arguments passed to macros'),
+        superdesk.Option('--json', dest='as_json', action='store_true', default=False,
+                         help='Print results as json'),
+    ]
+
+    def run(self, items_file_path, macros, repeat=1, macro_kwargs='{}', as_json=False):
+        names = [name.strip() for name in macros.split(',') if name.strip()]
+        with open(items_file_path, 'rt', encoding='utf-8') as items_file:
+            items = json_util.loads(items_file.read())
+        if isinstance(items, dict):
+            items = [items]
+
+        # app factory of manage.py, available when running commands
+        from app import get_app
+
+        with benchmark_app(get_app):
+            profiler, processed, seconds = run_macros(items, names, repeat, **json.loads(macro_kwargs))
+        items_per_sec = processed / seconds if seconds else 0.0
+
+        if as_json:
+            print(json.dumps({
+                'items': processed,
+                'seconds': seconds,
+                'items_per_sec': items_per_sec,
+                'macros': [profiler.stats[name].to_dict() for name in names if name in profiler.stats],
+            }, indent=2))
+            return
+
+        row = '{:<40} {:>7} {:>7} {:>10} {:>10}  {}'
+        print(row.format('macro', 'calls', 'errors', 'ms/call', 'db/call', 'db calls by resource'))
+        for name in names:
+            stats = profiler.stats.get(name)
+            if not stats:
+                continue
+            print(row.format(
+                name[:40],
+                stats.calls,
+                stats.errors,
+                '{:.2f}'.format(stats.ms_per_call),
+                '{:.2f}'.format(stats.db_calls_per_call),
+                ', '.join('{}: {}'.format(resource, count) for resource, count in stats.db_calls.most_common()),
+            ))
+        print('{} items in {:.3f}s, {:.1f} items/sec'.format(processed, seconds, items_per_sec))
+
+
+superdesk.command('macros:benchmark', MacroBenchmarkCommand())
@@ -0,0 +1,83 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013, 2014 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Compiled content filters.
+
+Content filter is loaded with its filter conditions (and referenced content
+filters) once and kept in the lookup cache, so matching an item doesn't
+need any database queries. It matches the same way as
+``ContentFilterService.does_match`` does.
+"""
+
+from flask_babel import _
+from superdesk import get_resource_service
+from superdesk.errors import SuperdeskApiError
+from apps.content_filters.filter_condition.filter_condition import FilterCondition
+
+from belga.lookup_cache import lookup_cache, get_ttl, CONTENT_FILTERS
+
+
+class MatchAll:
+    """Matcher for a missing content filter, which matches everything."""
+
+    def does_match(self, article):
+        return True
+
+
+class CompiledFilter:
+    """Content filter statements with parsed filter conditions and referenced filters."""
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    def does_match(self, article):
+        return any(all(matcher.does_match(article) for matcher in statement) for statement in self.statements)
+
+
+def compile_filter(content_filter):
+    """Parse filter conditions and compile referenced filters of the content filter.
+
+    :param content_filter: content filter
+    :return: filter matcher
+    """
+    if not content_filter:
+        return MatchAll()
+
+    filter_condition_service = get_resource_service('filter_conditions')
+    content_filter_service = get_resource_service('content_filters')
+    statements = []
+    for index, statement in enumerate(content_filter.get('content_filter', [])):
+        expression = statement.get('expression')
+        if not expression:
+            raise SuperdeskApiError.badRequestError(
+                _("Filter statement {index} does not have a filter condition").format(index=index + 1)
+            )
+        matchers = [
+            FilterCondition.parse(filter_condition_service.find_one(req=None, _id=_id))
+            for _id in expression.get('fc', [])
+        ]
+        matchers.extend(
+            compile_filter(content_filter_service.find_one(req=None, _id=_id))
+            for _id in expression.get('pf', [])
+        )
+        statements.append(matchers)
+    return CompiledFilter(statements)
+
+
+def get_compiled_filter(content_filter_id):
+    """Get compiled content filter with given id.
+
+    :param content_filter_id: content filter id
+    :return: filter matcher or ``None`` if there is no such filter
+    """
+    def load():
+        content_filter = get_resource_service('content_filters').find_one(req=None, _id=content_filter_id)
+        return compile_filter(content_filter) if content_filter else None
+    return lookup_cache.get(CONTENT_FILTERS, str(content_filter_id), load, get_ttl())
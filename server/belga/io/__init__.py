@@ -11,3 +11,7 @@
 
 from . import feed_parsers  # noqa
 from . import feeding_services  # noqa
+
+
+def init_app(app):
+    feeding_services.email_attachments.init_app(app)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Throughput benchmark of Belga feed parsers.
+
+A corpus is built by replicating the parser test fixtures (and generating
+spreadsheet rows) and every Belga feed parser is run on it the same way
+file based feeding services do. It reports items/sec, memory allocated while
+parsing (peak traced by ``tracemalloc``) and database calls per item, grouped
+by resource.
+
+It's using the database configured for the app, so it should be run against
+a local database populated with vocabularies only, like the one used by tests.
+"""
+
+import os
+import time
+import shutil
+import logging
+import tracemalloc
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+import belga
+import superdesk
+from superdesk.io.registry import registered_feed_parsers
+
+from .parse_pool import parse_file
+from .feed_parsers.belga_spreadsheet import BelgaSpreadsheetParser
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(belga.__file__)), 'tests', 'io', 'fixtures',
+)
+
+# backend methods counted as database calls,
+# ``find`` is using ``get_from_mongo`` so it's not counted twice
+DB_METHODS = ('find_one', 'get', 'get_from_mongo', 'search', 'create', 'update', 'system_update', 'replace', 'delete')
+
+# resources reported separately, all other are reported as ``other``
+DB_RESOURCES = ('vocabularies', 'users')
+
+BenchmarkFormat = namedtuple('BenchmarkFormat', ['name', 'feed_parser', 'fixture'])
+
+FORMATS = [
+    BenchmarkFormat('belga', 'belganewsml12', 'belga_newsml_1_2.xml'),
+    BenchmarkFormat('afp', 'belga_afp_newsml12', 'afp_belga.xml'),
+    BenchmarkFormat('anp', 'belga_anp_newsml12', 'anp_belga.xml'),
+    BenchmarkFormat('ats', 'belga_ats_newsml12', 'ats_newsml_1_2_belga.xml'),
+    BenchmarkFormat('tass', 'belga_tass_newsml12', 'tass_belga.xml'),
+    BenchmarkFormat('efe', 'belga_efe_newsml12', 'efe_belga.xml'),
+    BenchmarkFormat('kyodo', 'belga_kyodo_newsml12', 'kyodo_newsml_1_2_belga.xml'),
+    BenchmarkFormat('tip', 'belgatipnewsml12', 'belga_tip_newsml_1_2.xml'),
+    BenchmarkFormat('dpa', 'belga_dpa_newsml20', 'dpa_newsml_2_0_belga.xml'),
+    BenchmarkFormat('stt', 'belga_stt_newsml', 'stt_belga.xml'),
+    BenchmarkFormat('ansa', 'belga_ansa_newsml', 'ansa_belga.xml'),
+    BenchmarkFormat('iptc7901_dpa', 'belgaiptc7901', 'dpa.txt'),
+    BenchmarkFormat('iptc7901_ats', 'belgaiptc7901', 'ats.txt'),
+    BenchmarkFormat('anpa', 'belgaanpa1312', 'kyodo.txt'),
+    BenchmarkFormat('spreadsheet', 'belgaspreadsheet', None),
+]
+
+
+class BenchmarkResult:
+    """Measurements of a single format."""
+
+    def __init__(self, name, feed_parser, files):
+        self.name = name
+        self.feed_parser = feed_parser
+        self.files = files
+        self.items = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.peak_memory = 0
+        self.allocated_memory = 0
+        self.db_calls = Counter()
+
+    @property
+    def items_per_sec(self):
+        return self.items / self.seconds if self.seconds else 0.0
+
+    @property
+    def allocated_kb_per_item(self):
+        return self.allocated_memory / 1024 / self.items if self.items else 0.0
+
+    def db_calls_per_item(self, resource):
+        return self.db_calls[resource] / self.items if self.items else 0.0
+
+    def to_dict(self):
+        return {
+            'format': self.name,
+            'feed_parser': self.feed_parser,
+            'files': self.files,
+            'items': self.items,
+            'errors': self.errors,
+            'seconds': self.seconds,
+            'items_per_sec': self.items_per_sec,
+            'allocated_kb_per_item': self.allocated_kb_per_item,
+            'peak_kb': self.peak_memory / 1024,
+            'db_calls_per_item': {resource: self.db_calls_per_item(resource) for resource in self.db_calls},
+        }
+
+
+def get_formats(names=None):
+    """Get formats to benchmark.
+
+    :param names: list of format names, all formats are used if empty
+    """
+    covered = {benchmark_format.feed_parser for benchmark_format in FORMATS}
+    for name, parser in registered_feed_parsers.items():
+        if parser.__module__.startswith('belga.') and name not in covered:
+            logger.warning('There is no benchmark for feed parser {}'.format(name))
+
+    if not names:
+        return FORMATS
+
+    formats = [benchmark_format for benchmark_format in FORMATS if benchmark_format.name in names]
+    unknown = set(names) - {benchmark_format.name for benchmark_format in formats}
+    if unknown:
+        raise ValueError('Unknown formats: {}'.format(', '.join(sorted(unknown))))
+    return formats
+
+
+def build_corpus(path, benchmark_format, size, fixtures_path=FIXTURES_PATH):
+    """Replicate the fixture of the format ``size`` times.
+
+    :param path: directory where the corpus is created
+    :param benchmark_format: format to build corpus for
+    :param size: number of files
+    :param fixtures_path: directory with fixtures
+    :return: list of file paths or spreadsheet data for the spreadsheet parser
+    """
+    if benchmark_format.fixture is None:
+        return generate_spreadsheet(size)
+
+    format_path = os.path.join(path, benchmark_format.name)
+    os.makedirs(format_path, exist_ok=True)
+    fixture = os.path.join(fixtures_path, benchmark_format.fixture)
+    extension = os.path.splitext(fixture)[1]
+    file_paths = []
+    for i in range(size):
+        file_path = os.path.join(format_path, '{:06d}{}'.format(i, extension))
+        shutil.copyfile(fixture, file_path)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def generate_spreadsheet(size):
+    """Generate spreadsheet data with ``size`` new events.
+
+    Rows are the same as one filled by users, with a contact and a location.
+    """
+    data = [BelgaSpreadsheetParser.titles + BelgaSpreadsheetParser.generate_fields, []]
+    for i in range(size):
+        data.append([
+            '2019-06-20', '7:00', '2019-06-20', '15:00', 'FALSE', 'Europe/Brussels', 'Slugline {}'.format(i),
+            'Event {}'.format(i), 'Description', 'Planned, occurrence planned only', 'Culture', 'Name', 'Address',
+            'City', 'State', 'Country', 'Honorific', 'First name', 'Last name', 'Organisation', 'Point of Contact',
+            'email@mail.com', 'Phone', 'Business', 'FALSE', 'Long description', 'Inote', 'Enote',
+            'https://www.superdesk.org', '', '', '',
+        ])
+    return data
+
+
+@contextmanager
+def count_db_calls(counter, resources=DB_RESOURCES):
+    """Count calls of the data backend per resource while in the context.
+
+    :param counter: counter updated with number of calls by resource name
+    :param resources: resources counted separately, others are counted as ``other``,
+        every resource is counted separately if ``None``
+    """
+    backend = superdesk.get_backend()
+
+    def wrap(method):
+        def wrapper(endpoint_name, *args, **kwargs):
+            resource = endpoint_name if resources is None or endpoint_name in resources else 'other'
+            counter[resource] += 1
+            return method(endpoint_name, *args, **kwargs)
+        return wrapper
+
+    for name in DB_METHODS:
+        setattr(backend, name, wrap(getattr(backend, name)))
+    try:
+        yield counter
+    finally:
+        for name in DB_METHODS:
+            # remove instance attributes so class methods are used again
+            delattr(backend, name)
+
+
+def run_benchmark(path, size=100, names=None, fixtures_path=FIXTURES_PATH):
+    """Run the benchmark for given formats.
+
+    Every format is parsed twice, first to measure time and database calls
+    and then with ``tracemalloc`` enabled to measure memory, as tracing
+    slows down parsing a lot.
+
+    :param path: directory where the corpus is created
+    :param size: number of files (spreadsheet rows) per format
+    :param names: list of format names, all formats are used if empty
+    :param fixtures_path: directory with fixtures
+    :return: list of :class:`BenchmarkResult`
+    """
+    results = []
+    for benchmark_format in get_formats(names):
+        corpus = build_corpus(path, benchmark_format, size, fixtures_path)
+        provider = {
+            'name': 'benchmark',
+            'feed_parser': benchmark_format.feed_parser,
+            'config': {'path': os.path.join(path, benchmark_format.name)},
+        }
+        result = BenchmarkResult(benchmark_format.name, benchmark_format.feed_parser, size)
+
+        with count_db_calls(result.db_calls):
+            start = time.perf_counter()
+            for items in _parse_corpus(provider, corpus, result):
+                result.items += len(items)
+            result.seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        try:
+            for _items in _parse_corpus(provider, corpus):
+                _current, peak = tracemalloc.get_traced_memory()
+                result.allocated_memory += peak
+                result.peak_memory = max(result.peak_memory, peak)
+                tracemalloc.clear_traces()
+        finally:
+            tracemalloc.stop()
+
+        logger.info('Benchmark {}: {} items in {:.3f}s'.format(result.name, result.items, result.seconds))
+        results.append(result)
+    return results
+
+
+def _parse_corpus(provider, corpus, result=None):
+    if provider['feed_parser'] == 'belgaspreadsheet':
+        parser = registered_feed_parsers[provider['feed_parser']].__class__()
+        items, _cells = parser.parse(corpus, provider)
+        yield items
+        return
+
+    for file_path in corpus:
+        try:
+            items = parse_file(provider, file_path)
+        except Exception:
+            logger.exception('Error while parsing {}'.format(file_path))
+            if result is not None:
+                result.errors += 1
+            continue
+        yield items
@@ -19,6 +19,7 @@ from superdesk.etree import etree
 from superdesk.io.feed_parsers.newsml_1_2 import NewsMLOneFeedParser
 from superdesk.io.iptc import subject_codes
 from .belga_newsml_mixin import BelgaNewsMLMixin
+from .parse_context import ParseContextMixin
 from superdesk import get_resource_service
 
 
@@ -28,7 +29,7 @@ class SkipItemException(Exception):
     pass
 
 
-class BaseBelgaNewsMLOneFeedParser(BelgaNewsMLMixin, NewsMLOneFeedParser):
+class BaseBelgaNewsMLOneFeedParser(ParseContextMixin, BelgaNewsMLMixin, NewsMLOneFeedParser):
     """Base Feed Parser for NewsML format, specific AFP, ANP, .. Belga xml."""
 
     def parse(self, xml, provider=None):
@@ -62,46 +63,47 @@ class BaseBelgaNewsMLOneFeedParser(BelgaNewsMLMixin, NewsMLOneFeedParser):
         :param provider:
         :return:
         """
-        try:
-            items = []
-            self.root = xml
-
-            # parser the NewsEnvelope element
-            item_envelop = self.parse_newsenvelop(xml.find('NewsEnvelope'))
-
-            # parser the NewsItem element
-            l_newsitem_el = xml.findall('NewsItem')
-            for newsitem_el in l_newsitem_el:
-                try:
-                    item = item_envelop.copy()
-                    self.parse_newsitem(item, newsitem_el)
-                    # add product is NEWS/GENERAL, if product is empty
-                    if not [it for it in item.get('subject', []) if it.get('scheme') == 'services-products']:
-                        item.setdefault('subject', []).append({
-                            'name': 'NEWS/GENERAL',
-                            'qcode': 'NEWS/GENERAL',
-                            'parent': 'NEWS',
-                            'scheme': 'services-products'
-                        })
-                    # Distribution is default
-                    item.setdefault('subject', []).extend([
-                        {"name": 'default', "qcode": 'default', "scheme": "distribution"},
-                    ])
-                    # Slugline and keywords is epmty
-                    item['slugline'] = None
-                    item['keywords'] = []
-                    # remove duplicated subject
-                    item['subject'] = [
-                        dict(i) for i, _ in itertools.groupby(sorted(item['subject'], key=lambda k: k['qcode']))
-                    ]
-                    item = self.populate_fields(item)
-                except SkipItemException:
-                    continue
-                items.append(item)
-            return items
-
-        except Exception as ex:
-            raise ParserError.newsmlOneParserError(ex, provider)
+        with self.new_parse_context(provider):
+            try:
+                items = []
+                self.root = xml
+
+                # parser the NewsEnvelope element
+                item_envelop = self.parse_newsenvelop(xml.find('NewsEnvelope'))
+
+                # parser the NewsItem element
+                l_newsitem_el = xml.findall('NewsItem')
+                for newsitem_el in l_newsitem_el:
+                    try:
+                        item = item_envelop.copy()
+                        self.parse_newsitem(item, newsitem_el)
+                        # add product is NEWS/GENERAL, if product is empty
+                        if not [it for it in item.get('subject', []) if it.get('scheme') == 'services-products']:
+                            item.setdefault('subject', []).append({
+                                'name': 'NEWS/GENERAL',
+                                'qcode': 'NEWS/GENERAL',
+                                'parent': 'NEWS',
+                                'scheme': 'services-products'
+                            })
+                        # Distribution is default
+                        item.setdefault('subject', []).extend([
+                            {"name": 'default', "qcode": 'default', "scheme": "distribution"},
+                        ])
+                        # Slugline and keywords is epmty
+                        item['slugline'] = None
+                        item['keywords'] = []
+                        # remove duplicated subject
+                        item['subject'] = [
+                            dict(i) for i, _ in itertools.groupby(sorted(item['subject'], key=lambda k: k['qcode']))
+                        ]
+                        item = self.populate_fields(item)
+                    except SkipItemException:
+                        continue
+                    items.append(item)
+                return items
+
+            except Exception as ex:
+                raise ParserError.newsmlOneParserError(ex, provider)
 
     def parse_newsenvelop(self, envelop_el):
         """
@@ -19,6 +19,11 @@ from superdesk.metadata.item import ITEM_TYPE, CONTENT_TYPE, GUID_FIELD, GUID_TA
 import pytz
 from superdesk.metadata.utils import generate_guid
 
+from . import sniffer
+
+# content is framed by STX and ETX characters
+CONTENT_RE = re.compile(b'\x02(.*)\x03', flags=re.M + re.S)
+
 
 class BelgaANPAFeedParser(ANPAFeedParser):
     """
@@ -37,21 +42,28 @@ class BelgaANPAFeedParser(ANPAFeedParser):
 
     def can_parse(self, file_path):
         try:
-            with open(file_path, 'rb') as f:
-                lines = [line for line in f]
-                return re.match(b'\x01([a-z])([0-9]{4})KYODO\x1f([a-z0-9-]+)', lines[0], flags=re.I)
+            return sniffer.sniff(file_path, self.NAME, self._sniff_kyodo)
         except Exception:
             return False
 
+    def _sniff_kyodo(self, header):
+        line = sniffer.first_line(header)
+        return re.match(b'\x01([a-z])([0-9]{4})KYODO\x1f([a-z0-9-]+)', line, flags=re.I) is not None
+
     def parse(self, file_path, provider=None):
         try:
             item = {ITEM_TYPE: CONTENT_TYPE.TEXT, GUID_FIELD: generate_guid(type=GUID_TAG), FORMAT: FORMATS.HTML}
 
-            with open(file_path, 'rb') as f:
-                lines = [line for line in f]
+            with sniffer.map_file(file_path) as buf:
+                first_line = buf.readline()
+                second_line = buf.readline()
+                # content is matched in place, only the text between STX and ETX is copied
+                m = CONTENT_RE.match(buf, buf.tell()) if buf.tell() < len(buf) else None
+                content = m.group(1) if m else None
+                last_line = buf[buf.rfind(b'\n', 0, len(buf) - 1) + 1:]
 
             # parse first header line
-            m = re.match(b'x01([a-z])([0-9]{4})KYODO\x1f([a-z0-9-]+)', lines[0], flags=re.I)
+            m = re.match(b'x01([a-z])([0-9]{4})KYODO\x1f([a-z0-9-]+)', first_line, flags=re.I)
             if m:
                 item['provider_sequence'] = m.group(2).decode()
 
@@ -59,7 +71,7 @@ class BelgaANPAFeedParser(ANPAFeedParser):
             m = re.match(
                 b'([a-z]) ([a-z])(\x13|\x14)(\x11|\x12) (am-|pm-|bc-|ap-)([a-z-.]+)(.*) '
                 b'([0-9]{1,2})-([0-9]{1,2}) ([0-9]{4})',
-                lines[1], flags=re.I)
+                second_line, flags=re.I)
             if m:
                 item['language'] = 'en'
                 item['priority'] = 2 if m.group(1).decode() == 'u' else 3
@@ -79,7 +91,7 @@ class BelgaANPAFeedParser(ANPAFeedParser):
                     item[FORMAT] = FORMATS.PRESERVED
 
             # parse created date at the end of file
-            m = re.search(b'\x03([A-Z]{3})-([0-9]{2}:[0-9]{2}-[0-9]{2}-[0-9]{2}-[0-9]{2})', lines[-1], flags=re.I)
+            m = re.search(b'\x03([A-Z]{3})-([0-9]{2}:[0-9]{2}-[0-9]{2}-[0-9]{2}-[0-9]{2})', last_line, flags=re.I)
             if m:
                 tz = pytz.timezone(config.TIMEZONE_CODE[str.lower(m.group(1).decode())])
                 date = datetime.strptime(m.group(2).decode(), '%H:%M-%d-%m-%y').replace(tzinfo=tz)
@@ -87,14 +99,14 @@ class BelgaANPAFeedParser(ANPAFeedParser):
                 item['versioncreated'] = item['firstcreated']
 
             # parse anpa content
-            body = b''.join(lines[2:])
-            m = re.match(b'\x02(.*)\x03', body, flags=re.M + re.S)
-            if m:
-                text = m.group(1).decode('latin-1', 'replace').split('\n')
+            if content is not None:
+                text = content.decode('latin-1', 'replace').split('\n')
                 item['keywords'] = text[0].strip('\r').split("-")
                 item['abstract'] = re.split("\\..?", ("".join(line.strip() for line in text[2:-1])))[0] + '.'
                 item.setdefault('extra', {})['city'] = item.get('abstract', '').split(',')[0]
                 is_header = True
+                headline = []
+                body = []
                 for line in text:
                     if line == text[0]:
                         m = re.match('BC-(.*)', line, flags=re.I)
@@ -105,21 +117,17 @@ class BelgaANPAFeedParser(ANPAFeedParser):
                         if line.endswith("+\r"):
                             is_header = False
                         line = line.rstrip('\r') if is_header is True else line.rstrip('+\r')
-                        line = line
-                        if 'headline' in item:
-                            item['headline'] += line
-                        else:
-                            item['headline'] = line
+                        headline.append(line)
                         continue
 
                     if line == '==Kyodo\r':
                         break
-                    line = line.rstrip('\r')
+                    body.append('<p>' + line.rstrip('\r') + '</p>')
 
-                    if 'body_html' in item:
-                        item['body_html'] += '<p>' + line + '</p>'
-                    else:
-                        item['body_html'] = '<p>' + line + '</p>'
+                if headline:
+                    item['headline'] = ''.join(headline)
+                if body:
+                    item['body_html'] = ''.join(body)
 
                 self._parse_ednote(item['headline'], item)
             # Slugline and keywords is epmty
@@ -18,8 +18,10 @@ import pytz
 from superdesk.utc import local_to_utc
 import arrow
 
+from .parse_context import ParseContextMixin
 
-class BelgaANSAFeedParser(NITFFeedParser):
+
+class BelgaANSAFeedParser(ParseContextMixin, NITFFeedParser):
     """
     Feed Parser which can parse if the feed is in ANSA News format.
     """
@@ -39,10 +41,6 @@ class BelgaANSAFeedParser(NITFFeedParser):
         "NS042": "English Media Service",
     }
 
-    def __init__(self):
-        super().__init__()
-        self._provider = None
-
     def can_parse(self, xml):
         return xml.tag.endswith("nitf")
 
@@ -53,8 +51,9 @@ class BelgaANSAFeedParser(NITFFeedParser):
             etree.tostring(xml, encoding="unicode"),
             parser=etree.XMLParser(remove_comments=True),
         )
-        item = super().parse(uncommented_xml, provider)
-        self.meta_parse(uncommented_xml, item)
+        with self.new_parse_context(provider):
+            item = super().parse(uncommented_xml, provider)
+            self.meta_parse(uncommented_xml, item)
         return item
 
     def meta_parse(self, xml, item):
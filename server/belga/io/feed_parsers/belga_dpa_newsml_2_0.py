@@ -21,6 +21,7 @@ from superdesk.errors import ParserError
 from superdesk.metadata.item import CONTENT_TYPE
 
 from .belga_newsml_mixin import BelgaNewsMLMixin
+from .parse_context import ParseContextMixin
 from superdesk import get_resource_service
 
 logger = logging.getLogger(__name__)
@@ -30,7 +31,7 @@ NS = {
 }
 
 
-class BelgaDPANewsMLTwoFeedParser(BelgaNewsMLMixin, NewsMLTwoFeedParser):
+class BelgaDPANewsMLTwoFeedParser(ParseContextMixin, BelgaNewsMLMixin, NewsMLTwoFeedParser):
     """
     Feed Parser which can parse DPA variant of NewsML
     """
@@ -53,97 +54,98 @@ class BelgaDPANewsMLTwoFeedParser(BelgaNewsMLMixin, NewsMLTwoFeedParser):
         return xml.tag.endswith("newsMessage")
 
     def parse(self, xml, provider=None):
-        self.root = xml
-        items = []
-        try:
-            for item_set in xml.findall(self.qname("itemSet")):
-                for item_tree in item_set:
-                    item = self.parse_item(item_tree)
-                    try:
-                        published = item_tree.xpath(
-                            ".//xhtml:body/xhtml:header/"
-                            'xhtml:time[@class="publicationDate"]/@data-datetime',
-                            namespaces=NS,
-                        )[0]
-                    except IndexError:
-                        item["firstcreated"] = item["versioncreated"]
-                    else:
-                        item["firstcreated"] = dateutil.parser.parse(published)
-                    item["firstcreated"] = item["firstcreated"].astimezone(pytz.utc)
-                    item["versioncreated"] = item["versioncreated"].astimezone(pytz.utc)
+        with self.new_parse_context(provider):
+            self.root = xml
+            items = []
+            try:
+                for item_set in xml.findall(self.qname("itemSet")):
+                    for item_tree in item_set:
+                        item = self.parse_item(item_tree)
+                        try:
+                            published = item_tree.xpath(
+                                ".//xhtml:body/xhtml:header/"
+                                'xhtml:time[@class="publicationDate"]/@data-datetime',
+                                namespaces=NS,
+                            )[0]
+                        except IndexError:
+                            item["firstcreated"] = item["versioncreated"]
+                        else:
+                            item["firstcreated"] = dateutil.parser.parse(published)
+                        item["firstcreated"] = item["firstcreated"].astimezone(pytz.utc)
+                        item["versioncreated"] = item["versioncreated"].astimezone(pytz.utc)
 
-                    if item["urgency"] == 4:
-                        item["urgency"] = 3
+                        if item["urgency"] == 4:
+                            item["urgency"] = 3
 
-                    # mapping services-products
-                    for cat in item.get("anpa_category", []):
-                        qcode = self.MAPPING_CATEGORY.get(
-                            cat.get("qcode", "").upper(), "NEWS/GENERAL"
-                        )
-                        item.setdefault("subject", []).append(
-                            {
-                                "name": qcode,
-                                "qcode": qcode,
-                                "parent": "NEWS",
-                                "scheme": "services-products",
-                            }
-                        )
-                        break
-                    else:
-                        item.setdefault("subject", []).append(
-                            {
-                                "name": "NEWS/GENERAL",
-                                "qcode": "NEWS/GENERAL",
-                                "parent": "NEWS",
-                                "scheme": "services-products",
-                            }
-                        )
+                        # mapping services-products
+                        for cat in item.get("anpa_category", []):
+                            qcode = self.MAPPING_CATEGORY.get(
+                                cat.get("qcode", "").upper(), "NEWS/GENERAL"
+                            )
+                            item.setdefault("subject", []).append(
+                                {
+                                    "name": qcode,
+                                    "qcode": qcode,
+                                    "parent": "NEWS",
+                                    "scheme": "services-products",
+                                }
+                            )
+                            break
+                        else:
+                            item.setdefault("subject", []).append(
+                                {
+                                    "name": "NEWS/GENERAL",
+                                    "qcode": "NEWS/GENERAL",
+                                    "parent": "NEWS",
+                                    "scheme": "services-products",
+                                }
+                            )
 
-                    # Source is DPA
-                    credit = {"name": "DPA", "qcode": "DPA", "scheme": "sources"}
-                    item.setdefault("subject", []).append(credit)
-                    # Distribution is default
-                    dist = {
-                        "name": "default",
-                        "qcode": "default",
-                        "scheme": "distribution",
-                    }
-                    item.setdefault("subject", []).append(dist)
-                    # Slugline and keywords is epmty
-                    item["slugline"] = None
-                    item["keywords"] = []
-                    # Find genres and verify their roles and qcodes to acceptance criteria.
-                    genres = item_tree.xpath("//iptc:genre", namespaces=NS)
-                    for genre in genres:
-                        genre_qcode = genre.get("qcode")
-                        if genre_qcode and genre_qcode != "dpatextgenre:1":
-                            genre_names = genre.findall(self.qname("name"))
-                            if genre_names:
-                                for genre_name in genre_names:
-                                    try:
-                                        genre_role = genre_name.attrib["role"]
-                                        if genre_role == "nrol:display":
-                                            item[
-                                                "headline"
-                                            ] = "({genre}): {headline}".format(
-                                                genre=genre_name.text,
-                                                headline=item["headline"],
-                                            )
-                                            break
-                                    except KeyError:
-                                        continue
+                        # Source is DPA
+                        credit = {"name": "DPA", "qcode": "DPA", "scheme": "sources"}
+                        item.setdefault("subject", []).append(credit)
+                        # Distribution is default
+                        dist = {
+                            "name": "default",
+                            "qcode": "default",
+                            "scheme": "distribution",
+                        }
+                        item.setdefault("subject", []).append(dist)
+                        # Slugline and keywords is epmty
+                        item["slugline"] = None
+                        item["keywords"] = []
+                        # Find genres and verify their roles and qcodes to acceptance criteria.
+                        genres = item_tree.xpath("//iptc:genre", namespaces=NS)
+                        for genre in genres:
+                            genre_qcode = genre.get("qcode")
+                            if genre_qcode and genre_qcode != "dpatextgenre:1":
+                                genre_names = genre.findall(self.qname("name"))
+                                if genre_names:
+                                    for genre_name in genre_names:
+                                        try:
+                                            genre_role = genre_name.attrib["role"]
+                                            if genre_role == "nrol:display":
+                                                item[
+                                                    "headline"
+                                                ] = "({genre}): {headline}".format(
+                                                    genre=genre_name.text,
+                                                    headline=item["headline"],
+                                                )
+                                                break
+                                        except KeyError:
+                                            continue
 
-                    # remove duplicated subject
-                    item["subject"] = [
-                        dict(i)
-                        for i, _ in itertools.groupby(
-                            sorted(item["subject"], key=lambda k: k["qcode"])
-                        )
-                    ]
-                    items.append(item)
-            return items
-        except Exception as ex:
-            raise ParserError.newsmlTwoParserError(ex, provider)
+                        # remove duplicated subject
+                        item["subject"] = [
+                            dict(i)
+                            for i, _ in itertools.groupby(
+                                sorted(item["subject"], key=lambda k: k["qcode"])
+                            )
+                        ]
+                        items.append(item)
+                return items
+            except Exception as ex:
+                raise ParserError.newsmlTwoParserError(ex, provider)
 
     def parse_header(self, tree):
         """Parse header element.
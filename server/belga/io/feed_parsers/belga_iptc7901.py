@@ -19,10 +19,16 @@ from superdesk.metadata.utils import generate_guid
 from superdesk.metadata.item import ITEM_TYPE, CONTENT_TYPE, GUID_TAG
 from superdesk.utc import utcnow
 
+from . import sniffer
+from .parse_context import ParseContextMixin, context_attribute
+
 logger = logging.getLogger(__name__)
 
+ATS_HEADER_RE = re.compile(b'\x7f\x01([a-zA-Z]*)([0-9]*) (.) ([A-Z]{1,3}) ([0-9]*) ([a-zA-Z0-9 ]*)', flags=re.I)
+DPA_HEADER_RE = re.compile(b'([a-zA-Z]*)([0-9]*) (.) ([A-Z]{1,3}) ([0-9]*) ([a-zA-Z0-9 ]*)', flags=re.I)
+
 
-class BelgaIPTC7901FeedParser(DPAIPTC7901FeedParser):
+class BelgaIPTC7901FeedParser(ParseContextMixin, DPAIPTC7901FeedParser):
     """
     Feed Parser which can parse if the feed is in IPTC 7901 format.
     """
@@ -35,7 +41,7 @@ class BelgaIPTC7901FeedParser(DPAIPTC7901FeedParser):
         'dpa': (b'([a-zA-Z]*)([0-9]*) (.) ([A-Z]{1,3}) ([0-9]*) ([a-zA-Z0-9 ]*)', [' =\n']),
         'ats': (b'(\x7f\x7f|\x7f)', [' = \r\n']),
     }
-    txt_type = None
+    txt_type = context_attribute('txt_type')
 
     MAPPING_PRODUCTS = {
         'ats': {
@@ -55,41 +61,45 @@ class BelgaIPTC7901FeedParser(DPAIPTC7901FeedParser):
 
     def can_parse(self, file_path):
         try:
-            BelgaIPTC7901FeedParser.txt_type = None
-            with open(file_path, 'rb') as f:
-                lines = list(f)
-                for _type, regex in self.types.items():
-                    check_type = re.match(regex[0], lines[0], flags=re.I)
-                    if check_type:
-                        BelgaIPTC7901FeedParser.txt_type = _type
-                        return check_type
+            return self.get_txt_type(file_path) is not None
         except Exception:
             return False
 
+    def get_txt_type(self, file_path):
+        """Get the type of the file (one of ``types``) based on its first line."""
+        return sniffer.sniff(file_path, self.NAME, self._sniff_txt_type)
+
+    def _sniff_txt_type(self, header):
+        line = sniffer.first_line(header)
+        for _type, regex in self.types.items():
+            if re.match(regex[0], line, flags=re.I):
+                return _type
+
     def parse(self, file_path, provider=None):
-        item = {}
-        _type = BelgaIPTC7901FeedParser.txt_type
-        if _type == 'dpa':
-            item = self.parse_content_dpa(file_path, provider)
-        if _type == 'ats':
-            item = self.parse_content_ats(file_path, provider)
-        # Slugline and keywords is epmty
-        item['slugline'] = None
-        item['keywords'] = []
-        item = self.dpa_derive_dateline(item)
-        # Markup the text and set the content type
-        item['body_html'] = '<p>' + item['body_html'].replace('\r\n', ' ').replace('\n', '</p><p>') + '</p>'
-
-        invalid_xmlchars = {
-            '&': '&amp;', '<': '&lt;', '>': '&gt;', '\u0007': ' ', '\u0003': ' ', '\u0004': ' ', '\u001f': ' '
-        }
-        for char, replace_char in invalid_xmlchars.items():
-            item['body_html'].replace(char, replace_char)
-            item['headline'].replace(char, replace_char)
-            item.get('lead', '').replace(char, replace_char)
-
-        item[ITEM_TYPE] = CONTENT_TYPE.TEXT
-        return item
+        with self.new_parse_context(provider):
+            item = {}
+            _type = self.txt_type = self.get_txt_type(file_path)
+            if _type == 'dpa':
+                item = self.parse_content_dpa(file_path, provider)
+            if _type == 'ats':
+                item = self.parse_content_ats(file_path, provider)
+            # Slugline and keywords is epmty
+            item['slugline'] = None
+            item['keywords'] = []
+            item = self.dpa_derive_dateline(item)
+            # Markup the text and set the content type
+            item['body_html'] = '<p>' + item['body_html'].replace('\r\n', ' ').replace('\n', '</p><p>') + '</p>'
+
+            invalid_xmlchars = {
+                '&': '&amp;', '<': '&lt;', '>': '&gt;', '\u0007': ' ', '\u0003': ' ', '\u0004': ' ', '\u001f': ' '
+            }
+            for char, replace_char in invalid_xmlchars.items():
+                item['body_html'].replace(char, replace_char)
+                item['headline'].replace(char, replace_char)
+                item.get('lead', '').replace(char, replace_char)
+
+            item[ITEM_TYPE] = CONTENT_TYPE.TEXT
+            return item
 
     def parse_content_ats(self, file_path, provider=None):
         try:
@@ -100,11 +110,12 @@ class BelgaIPTC7901FeedParser(DPAIPTC7901FeedParser):
                 'language': 'fr',
             }
 
-            with open(file_path, 'rb') as f:
-                lines = list(f)
+            with sniffer.map_file(file_path) as buf:
+                buf.readline()
+                rest = buf[buf.tell():]
 
             # parse first header line
-            m = re.match(b'\x7f\x01([a-zA-Z]*)([0-9]*) (.) ([A-Z]{1,3}) ([0-9]*) ([a-zA-Z0-9 ]*)', lines[1], flags=re.I)
+            m = ATS_HEADER_RE.match(rest)
             if m:
                 qcode = m.group(4).decode().upper()
                 item['original_source'] = m.group(1).decode('latin-1', 'replace')
@@ -124,7 +135,11 @@ class BelgaIPTC7901FeedParser(DPAIPTC7901FeedParser):
                 ])
                 item['word_count'] = int(m.group(5).decode())
 
-            content = b'\n'.join(lines[1:]).decode('latin-1', 'replace')
+            # lines were always joined with an extra line break, keep it as it separates the abstract
+            content = rest.replace(b'\n', b'\n\n')
+            if rest.endswith(b'\n'):
+                content = content[:-1]
+            content = content.decode('latin-1', 'replace')
             header = re.search(r'.*=', content)
             item['headline'] = header.group(0).strip() if header else ''
 
@@ -147,10 +162,10 @@ class BelgaIPTC7901FeedParser(DPAIPTC7901FeedParser):
             item = {ITEM_TYPE: CONTENT_TYPE.TEXT, 'guid': generate_guid(type=GUID_TAG),
                     'versioncreated': utcnow()}
 
-            with open(file_path, 'rb') as f:
-                lines = list(f)
-            # parse first header line
-            m = re.match(b'([a-zA-Z]*)([0-9]*) (.) ([A-Z]{1,3}) ([0-9]*) ([a-zA-Z0-9 ]*)', lines[0], flags=re.I)
+            with sniffer.map_file(file_path) as buf:
+                # parse first header line
+                m = DPA_HEADER_RE.match(buf.readline())
+                self._parse_lines_dpa(item, iter(buf.readline, b''))
             if m:
                 qcode = m.group(4).decode().upper()
                 item['original_source'] = m.group(1).decode('latin-1', 'replace')
@@ -173,67 +188,74 @@ class BelgaIPTC7901FeedParser(DPAIPTC7901FeedParser):
                 item.setdefault('subject', []).append(dist)
                 item['word_count'] = int(m.group(5).decode())
 
-            inHeader = False
-            inBody = False
-            inNote = False
-            line_count = 0
-            item['headline'] = ''
-            item['body_html'] = ''
-            # start check each line for get information
-            for line in lines[1:]:
-                line = line.decode('latin-1', 'replace')
-                line_count += 1
-                # slugline is before the header
-                if line_count < 3:
-                    if 'slugline' not in item:
-                        item['slugline'] = ''
-                    item['slugline'] += line.rstrip('/\r\n')
+            return item
+        except Exception as ex:
+            raise ParserError.IPTC7901ParserError(exception=ex, provider=provider)
+
+    def _parse_lines_dpa(self, item, lines):
+        """Parse slugline, header, body and editorial note from lines following the first header line."""
+        inHeader = False
+        inBody = False
+        inNote = False
+        line_count = 0
+        item['headline'] = ''
+        body = []
+        ednote = None
+        # start check each line for get information
+        for line in lines:
+            line = line.decode('latin-1', 'replace')
+            line_count += 1
+            # slugline is before the header
+            if line_count < 3:
+                if 'slugline' not in item:
+                    item['slugline'] = ''
+                item['slugline'] += line.rstrip('/\r\n')
+                continue
+            # dpa start header when line number is 3
+            if line_count == 3:
+                inHeader = True
+            if inHeader is True:
+                if str.isupper(line):
+                    if 'anpa_take_key' in item:
+                        item['anpa_take_key'] += " " + line.rstrip('\n')
+                    else:
+                        item['anpa_take_key'] = line.rstrip('\n')
                     continue
-                # dpa start header when line number is 3
-                if line_count == 3:
-                    inHeader = True
-                if inHeader is True:
-                    if str.isupper(line):
-                        if 'anpa_take_key' in item:
-                            item['anpa_take_key'] += " " + line.rstrip('\n')
-                        else:
-                            item['anpa_take_key'] = line.rstrip('\n')
-                        continue
-                    if line.startswith('(') or line.endswith(')'):
-                        if 'anpa_header' in item:
-                            item['anpa_header'] += " " + line
-                        else:
-                            item['anpa_header'] = line
-                        continue
-                    # dpa end header when line end with especially characters (ex '=\r\n')
-                    end_string = self.check_mendwith(line, self.types[BelgaIPTC7901FeedParser.txt_type][1])
-                    if end_string:
-                        if line.startswith('By '):
-                            item['byline'] = line.replace('By ', '').rstrip(end_string)
-                        else:
-                            item['headline'] += line.rstrip(end_string)
-                        inHeader = False
-                        # set flag inBody when header is end
-                        inBody = True
+                if line.startswith('(') or line.endswith(')'):
+                    if 'anpa_header' in item:
+                        item['anpa_header'] += " " + line
                     else:
-                        item['headline'] += line
-                        inHeader = True
+                        item['anpa_header'] = line
                     continue
-                # dpa start body when the header is end
-                if inBody:
-                    if line.find('The following information is not for publication') != -1 or \
-                            line.find('The following information is not intended for publication') != -1:
-                        inNote = True
-                        inBody = False
-                        item['ednote'] = ''
-                        continue
-                    item['body_html'] += line
-                if inNote:
-                    item['ednote'] += line
+                # dpa end header when line end with especially characters (ex '=\r\n')
+                end_string = self.check_mendwith(line, self.types[self.txt_type][1])
+                if end_string:
+                    if line.startswith('By '):
+                        item['byline'] = line.replace('By ', '').rstrip(end_string)
+                    else:
+                        item['headline'] += line.rstrip(end_string)
+                    inHeader = False
+                    # set flag inBody when header is end
+                    inBody = True
+                else:
+                    item['headline'] += line
+                    inHeader = True
+                continue
+            # dpa start body when the header is end
+            if inBody:
+                if line.find('The following information is not for publication') != -1 or \
+                        line.find('The following information is not intended for publication') != -1:
+                    inNote = True
+                    inBody = False
+                    ednote = []
                     continue
-            return item
-        except Exception as ex:
-            raise ParserError.IPTC7901ParserError(exception=ex, provider=provider)
+                body.append(line)
+            if inNote:
+                ednote.append(line)
+                continue
+        item['body_html'] = ''.join(body)
+        if ednote is not None:
+            item['ednote'] = ''.join(ednote)
 
     def check_mendwith(self, string, end_strings):
         for end_string in end_strings:
@@ -250,7 +272,7 @@ class BelgaIPTC7901FeedParser(DPAIPTC7901FeedParser):
         item['headline'] = ''
         headers, divider, the_rest = self.mpartition(
             item.get('body_html', ''),
-            self.types[BelgaIPTC7901FeedParser.txt_type][1]
+            self.types[self.txt_type][1]
         )
         # If no divider then there was only one line and that is the headline so clean up the stray '='
         if not divider:
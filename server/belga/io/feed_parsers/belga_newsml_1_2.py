@@ -33,6 +33,7 @@ from superdesk.utc import local_to_utc
 from superdesk.metadata.item import ITEM_TYPE, CONTENT_TYPE
 
 from .base_belga_newsml_1_2 import BaseBelgaNewsMLOneFeedParser, SkipItemException
+from .parse_context import context_attribute
 
 
 logger = logging.getLogger(__name__)
@@ -61,9 +62,8 @@ class BelgaNewsMLOneFeedParser(BaseBelgaNewsMLOneFeedParser):
     SUPPORTED_BINARY_ASSET_SUBTYPES = ("SOUND", "CLIP", "COMPONENT", "IMAGE")
     MOVE_FILE = False
 
-    def __init__(self):
-        super().__init__()
-        self._provider = None
+    _items = context_attribute("items")
+    _item_seed = context_attribute("item_seed")
 
     def can_parse(self, xml):
         """
@@ -106,26 +106,23 @@ class BelgaNewsMLOneFeedParser(BaseBelgaNewsMLOneFeedParser):
         :return:
         """
 
-        self._provider = provider
-        if self._provider is None:
-            self._provider = {}
-
-        try:
-            self.root = xml
-            self._items = []
-            self._item_seed = {}
-            # parser the NewsEnvelope element
-            self._item_seed.update(self.parse_newsenvelop(xml.find("NewsEnvelope")))
-            # parser the NewsItem element
-            for newsitem_el in xml.findall("NewsItem"):
-                try:
-                    self.parse_newsitem(newsitem_el)
-                except SkipItemException:
-                    continue
-
-            return self._items
-        except Exception as ex:
-            raise ParserError.newsmlOneParserError(ex, self._provider)
+        with self.new_parse_context(provider):
+            try:
+                self.root = xml
+                self._items = []
+                self._item_seed = {}
+                # parser the NewsEnvelope element
+                self._item_seed.update(self.parse_newsenvelop(xml.find("NewsEnvelope")))
+                # parser the NewsItem element
+                for newsitem_el in xml.findall("NewsItem"):
+                    try:
+                        self.parse_newsitem(newsitem_el)
+                    except SkipItemException:
+                        continue
+
+                return self._items
+            except Exception as ex:
+                raise ParserError.newsmlOneParserError(ex, self._provider)
 
     def parse_newsenvelop(self, envelop_el):
         """
@@ -949,7 +946,7 @@ class BelgaNewsMLOneFeedParser(BaseBelgaNewsMLOneFeedParser):
         file_dir = os.path.join(path, "attachments")
         file_path = os.path.join(file_dir, filename)
         try:
-            if self._provider.get("feeding_service") == "ftp":
+            if self._provider.get("feeding_service") in ("ftp", "ftp-belga"):
                 file_path = self._download_file(filename, file_path, config)
             with open(file_path, "rb") as f:
                 content = f.read()
@@ -968,7 +965,7 @@ class BelgaNewsMLOneFeedParser(BaseBelgaNewsMLOneFeedParser):
             return tmp_dir
 
     def _move_file(self, file_dir, filename, config):
-        if self._provider.get("feeding_service") == "ftp":
+        if self._provider.get("feeding_service") in ("ftp", "ftp-belga"):
             with ftp_connect(config) as ftp:
                 if config.get("move", False):
                     ftp_service = FTPFeedingService()
@@ -65,25 +65,35 @@ class BelgaSpreadsheetParser(FeedParser):
         except ParserError:
             return False
 
-    def parse(self, data, provider=None):
+    def parse(self, data, provider=None, rows=None):
+        """Parse spreadsheet rows into events.
+
+        :param data: list of rows values, first row contains titles
+        :param provider: ingest provider
+        :param rows: numbers of rows to parse, counting from 1, all rows are parsed by default
+        :return: tuple of items and list of status cells to update
+        """
         index = self.parse_titles(data[0])
         items = []
         cells_list = []  # use for patch update to reduce write requests usage
-        # skip first two title rows
-        for row in range(3, len(data) + 1):
+        if rows is None:
+            # skip first two title rows
+            rows = range(3, len(data) + 1)
+        existing_guids = self._get_existing_guids(data, index, rows)
+        for row in rows:
             if not row:
                 break
             item = {}
             error_message = None
             values = data[row - 1]
-            is_updated = values[index['_STATUS']].strip().upper() if len(values) - 1 > index['_STATUS'] else None
+            is_updated = self._get_status(values, index)
 
             try:
                 # only insert item if _STATUS is empty
                 if is_updated in ('UPDATED', 'ERROR'):
                     guid = values[index['_GUID']]
                     # check if it's exists and guid is valid
-                    if not superdesk.get_resource_service('events').find_one(guid=guid, req=None):
+                    if guid not in existing_guids:
                         raise KeyError('GUID is not exists')
                 else:
                     guid = generate_guid(type=GUID_NEWSML)
@@ -200,6 +210,21 @@ class BelgaSpreadsheetParser(FeedParser):
                 items.append(item)
         return items, cells_list
 
+    def _get_status(self, values, index):
+        return values[index['_STATUS']].strip().upper() if len(values) - 1 > index['_STATUS'] else None
+
+    def _get_existing_guids(self, data, index, rows):
+        """Find guids of existing events for updated rows using a single query."""
+        guids = set()
+        for row in rows:
+            values = data[row - 1]
+            if self._get_status(values, index) in ('UPDATED', 'ERROR') and len(values) > index['_GUID']:
+                guids.add(values[index['_GUID']])
+        if not guids:
+            return set()
+        events = superdesk.get_resource_service('events').find({'guid': {'$in': list(guids)}})
+        return {event['guid'] for event in events}
+
     def parse_titles(self, titles):
         """Lookup title columns and return dictionary of titles index
         """
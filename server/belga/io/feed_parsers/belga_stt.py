@@ -12,8 +12,10 @@
 from superdesk.io.registry import register_feed_parser
 from superdesk.io.feed_parsers.stt_newsml import STTNewsMLFeedParser
 
+from .parse_context import ParseContextMixin
 
-class BelgaSTTFeedParser(STTNewsMLFeedParser):
+
+class BelgaSTTFeedParser(ParseContextMixin, STTNewsMLFeedParser):
     """
     Feed Parser which can parse if the feed is in STT News Ml format.
     """
@@ -21,15 +23,12 @@ class BelgaSTTFeedParser(STTNewsMLFeedParser):
     NAME = "belga_stt_newsml"
     label = "Belga STT News ML"
 
-    def __init__(self):
-        super().__init__()
-        self._provider = None
-
     def can_parse(self, xml):
         return xml.tag.endswith("newsItem")
 
     def parse(self, xml, provider=None):
-        items = super().parse(xml, provider)
+        with self.new_parse_context(provider):
+            items = super().parse(xml, provider)
         for item in items:
             if item.get("abstract"):
                 abstract = "<p>" + item["abstract"] + "</p>"
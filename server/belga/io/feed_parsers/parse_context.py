@@ -0,0 +1,85 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+import threading
+from contextlib import contextmanager
+
+
+class ParseContext:
+    """State of a single ``parse`` call."""
+
+    def __init__(self, provider=None, **kwargs):
+        self.provider = provider if provider is not None else {}
+        self.__dict__.update(kwargs)
+
+
+class context_attribute:
+    """Parser attribute which is stored on the current :class:`ParseContext`.
+
+    :param name: name of the attribute in the context
+    :param default: value returned when it was not set in the context yet
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.default = default
+
+    def __get__(self, parser, owner=None):
+        if parser is None:
+            return self
+        return getattr(parser.parse_context, self.name, self.default)
+
+    def __set__(self, parser, value):
+        setattr(parser.parse_context, self.name, value)
+
+
+class ParseContextMixin:
+    """Keeps per-parse state of a feed parser out of the parser instance.
+
+    Feed parsers are registered as singletons, so any state stored on ``self``
+    during ``parse`` is shared between all the files parsed by the process.
+    Attributes declared with :class:`context_attribute` are stored on a
+    :class:`ParseContext` instead, which is local to the current thread and
+    pushed for every ``parse`` call by :meth:`new_parse_context`, so a single
+    parser instance can parse several files at the same time, and ``parse``
+    can be called again from within ``parse``.
+    """
+
+    root = context_attribute("root")
+    _provider = context_attribute("provider")
+
+    def __init__(self, *args, **kwargs):
+        self._local = threading.local()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def parse_context(self):
+        stack = self._get_context_stack()
+        if not stack:
+            # attributes set outside of ``parse`` (e.g. in ``__init__``)
+            stack.append(ParseContext())
+        return stack[-1]
+
+    @contextmanager
+    def new_parse_context(self, provider=None, **kwargs):
+        stack = self._get_context_stack()
+        context = ParseContext(provider, **kwargs)
+        stack.append(context)
+        try:
+            yield context
+        finally:
+            stack.pop()
+
+    def _get_context_stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
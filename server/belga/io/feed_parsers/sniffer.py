@@ -0,0 +1,105 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Format sniffing for text based feed parsers.
+
+``can_parse`` only needs the first line of a file to detect its format, so
+only a small header is read from disk. The header and the detected formats
+are cached until the file is mapped to memory by ``parse``, so parsers can
+run regular expressions on the content without copying it first.
+"""
+
+import os
+import mmap
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+HEADER_SIZE = 1024
+CACHE_SIZE = 128
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+class SniffedFile:
+    """Header of a file and formats detected from it."""
+
+    def __init__(self, header):
+        self.header = header
+        self.formats = {}
+
+
+def sniff(file_path, name, detect):
+    """Detect format of the file using its header.
+
+    Result is cached, so it's computed only once for both ``can_parse`` and ``parse``.
+
+    :param file_path: path of the file
+    :param name: name of the detection (e.g. parser name)
+    :param detect: callable getting the header bytes and returning the format
+    :return: detected format
+    """
+    sniffed = _get_sniffed(file_path)
+    if name not in sniffed.formats:
+        sniffed.formats[name] = detect(sniffed.header)
+    return sniffed.formats[name]
+
+
+def read_header(file_path):
+    """Return first ``HEADER_SIZE`` bytes of the file."""
+    return _get_sniffed(file_path).header
+
+
+@contextmanager
+def map_file(file_path):
+    """Map the file to memory for reading.
+
+    The mapping supports both ``readline`` and the buffer protocol, so it can be used
+    with compiled regular expressions directly. Cached header of the file is dropped.
+
+    :param file_path: path of the file
+    :raises ValueError: for an empty file
+    """
+    key = _get_key(file_path)
+    with _lock:
+        _cache.pop(key, None)
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def first_line(header):
+    """Return first line of the header including the line separator."""
+    return header[:header.find(b'\n') + 1] or header
+
+
+def _get_sniffed(file_path):
+    key = _get_key(file_path)
+    with _lock:
+        sniffed = _cache.get(key)
+        if sniffed is not None:
+            _cache.move_to_end(key)
+            return sniffed
+
+    with open(file_path, 'rb') as f:
+        sniffed = SniffedFile(f.read(HEADER_SIZE))
+
+    with _lock:
+        _cache[key] = sniffed
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return sniffed
+
+
+def _get_key(file_path):
+    # file may be replaced by a new one with the same name
+    stat = os.stat(file_path)
+    return file_path, stat.st_mtime_ns, stat.st_size
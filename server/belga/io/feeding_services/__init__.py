@@ -1,4 +1,6 @@
 from . import rss_belga  # noqa
 from . import spreadsheet
 from . import email_belga  # noqa
+from . import file_belga  # noqa
+from . import ftp_belga  # noqa
 from . import twitter_belga  # noqa
\ No newline at end of file
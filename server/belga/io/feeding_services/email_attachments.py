@@ -0,0 +1,179 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013, 2014 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Storage of email attachments.
+
+Attachment payload is decoded in chunks into a spooled temporary file, so
+large attachments are not kept in memory in several copies, and it's hashed
+meanwhile. The hash is stored in indexed ``sha256`` field of attachment and
+used to reuse existing media when the same file is received again, every
+item still gets its own attachment.
+"""
+
+import json
+import hashlib
+import logging
+import binascii
+import tempfile
+
+import magic
+from flask import current_app as app
+from superdesk import get_resource_service
+from superdesk.media.media_operations import process_file_from_stream
+
+logger = logging.getLogger(__name__)
+
+RESOURCE = 'attachments'
+
+# encoded characters decoded at once
+CHUNK_SIZE = 64 * 1024
+
+# attachments bigger than this are spooled to disk
+SPOOL_SIZE = 1024 * 1024
+
+# metadata is extracted only for these types, other files are stored as they are
+MEDIA_TYPES = ('image', 'audio', 'video')
+
+HASH_METADATA = 'sha256'
+HASH_FIELD = 'sha256'
+
+
+def init_app(app):
+    config = app.config['DOMAIN'].get(RESOURCE)
+    if not config:
+        return
+    config['schema'][HASH_FIELD] = {'type': 'string', 'readonly': True}
+    config.setdefault('mongo_indexes__init', {})['{}_1'.format(HASH_FIELD)] = ([(HASH_FIELD, 1)], {'sparse': True})
+
+
+def save_attachment(part, filename):
+    """Store attachment from email part, reusing existing media with same content.
+
+    :param part: email message part with the attachment
+    :param filename: attachment filename
+    :return: attachment id
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as content:
+        digest, length = decode_payload(part, content)
+        content.seek(0)
+
+        media_id = find_media(digest, length)
+        if media_id:
+            logger.info('Reusing media {} for {}'.format(media_id, filename))
+            stored = False
+        else:
+            content_type, metadata = get_media_info(content, part.get_content_type(), length)
+            metadata[HASH_METADATA] = digest
+            content.seek(0)
+            media_id = app.media.put(content,
+                                     filename=filename,
+                                     content_type=content_type,
+                                     metadata=metadata,
+                                     resource=RESOURCE)
+            stored = True
+
+    try:
+        ids = get_resource_service(RESOURCE).post([{
+            "media": media_id,
+            "filename": filename,
+            "title": 'attachment',
+            "description": "email's attachment",
+            HASH_FIELD: digest,
+        }])
+    except Exception:
+        if stored:
+            app.media.delete(media_id, RESOURCE)
+        raise
+    return next(iter(ids), None)
+
+
+def find_media(digest, length):
+    """Find stored media of attachment with given content.
+
+    Attachment is found using indexed hash field, length is checked
+    to avoid reusing media of other size.
+    """
+    attachment = get_resource_service(RESOURCE).find_one(req=None, **{HASH_FIELD: digest})
+    if attachment and attachment.get('length') == length and attachment.get('media'):
+        if app.media.get(attachment['media'], RESOURCE):
+            return attachment['media']
+
+
+def get_media_info(content, content_type, length):
+    """Get content type and metadata for media storage.
+
+    Only media files are processed in full, for other files content type
+    is detected from the beginning of the file.
+    """
+    if not content_type or 'application/' in content_type:
+        content_type = str(magic.from_buffer(content.read(2048), mime=True))
+        content.seek(0)
+
+    if content_type.split('/')[0] in MEDIA_TYPES:
+        _file_name, content_type, metadata = process_file_from_stream(content, content_type)
+        return content_type, metadata
+    return content_type, {'length': json.dumps(length)}
+
+
+def decode_payload(part, out):
+    """Decode payload of the part into ``out`` file in chunks.
+
+    :param part: email message part
+    :param out: writable binary file
+    :return: tuple of hex sha256 digest and length of decoded payload
+    """
+    sha256 = hashlib.sha256()
+    length = 0
+    for chunk in _iter_decoded(part):
+        sha256.update(chunk)
+        out.write(chunk)
+        length += len(chunk)
+    return sha256.hexdigest(), length
+
+
+def _iter_decoded(part):
+    payload = part.get_payload()
+    encoding = str(part.get('content-transfer-encoding', '')).strip().lower()
+    if not isinstance(payload, str) or encoding not in ('base64', 'quoted-printable'):
+        yield part.get_payload(decode=True) or b''
+        return
+
+    try:
+        if encoding == 'base64':
+            yield from _iter_base64(payload)
+        else:
+            yield from _iter_quoted_printable(payload)
+    except (binascii.Error, ValueError, UnicodeEncodeError):
+        # let email package handle invalid payloads
+        logger.warning('Invalid {} payload, decoding it at once'.format(encoding))
+        yield part.get_payload(decode=True) or b''
+
+
+def _iter_base64(payload):
+    rest = ''
+    for start in range(0, len(payload), CHUNK_SIZE):
+        data = rest + ''.join(payload[start:start + CHUNK_SIZE].split())
+        # decode only complete quanta, keep the rest for next chunk
+        end = len(data) - len(data) % 4
+        rest = data[end:]
+        if end:
+            yield binascii.a2b_base64(data[:end].encode('ascii'))
+    if rest.strip('='):
+        yield binascii.a2b_base64((rest + '=' * (-len(rest) % 4)).encode('ascii'))
+
+
+def _iter_quoted_printable(payload):
+    start = 0
+    while start < len(payload):
+        # split on line ends so soft line breaks are decoded correctly
+        end = payload.find('\n', start + CHUNK_SIZE)
+        end = len(payload) if end == -1 else end + 1
+        yield binascii.a2b_qp(payload[start:end].encode('raw-unicode-escape'))
+        start = end
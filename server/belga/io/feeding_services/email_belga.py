@@ -7,21 +7,24 @@
 # For the full copyright and license information, please see the
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
+import re
 import socket
 import email
 import imaplib
-import io
 import logging
 from flask import current_app as app
-from superdesk.media.media_operations import process_file_from_stream
 from superdesk.io.feeding_services import EmailFeedingService
 from superdesk.io.feed_parsers.rfc822 import EMailRFC822FeedParser
 from superdesk.io.registry import register_feeding_service, register_feeding_service_parser
 from superdesk.errors import IngestEmailError
-from superdesk import get_resource_service
+
+from .imap_pool import connection_pool
+from . import email_attachments
 
 logger = logging.getLogger(__name__)
 
+UID_RE = re.compile(rb'\bUID (\d+)')
+
 
 class EmailBelgaFeedingService(EmailFeedingService):
     NAME = 'email-belga'
@@ -62,47 +65,28 @@ class EmailBelgaFeedingService(EmailFeedingService):
         {
             'id': 'filter', 'type': 'text', 'label': 'Filter',
             'placeholder': 'Filter', 'required': True
+        },
+        {
+            'id': 'persistent', 'type': 'boolean', 'label': 'Keep connection open',
+            'required': False
         }
     ]
 
     def _update(self, provider, update, test=False):
         config = provider.get('config', {})
-        server = config.get('server', '')
-        port = int(config.get('port', 993))
         new_items = []
 
         try:
-            try:
-                socket.setdefaulttimeout(app.config.get('EMAIL_TIMEOUT', 10))
-                imap = imaplib.IMAP4_SSL(host=server, port=port)
-            except (socket.gaierror, OSError) as e:
-                raise IngestEmailError.emailHostError(exception=e, provider=provider)
-
-            try:
-                imap.login(config.get('user', None), config.get('password', None))
-            except imaplib.IMAP4.error:
-                raise IngestEmailError.emailLoginError(imaplib.IMAP4.error, provider)
+            if config.get('persistent') and not test:
+                # connection is kept open for next updates
+                with connection_pool.connection(provider, self._connect) as imap:
+                    new_items = self._ingest_mailbox(imap, provider)
+                return new_items
 
+            imap = self._connect(provider)
             try:
-                rv, data = imap.select(config.get('mailbox', None), readonly=False)
-                if rv != 'OK':
-                    raise IngestEmailError.emailMailboxError()
                 try:
-                    rv, data = imap.search(None, config.get('filter', '(UNSEEN)'))
-                    if rv != 'OK':
-                        raise IngestEmailError.emailFilterError()
-                    for num in data[0].split():
-                        rv, data = imap.fetch(num, '(RFC822)')
-                        if rv == 'OK' and not test:
-                            try:
-                                parser = self.get_feed_parser(provider, data)
-                                item = parser.parse(data, provider)
-                                if config.get('attachment'):
-                                    self.save_attachment(data, item)
-                                new_items.append(item)
-                                rv, data = imap.store(num, '+FLAGS', '\\Seen')
-                            except IngestEmailError:
-                                continue
+                    new_items = self._ingest_mailbox(imap, provider, test)
                 finally:
                     imap.close()
             finally:
@@ -113,10 +97,115 @@ class EmailBelgaFeedingService(EmailFeedingService):
             raise IngestEmailError.emailError(ex, provider)
         return new_items
 
-    def save_attachment(self, data, items):
+    def _connect(self, provider):
+        """Connect to the server, log in and select the mailbox of the provider."""
+        config = provider.get('config', {})
+        server = config.get('server', '')
+        port = int(config.get('port', 993))
+
+        try:
+            socket.setdefaulttimeout(app.config.get('EMAIL_TIMEOUT', 10))
+            imap = imaplib.IMAP4_SSL(host=server, port=port)
+        except (socket.gaierror, OSError) as e:
+            raise IngestEmailError.emailHostError(exception=e, provider=provider)
+
+        try:
+            imap.login(config.get('user', None), config.get('password', None))
+        except imaplib.IMAP4.error:
+            raise IngestEmailError.emailLoginError(imaplib.IMAP4.error, provider)
+
+        try:
+            rv, data = imap.select(config.get('mailbox', None), readonly=False)
+            if rv != 'OK':
+                raise IngestEmailError.emailMailboxError()
+        except Exception:
+            imap.logout()
+            raise
+        return imap
+
+    def _ingest_mailbox(self, imap, provider, test=False):
+        config = provider.get('config', {})
+        rv, data = imap.uid('search', None, config.get('filter', '(UNSEEN)'))
+        if rv != 'OK':
+            raise IngestEmailError.emailFilterError()
+        uids = sorted(int(uid) for uid in data[0].split())
+        if test:
+            return []
+        return self._ingest_messages(imap, provider, uids)
+
+    def _ingest_messages(self, imap, provider, uids):
+        """Fetch messages in batches of ``BELGA_EMAIL_FETCH_BATCH_SIZE`` and parse them.
+
+        Every batch is fetched by a single FETCH command and all processed
+        messages are flagged as seen by a single STORE command at the end.
+
+        :param imap: connection with selected mailbox
+        :param provider: ingest provider
+        :param uids: UIDs of messages to ingest
+        :return: list of parsed items
+        """
+        config = provider.get('config', {})
+        batch_size = max(1, app.config.get('BELGA_EMAIL_FETCH_BATCH_SIZE', 50))
+        limit = app.config.get('BELGA_EMAIL_FETCH_LIMIT', 500)
+        if limit and len(uids) > limit:
+            logger.info('Provider {}: {} emails to ingest, only first {} are ingested now'.format(
+                provider.get('name'), len(uids), limit))
+            uids = uids[:limit]
+
+        new_items = []
+        processed = []
+        try:
+            for i in range(0, len(uids), batch_size):
+                for uid, data in self._fetch_messages(imap, uids[i:i + batch_size]):
+                    try:
+                        parser = self.get_feed_parser(provider, data)
+                        item = parser.parse(data, provider)
+                        if config.get('attachment'):
+                            self.save_attachment(data, item)
+                        new_items.append(item)
+                        processed.append(uid)
+                    except IngestEmailError:
+                        continue
+        finally:
+            if processed:
+                imap.uid('store', get_uid_set(processed), '+FLAGS', '\\Seen')
+        return new_items
+
+    def _fetch_messages(self, imap, uids):
+        """Fetch messages using a single FETCH command.
+
+        Messages are fetched using ``BODY.PEEK[]`` so those which fail to be processed
+        are not flagged as seen. Servers can send UID before or after the message literal.
+
+        :param imap: connection with selected mailbox
+        :param uids: UIDs of messages to fetch
+        :return: list of ``(uid, data)`` sorted by uid, ``data`` are in the format returned by ``imap.fetch``
         """
-        Given a data email for getting stream of attachment.
+        rv, data = imap.uid('fetch', get_uid_set(uids), '(UID BODY.PEEK[])')
+        if rv != 'OK':
+            logger.error('Fetching emails {} failed: {}'.format(get_uid_set(uids), data))
+            return []
+
+        messages = []
+        for i, response_part in enumerate(data):
+            if not isinstance(response_part, tuple):
+                continue
+            m = UID_RE.search(response_part[0])
+            trailer = data[i + 1] if i + 1 < len(data) and isinstance(data[i + 1], bytes) else b')'
+            if not m:
+                m = UID_RE.search(trailer)
+            if m:
+                messages.append((int(m.group(1)), [response_part, b')']))
+            else:
+                logger.warning('Missing UID in fetch response {}'.format(response_part[0]))
+        messages.sort(key=lambda message: message[0])
+        return messages
 
+    def save_attachment(self, data, items):
+        """Save attachments of the email and link them to text items.
+
+        :param data: email data as returned by ``imap.fetch``
+        :param items: items parsed from the email
         """
         attachments = []
         for response_part in data:
@@ -129,28 +218,13 @@ class EmailBelgaFeedingService(EmailFeedingService):
                     if disposition is not None and disposition.split(';')[0] == 'attachment':
                         fileName = part.get_filename()
                         if bool(fileName):
-                            content = part.get_payload(decode=True)
-                            content = io.BytesIO(content)
-                            res = process_file_from_stream(content, part.get_content_type())
-                            file_name, content_type, metadata = res
-                            content.seek(0)
-                            media_id = app.media.put(content,
-                                                     filename=fileName,
-                                                     content_type=content_type,
-                                                     metadata=metadata,
-                                                     resource='attachments')
                             try:
-                                attachment_service = get_resource_service('attachments')
-                                ids = attachment_service.post([{"media": media_id,
-                                                                "filename": fileName,
-                                                                "title": 'attachment',
-                                                                "description": "email's attachment"
-                                                                }])
-                                if ids:
-                                    attachments.append({'attachment': next(iter(ids), None)})
+                                attachment_id = email_attachments.save_attachment(part, fileName)
                             except Exception as ex:
-                                logger.error("cannot add attachment for %s, %s" % (fileName, ex.args[0]))
-                                app.media.delete(media_id)
+                                logger.error("cannot add attachment for %s, %s" % (fileName, ex))
+                                continue
+                            if attachment_id:
+                                attachments.append({'attachment': attachment_id})
 
                 if attachments:
                     for item in items:
@@ -159,5 +233,20 @@ class EmailBelgaFeedingService(EmailFeedingService):
                             item['ednote'] = 'The story has %s attachment(s)' % str(len(attachments))
 
 
+def get_uid_set(uids):
+    """Get IMAP sequence set for given UIDs, consecutive UIDs are merged into ranges.
+
+    >>> get_uid_set([1, 2, 3, 5, 7, 8])
+    '1:3,5,7:8'
+    """
+    ranges = []
+    for uid in sorted(uids):
+        if ranges and ranges[-1][1] + 1 == uid:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(str(start) if start == end else '{}:{}'.format(start, end) for start, end in ranges)
+
+
 register_feeding_service(EmailBelgaFeedingService)
 register_feeding_service_parser(EmailBelgaFeedingService.NAME, EMailRFC822FeedParser.NAME)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013, 2014 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+import os
+import logging
+
+from superdesk.errors import ParserError
+from superdesk.io.feeding_services import FileFeedingService
+from superdesk.io.registry import register_feeding_service
+from superdesk.notification import push_notification
+from superdesk.utils import get_sorted_files, FileSortAttributes
+
+from belga.io.parse_pool import parse_files
+
+logger = logging.getLogger(__name__)
+
+
+class FileBelgaFeedingService(FileFeedingService):
+    """File feeding service which parses all pending files of the provider in parallel.
+
+    Files are still ingested one by one in the order they were delivered,
+    but parsing of the next files is already running meanwhile.
+    """
+
+    NAME = 'file-belga'
+    label = 'File feed Belga'
+
+    def _update(self, provider, update):
+        self.provider = provider
+        self.path = provider.get('config', {}).get('path', None)
+
+        if not self.path:
+            logger.warning('File Feeding Service {} is configured without path. Please check the configuration'.format(
+                provider['name']))
+            return []
+
+        # get feed parser to fail early if it's not configured
+        self.get_feed_parser(provider)
+
+        file_paths = []
+        for filename in get_sorted_files(self.path, sort_by=FileSortAttributes.created):
+            file_path = os.path.join(self.path, filename)
+            if not os.path.isfile(file_path):
+                continue
+            if not self.is_latest_content(self.get_last_updated(file_path), provider.get('last_updated')):
+                self.move_file(self.path, filename, provider=provider, success=False)
+            elif self.is_empty(file_path):
+                logger.info('Ignoring empty file {}'.format(filename))
+            else:
+                file_paths.append(file_path)
+
+        for result in parse_files(provider, file_paths):
+            filename = os.path.basename(result.file_path)
+            if result.error is not None:
+                self.move_file(self.path, filename, provider=provider, success=False)
+                raise ParserError.parseFileError(
+                    '{}-{}'.format(provider['name'], self.NAME), filename, Exception(result.error), provider)
+
+            try:
+                for item in result.items:
+                    self.after_extracting(item, provider)
+                failed = yield result.items
+                self.move_file(self.path, filename, provider=provider, success=not failed)
+            except Exception as ex:
+                raise ParserError.parseFileError('{}-{}'.format(provider['name'], self.NAME), filename, ex, provider)
+
+        push_notification('ingest:update')
+
+
+register_feeding_service(FileBelgaFeedingService)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013, 2014 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+import os
+import ftplib
+import logging
+import tempfile
+from datetime import datetime
+
+from flask import current_app as app
+from superdesk.errors import IngestFtpError
+from superdesk.ftp import ftp_connect
+from superdesk.io.feeding_services import FTPFeedingService
+from superdesk.io.feeding_services.ftp import EmptyFile
+from superdesk.io.registry import register_feeding_service
+from superdesk.utc import utc
+
+from belga.io.parse_pool import parse_files
+
+logger = logging.getLogger(__name__)
+
+
+class FTPBelgaFeedingService(FTPFeedingService):
+    """FTP feeding service which downloads pending files first and then parses them in parallel.
+
+    Items are still ingested file by file in the order of the last modification
+    of the files, so ``last_processed_file_modify`` keeps working the same way.
+    """
+
+    NAME = 'ftp-belga'
+    label = 'FTP feed Belga'
+
+    def _update(self, provider, update):
+        config = provider.get('config', {})
+        do_move = config.get('move', False)
+        last_processed_file_modify = provider.get('private', {}).get('last_processed_file_modify')
+        limit = app.config.get('FTP_INGEST_FILES_LIST_LIMIT', 100)
+        registered_parser = self.get_feed_parser(provider)
+        allowed_ext = getattr(registered_parser, 'ALLOWED_EXT', self.ALLOWED_EXT_DEFAULT)
+
+        if 'dest_path' not in config:
+            config['dest_path'] = tempfile.mkdtemp(prefix='superdesk_ingest_')
+
+        try:
+            with ftp_connect(config) as ftp:
+                ftp.encoding = 'UTF-8'
+                files = self._sort_files(self._list_files(ftp, provider))
+                files_to_process = self._get_files_to_process(files, last_processed_file_modify, limit, allowed_ext)
+
+                if do_move:
+                    move_path, move_path_error = self._create_move_folders(config, ftp)
+
+                # download all the files first, so they can be parsed at the same time
+                downloaded = {}
+                for filename, file_modify in files_to_process:
+                    try:
+                        downloaded[self._download(ftp, config, filename)] = (filename, file_modify)
+                    except EmptyFile:
+                        continue
+                    except ftplib.all_errors as ex:
+                        logger.error('Exception retrieving file from FTP server ({filename}): {ex}'.format(
+                            filename=filename, ex=ex))
+                        if do_move:
+                            move_dest_path = os.path.join(move_path_error, filename)
+                            self._move(ftp, filename, move_dest_path, file_modify, failed=True)
+
+                for result in parse_files(provider, list(downloaded)):
+                    filename, file_modify = downloaded[result.file_path]
+                    update['private'] = {'last_processed_file_modify': file_modify}
+                    if result.error is not None:
+                        logger.error('Error while parsing {filename}: {msg}'.format(
+                            filename=filename, msg=result.error))
+                        failed = True
+                    else:
+                        failed = yield result.items
+
+                    if do_move:
+                        move_dest_path = move_path_error if failed else move_path
+                        self._move(ftp, filename, os.path.join(move_dest_path, filename), file_modify, failed=failed)
+        except IngestFtpError:
+            raise
+        except Exception as ex:
+            raise IngestFtpError.ftpError(ex, provider)
+
+    def _get_files_to_process(self, files, last_processed_file_modify, limit, allowed_ext):
+        files_to_process = []
+        for filename, modify in files:
+            if not self._is_allowed(filename, allowed_ext):
+                logger.info('ignoring file {filename} because of file extension'.format(filename=filename))
+                continue
+
+            file_modify = modify if isinstance(modify, datetime) \
+                else datetime.strptime(modify, self.DATE_FORMAT).replace(tzinfo=utc)
+            if last_processed_file_modify:
+                if last_processed_file_modify == file_modify:
+                    files_to_process.append((filename, file_modify))
+                elif last_processed_file_modify < file_modify:
+                    # even if we have reached a limit, we must add at least one file
+                    # to increment a `last_processed_file_modify` in provider
+                    files_to_process.append((filename, file_modify))
+                    if len(files_to_process) >= limit:
+                        break
+            else:
+                if len(files_to_process) >= limit:
+                    break
+                files_to_process.append((filename, file_modify))
+        return files_to_process
+
+    def _download(self, ftp, config, filename):
+        local_file_path = os.path.join(config['dest_path'], filename)
+        try:
+            with open(local_file_path, 'wb') as f:
+                ftp.retrbinary('RETR %s' % filename, f.write)
+        except ftplib.all_errors:
+            os.remove(local_file_path)
+            raise
+
+        if self._is_empty(local_file_path):
+            logger.info('ignoring empty file {filename}'.format(filename=filename))
+            raise EmptyFile(local_file_path)
+        return local_file_path
+
+
+register_feeding_service(FTPBelgaFeedingService)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013, 2014 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Long-lived IMAP connections for email ingest.
+
+Connections are kept open between updates of a provider, so every update
+doesn't have to open a new TLS connection, log in and select the mailbox.
+:func:`wait_for_mail` is used to get notified about new emails, using
+IMAP IDLE when it's supported by the server and NOOP polling otherwise.
+"""
+
+import json
+import time
+import select
+import hashlib
+import imaplib
+import logging
+import threading
+from contextlib import contextmanager
+
+from eve.utils import config
+
+logger = logging.getLogger(__name__)
+
+# how often NOOP is sent when server doesn't support IDLE
+NOOP_INTERVAL = 30
+
+# seconds after which unused connections are logged out
+MAX_IDLE_TIME = 10 * 60
+
+# provider config fields used to open a connection
+CONFIG_FIELDS = ('server', 'port', 'user', 'password', 'mailbox')
+
+# errors meaning that connection is not usable anymore
+CONNECTION_ERRORS = (imaplib.IMAP4.error, OSError, EOFError)
+
+
+class IMAPConnectionPool:
+    """Pool of IMAP connections with selected mailbox per provider.
+
+    A connection is used by a single update at a time, it's returned to the pool
+    when the update is done and dropped if the update fails. Connections are
+    checked with NOOP before they are reused.
+
+    Connections are kept by provider id together with a hash of the connection
+    config, so connections are logged out once the config changes. Connections
+    not used for ``MAX_IDLE_TIME`` are logged out too, so closed or removed
+    providers don't keep their connections open.
+    """
+
+    def __init__(self):
+        # provider id -> (config hash, list of (connection, time it was returned))
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, provider, connect):
+        """Get a connection for the provider.
+
+        :param provider: ingest provider
+        :param connect: callable getting the provider and returning new connection with selected mailbox
+        """
+        key = get_connection_key(provider)
+        config_hash = get_config_hash(provider)
+        self._logout_idle()
+        imap = self._acquire(key, config_hash)
+        if imap is None:
+            imap = connect(provider)
+        try:
+            yield imap
+        except Exception:
+            logout(imap)
+            raise
+        else:
+            self._release(key, config_hash, imap)
+
+    def close(self, provider=None):
+        """Log out connections of the provider, or all connections if there is no provider."""
+        with self._lock:
+            if provider is None:
+                entries = list(self._connections.values())
+                self._connections.clear()
+            else:
+                entries = [self._connections.pop(get_connection_key(provider), (None, []))]
+        for _config_hash, connections in entries:
+            for imap, _returned in connections:
+                logout(imap)
+
+    def _acquire(self, key, config_hash):
+        while True:
+            stale = []
+            with self._lock:
+                entry = self._connections.get(key)
+                if entry and entry[0] != config_hash:
+                    stale = self._connections.pop(key)[1]
+                    imap = None
+                else:
+                    imap = entry[1].pop()[0] if entry and entry[1] else None
+            for old, _returned in stale:
+                logout(old)
+            if imap is None or is_alive(imap):
+                return imap
+            logout(imap)
+
+    def _release(self, key, config_hash, imap):
+        stale = []
+        with self._lock:
+            entry = self._connections.get(key)
+            if not entry or entry[0] != config_hash:
+                stale = entry[1] if entry else []
+                entry = self._connections[key] = (config_hash, [])
+            entry[1].append((imap, time.monotonic()))
+        for old, _returned in stale:
+            logout(old)
+
+    def _logout_idle(self):
+        idle = []
+        deadline = time.monotonic() - MAX_IDLE_TIME
+        with self._lock:
+            for _config_hash, connections in self._connections.values():
+                idle.extend(imap for imap, returned in connections if returned < deadline)
+                connections[:] = [(imap, returned) for imap, returned in connections if returned >= deadline]
+        for imap in idle:
+            logout(imap)
+
+
+def get_connection_key(provider):
+    """Connections are kept per provider."""
+    return provider.get(config.ID_FIELD) or provider.get('name')
+
+
+def get_config_hash(provider):
+    """Hash of the connection config, connections are reused only while it stays the same."""
+    provider_config = provider.get('config', {})
+    data = json.dumps([provider_config.get(field) for field in CONFIG_FIELDS], default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def is_alive(imap):
+    try:
+        return imap.noop()[0] == 'OK'
+    except CONNECTION_ERRORS:
+        return False
+
+
+def logout(imap):
+    try:
+        imap.logout()
+    except CONNECTION_ERRORS:
+        pass
+
+
+def wait_for_mail(imap, timeout, noop_interval=NOOP_INTERVAL):
+    """Wait for new emails in the selected mailbox.
+
+    :param imap: connection with selected mailbox
+    :param timeout: max number of seconds to wait
+    :param noop_interval: seconds between NOOP commands if server doesn't support IDLE
+    :return: ``True`` if there are new emails, ``False`` on timeout
+    """
+    # drop responses received before waiting
+    imap.response('EXISTS')
+    imap.response('RECENT')
+    if 'IDLE' in imap.capabilities:
+        return _idle(imap, timeout)
+    return _noop_poll(imap, timeout, noop_interval)
+
+
+def _idle(imap, timeout):
+    # imaplib doesn't support IDLE, so it's sent using the low level api
+    tag = imap._new_tag()
+    imap.send(tag + b' IDLE\r\n')
+    line = imap.readline()
+    if not line.startswith(b'+'):
+        raise imaplib.IMAP4.error('IDLE failed: {}'.format(line))
+
+    has_mail = False
+    deadline = time.monotonic() + timeout
+    # lines already buffered after the continuation are handled after DONE
+    while not has_mail:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not _wait_readable(imap.sock, remaining):
+            break
+        line = imap.readline()
+        if not line:
+            raise imaplib.IMAP4.abort('connection closed while idling')
+        has_mail = _is_new_mail(line)
+
+    imap.send(b'DONE\r\n')
+    while True:
+        line = imap.readline()
+        if not line:
+            raise imaplib.IMAP4.abort('connection closed while idling')
+        if line.startswith(tag):
+            if not line.startswith(tag + b' OK'):
+                raise imaplib.IMAP4.error('IDLE failed: {}'.format(line))
+            return has_mail
+        has_mail = has_mail or _is_new_mail(line)
+
+
+def _noop_poll(imap, timeout, noop_interval):
+    deadline = time.monotonic() + timeout
+    while True:
+        imap.noop()
+        for response in ('EXISTS', 'RECENT'):
+            _typ, data = imap.response(response)
+            if data and data[-1] is not None and (response == 'EXISTS' or int(data[-1])):
+                return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(noop_interval, remaining))
+
+
+def _wait_readable(sock, timeout):
+    pending = getattr(sock, 'pending', None)
+    if pending is not None and pending():
+        # decrypted data waiting in ssl socket
+        return True
+    readable, _, _ = select.select([sock], [], [], timeout)
+    return bool(readable)
+
+
+def _is_new_mail(line):
+    parts = line.split()
+    return len(parts) >= 3 and parts[0] == b'*' and parts[2].upper() in (b'EXISTS', b'RECENT') and parts[1] != b'0'
+
+
+connection_pool = IMAPConnectionPool()
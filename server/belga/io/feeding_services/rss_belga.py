@@ -8,15 +8,95 @@
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
 
+import logging
+from calendar import timegm
+from datetime import datetime
 
+import feedparser
+from superdesk.errors import ParserError
+from superdesk.io.commands.update_ingest import LAST_ITEM_UPDATE
 from superdesk.io.feeding_services import RSSFeedingService
 from superdesk.io.registry import register_feeding_service, register_feeding_service_parser
 
+logger = logging.getLogger(__name__)
+
+# provider private key with feed state from the last update
+STATE_KEY = 'rss'
+
 
 class RSSBelgaFeedingService(RSSFeedingService):
     NAME = 'rss-belga'
     label = 'RSS BELGA'
 
+    def _update(self, provider, update):
+        """Get new items from the feed.
+
+        Feed is requested with ETag and Last-Modified of the previous response,
+        so unchanged feed is not downloaded and parsed again. Entries which are
+        not newer than the newest entry from previous update are skipped before
+        creating items, using entry ids to handle entries with same updated time.
+        """
+        url = self.config['url']
+        state = provider.get('private', {}).get(STATE_KEY) or {}
+        if state.get('url') != url:
+            state = {}
+
+        response = self.get_url(url, headers=get_conditional_headers(state))
+        if response.status_code == 304:
+            logger.debug('Provider %s: feed not modified', provider.get('name'))
+            return [[]]
+
+        try:
+            data = feedparser.parse(response.content)
+        except Exception as ex:
+            raise ParserError.parseMessageError(ex, provider, data=response.content)
+
+        if state.get('updated'):
+            last_updated = state['updated'].replace(tzinfo=None)
+            last_ids = set(state.get('ids') or [])
+        else:
+            # without previous state fall back to last ingested item time
+            last_updated = provider.get(LAST_ITEM_UPDATE, datetime.utcfromtimestamp(0)).replace(tzinfo=None)
+            last_ids = None
+
+        new_items = []
+        newest, newest_ids = last_updated, set(last_ids or [])
+        field_aliases = self.config.get('field_aliases')
+        for entry in data.entries:
+            entry_updated = get_entry_updated(entry)
+            entry_id = entry.get('id') or entry.get('link')
+            if entry_updated is not None:
+                if entry_updated > newest:
+                    newest, newest_ids = entry_updated, set()
+                if entry_updated == newest and entry_id:
+                    newest_ids.add(entry_id)
+                if entry_updated < last_updated or (
+                    entry_updated == last_updated and (last_ids is None or entry_id in last_ids)
+                ):
+                    continue
+
+            new_items.extend(self._create_entry_items(entry, field_aliases, provider.get('source', None)))
+
+        update['private'] = dict(provider.get('private') or {})
+        update['private'][STATE_KEY] = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'updated': newest,
+            'ids': sorted(newest_ids),
+        }
+        return [new_items]
+
+    def _create_entry_items(self, entry, field_aliases, source):
+        """Create item for the feed entry, with picture items and package if it references images."""
+        item = self._create_item(entry, field_aliases, source)
+        self.localize_timestamps(item)
+        image_urls = self._extract_image_links(entry)
+        if not image_urls:
+            return [item]
+        image_items = self._create_image_items(image_urls, item)
+        return image_items + [item, self._create_package(item, image_items)]
+
     def _create_item(self, data, field_aliases=None, source='source'):
         item = super()._create_item(data, field_aliases, source)
 
@@ -51,5 +131,22 @@ class RSSBelgaFeedingService(RSSFeedingService):
         return item
 
 
+def get_conditional_headers(state):
+    headers = {}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+    return headers
+
+
+def get_entry_updated(entry):
+    try:
+        return datetime.utcfromtimestamp(timegm(entry.updated_parsed)).replace(tzinfo=None)
+    except (AttributeError, TypeError):
+        # missing updated info, so better ingest it
+        return None
+
+
 register_feeding_service(RSSBelgaFeedingService)
 register_feeding_service_parser(RSSBelgaFeedingService.NAME, None)
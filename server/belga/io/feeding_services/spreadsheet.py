@@ -9,11 +9,13 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 import json
+import hashlib
 import logging
 from copy import deepcopy
 from datetime import datetime
 
 import gspread
+from gspread import Cell
 from oauth2client.service_account import ServiceAccountCredentials
 
 import superdesk
@@ -26,6 +28,9 @@ from superdesk.metadata.utils import generate_guid
 
 logger = logging.getLogger(__name__)
 
+# provider private key with fingerprints of processed rows
+FINGERPRINTS_KEY = 'rows_fingerprints'
+
 
 class IngestSpreadsheetError(SuperdeskIngestError):
     _codes = {
@@ -98,6 +103,9 @@ class SpreadsheetFeedingService(FeedingService):
 
         If STATUS field is empty, create new item
         If STATUS field is UPDATED, update item
+
+        Fingerprints of rows are stored in provider, so only rows changed since
+        the last update are parsed.
         """
         worksheet = self._get_worksheet(provider)
 
@@ -110,20 +118,33 @@ class SpreadsheetFeedingService(FeedingService):
         if total_col < len(titles) + 3:
             worksheet.add_cols(len(titles) + 3 - total_col)
 
+        title_cells = []
         for field in ('_STATUS', '_ERR_MESSAGE', '_GUID'):
             if field.lower() not in titles:
                 titles.append(field)
-                worksheet.update_cell(1, len(titles), field)
+                title_cells.append(Cell(1, len(titles), field))
+        if title_cells:
+            worksheet.update_cells(title_cells)
         data[0] = titles  # pass to parser uses for looking up index
 
-        parser = BelgaSpreadsheetParser()
-        items, cells_list = parser.parse(data, provider)
-        items = self._process_event_items(items, provider)
+        fingerprints = set(provider.get('private', {}).get(FINGERPRINTS_KEY) or [])
+        rows = [
+            row for row in range(3, len(data) + 1)
+            if get_row_fingerprint(titles, data[row - 1]) not in fingerprints
+        ]
+        items, cells_list = [], []
+        if rows:
+            parser = BelgaSpreadsheetParser()
+            items, cells_list = parser.parse(data, provider, rows=rows)
+            items = self._process_event_items(items, provider)
         # add ingest item
         yield items
         # Update status for google sheet
         if cells_list:
             worksheet.update_cells(cells_list)
+        if rows:
+            update['private'] = dict(provider.get('private') or {})
+            update['private'][FINGERPRINTS_KEY] = get_fingerprints(data, cells_list)
 
     def _get_worksheet(self, provider):
         """Get worksheet from google spreadsheet
@@ -171,42 +192,24 @@ class SpreadsheetFeedingService(FeedingService):
                 raise IngestApiError.apiNotFoundError()
 
     def _process_event_items(self, items, provider):
-        events_service = superdesk.get_resource_service('events')
+        """Link items to contacts and locations and merge them with existing events.
+
+        Existing events, contacts and locations are fetched using one query each,
+        new contacts and locations are created in bulk and existing ones are only
+        patched if there are changes, so the number of db requests doesn't grow
+        with the number of rows which didn't change.
+        """
+        if not items:
+            return []
+
+        statuses = [item.pop('status') for item in items]
+        self._process_contacts(items, statuses)
+        self._process_locations(items, statuses)
+
+        events = get_events_by_guid([item[GUID_FIELD] for item in items])
         list_items = []
-        for item in items:
-            status = item.pop('status')
-            location = item.get('location')
-            if item.get('contact'):
-                contact = item.pop('contact')
-                contact_service = superdesk.get_resource_service('contacts')
-                _contact = contact_service.find_one(req=None, **{
-                    'first_name': contact['first_name'],
-                    'last_name': contact['last_name'],
-                    'organisation': contact['organisation'],
-                    'contact_email': contact['contact_email'][0],
-                    'contact_phone.number': contact['contact_phone'][0]['number'],
-                })
-                if _contact and status == 'UPDATED':
-                    item.setdefault('event_contact_info', [_contact[superdesk.config.ID_FIELD]])
-                    contact_service.patch(_contact[superdesk.config.ID_FIELD], contact)
-                else:
-                    item.setdefault('event_contact_info', list(contact_service.post([contact])))
-
-            if location:
-                location_service = superdesk.get_resource_service('locations')
-                saved_location = list(location_service.find({
-                    'name': location[0]['name'],
-                    'address.line': location[0]['address']['line'],
-                    'address.country': location[0]['address']['country'],
-                }))
-                if saved_location and status == 'UPDATED':
-                    location_service.patch(saved_location[0][superdesk.config.ID_FIELD], location[0])
-                elif not saved_location:
-                    _location = deepcopy(location)
-                    location_service.post(_location)
-                    item['location'][0]['qcode'] = _location[0]['guid']
-
-            old_item = events_service.find_one(guid=item[GUID_FIELD], req=None)
+        for item, status in zip(items, statuses):
+            old_item = events.get(item[GUID_FIELD])
             if not old_item:
                 if not status:
                     item.setdefault('firstcreated', datetime.now())
@@ -217,6 +220,166 @@ class SpreadsheetFeedingService(FeedingService):
                 list_items.append(old_item)
         return list_items
 
+    def _process_contacts(self, items, statuses):
+        contact_service = superdesk.get_resource_service('contacts')
+        contacts = [item.pop('contact', None) for item in items]
+        saved_contacts = get_contacts_by_key([contact for contact in contacts if contact])
+        new_contacts = []
+        new_contacts_index = {}
+        refs = []  # (item, index of its contact in new_contacts)
+        for item, status, contact in zip(items, statuses, contacts):
+            if not contact:
+                continue
+            key = get_contact_key(contact)
+            saved_contact = saved_contacts.get(key)
+            if saved_contact and status == 'UPDATED':
+                item.setdefault('event_contact_info', [saved_contact[superdesk.config.ID_FIELD]])
+                if has_changes(saved_contact, contact):
+                    contact_service.patch(saved_contact[superdesk.config.ID_FIELD], contact)
+                    saved_contact.update(contact)
+            elif key in new_contacts_index and status == 'UPDATED':
+                # contact is created by previous row
+                new_contacts[new_contacts_index[key]].update(contact)
+                refs.append((item, new_contacts_index[key]))
+            else:
+                new_contacts_index.setdefault(key, len(new_contacts))
+                refs.append((item, len(new_contacts)))
+                new_contacts.append(contact)
+
+        if new_contacts:
+            ids = list(contact_service.post(new_contacts))
+            for item, index in refs:
+                item.setdefault('event_contact_info', [ids[index]])
+
+    def _process_locations(self, items, statuses):
+        location_service = superdesk.get_resource_service('locations')
+        locations = [item['location'][0] if item.get('location') else None for item in items]
+        saved_locations = get_locations_by_key([location for location in locations if location])
+        new_locations = {}
+        refs = []  # (item location, new location)
+        for status, location in zip(statuses, locations):
+            if not location:
+                continue
+            key = get_location_key(location)
+            saved_location = saved_locations.get(key)
+            if saved_location and status == 'UPDATED':
+                if has_changes(saved_location, location):
+                    location_service.patch(saved_location[superdesk.config.ID_FIELD], location)
+                    saved_location.update(location)
+            elif key in new_locations:
+                # location is created by previous row
+                if status == 'UPDATED':
+                    new_locations[key].update(deepcopy(location))
+                refs.append((location, new_locations[key]))
+            elif not saved_location:
+                new_locations[key] = deepcopy(location)
+                refs.append((location, new_locations[key]))
+
+        if new_locations:
+            location_service.post(list(new_locations.values()))
+            for location, new_location in refs:
+                location['qcode'] = new_location['guid']
+
+
+def get_row_fingerprint(titles, values):
+    """Get fingerprint of row values, ignoring empty cells at the end of the row."""
+    values = list(values)
+    while values and not values[-1]:
+        values.pop()
+    return hashlib.sha1(json.dumps([titles, values]).encode('utf-8')).hexdigest()
+
+
+def get_fingerprints(data, cells_list):
+    """Get fingerprints of all rows as they are after updating status cells."""
+    rows = [list(values) for values in data]
+    for cell in cells_list:
+        values = rows[cell.row - 1]
+        if len(values) < cell.col:
+            values.extend([''] * (cell.col - len(values)))
+        values[cell.col - 1] = cell.value
+    return sorted({get_row_fingerprint(data[0], values) for values in rows[2:]})
+
+
+def get_events_by_guid(guids):
+    events_service = superdesk.get_resource_service('events')
+    events = {}
+    for event in events_service.find({GUID_FIELD: {'$in': list(set(guids))}}):
+        events.setdefault(event[GUID_FIELD], event)
+    return events
+
+
+def get_contact_key(contact):
+    """Contact is identified by name, organisation, first email and first phone number."""
+    return (
+        contact.get('first_name'),
+        contact.get('last_name'),
+        contact.get('organisation'),
+        next(iter(contact.get('contact_email') or []), None),
+        next(iter(contact.get('contact_phone') or []), {}).get('number'),
+    )
+
+
+def get_contacts_by_key(contacts):
+    """Find existing contacts for given contacts using a single query.
+
+    :return: dict of existing contacts by :func:`get_contact_key`
+    """
+    keys = {get_contact_key(contact) for contact in contacts}
+    if not keys:
+        return {}
+    lookup = {'$or': [{
+        'first_name': first_name,
+        'last_name': last_name,
+        'organisation': organisation,
+        'contact_email': email,
+        'contact_phone.number': number,
+    } for first_name, last_name, organisation, email, number in keys]}
+
+    saved_contacts = {}
+    for contact in superdesk.get_resource_service('contacts').find(lookup):
+        # any of contact emails and phones can match
+        for email in contact.get('contact_email') or []:
+            for phone in contact.get('contact_phone') or []:
+                key = (
+                    contact.get('first_name'),
+                    contact.get('last_name'),
+                    contact.get('organisation'),
+                    email,
+                    phone.get('number'),
+                )
+                if key in keys:
+                    saved_contacts.setdefault(key, contact)
+    return saved_contacts
+
+
+def get_location_key(location):
+    address = location.get('address') or {}
+    return location.get('name'), tuple(address.get('line') or []), address.get('country')
+
+
+def get_locations_by_key(locations):
+    """Find existing locations for given locations using a single query.
+
+    :return: dict of existing locations by :func:`get_location_key`
+    """
+    keys = {get_location_key(location) for location in locations}
+    if not keys:
+        return {}
+    lookup = {'$or': [{
+        'name': name,
+        'address.line': list(line),
+        'address.country': country,
+    } for name, line, country in keys]}
+
+    saved_locations = {}
+    for location in superdesk.get_resource_service('locations').find(lookup):
+        saved_locations.setdefault(get_location_key(location), location)
+    return saved_locations
+
+
+def has_changes(original, updates):
+    return any(original.get(key) != value for key, value in updates.items())
+
 
 register_feeding_service(SpreadsheetFeedingService)
 register_feeding_service_parser(SpreadsheetFeedingService.NAME, 'belgaspreadsheet')
@@ -8,9 +8,15 @@
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
 import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import requests
+from flask import current_app as app
 
 import superdesk
 from superdesk.errors import IngestTwitterError, SuperdeskIngestError
@@ -18,6 +24,10 @@ from superdesk.io.feeding_services import TwitterFeedingService
 from superdesk.io.registry import register_feeding_service, register_feeding_service_parser
 from superdesk.metadata.item import GUID_FIELD
 
+logger = logging.getLogger(__name__)
+
+URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-;]|[\[\]?@_~]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+
 
 class IngestTwitterBelgaError(SuperdeskIngestError):
     _codes = {
@@ -29,6 +39,57 @@ class IngestTwitterBelgaError(SuperdeskIngestError):
         return IngestTwitterBelgaError(6300, exception, provider)
 
 
+class EmbedCache:
+    """Thread safe cache of embed html by url with expiration."""
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Get cached embed html, ``None`` if it's not cached or it's expired."""
+        with self._lock:
+            cached = self._items.get(url)
+            if cached is None:
+                return None
+            expires, html = cached
+            if expires < time.monotonic():
+                del self._items[url]
+                return None
+            return html
+
+    def set(self, url, html, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._items[url] = (time.monotonic() + ttl, html)
+            self._items.move_to_end(url)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+embed_cache = EmbedCache()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Get session shared by all providers, so connections to iframely are reused."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=app.config.get('BELGA_IFRAMELY_WORKERS', 4))
+            _session.mount('https://', adapter)
+        return _session
+
+
 class TwitterBelgaFeedingService(TwitterFeedingService):
     NAME = 'twitter_belga'
 
@@ -93,32 +154,90 @@ class TwitterBelgaFeedingService(TwitterFeedingService):
                     ingest_service.find({GUID_FIELD: {"$in": [item[GUID_FIELD] for item in items]}})]
         # remove all old item
         [items.remove(item) for item in items.copy() if item[GUID_FIELD] in old_guid]
-        for item in items:
-            if embed:
-                urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-;]|[\[\]?@_~]|'
-                                  r'(?:%[0-9a-fA-F][0-9a-fA-F]))+',
-                                  item.get('body_html', ''))
-                for url in set(urls):
-                    embed_content = self._create_embed(url, key)
+        if embed:
+            urls_by_item = [self._get_urls(item) for item in items]
+            embeds = self._create_embeds({url for urls in urls_by_item for url in urls}, key)
+            for item, urls in zip(items, urls_by_item):
+                for url in urls:
+                    embed_content = embeds.get(url)
                     if embed_content:
                         item['body_html'] += '<!-- EMBED START Twitter -->'
                         item['body_html'] += embed_content
                         item['body_html'] += '<!-- EMBED END Twitter -->'
         return [items]
 
-    def _create_embed(self, url, key):
+    def _get_urls(self, item):
+        """Get unique urls from item body in the order they are used."""
+        return list(OrderedDict.fromkeys(URL_RE.findall(item.get('body_html', ''))))
+
+    def _create_embeds(self, urls, key):
+        """Get embed html for all urls.
+
+        Cached embeds are used when available, others are fetched in parallel
+        using ``BELGA_IFRAMELY_WORKERS`` threads.
+
+        :param urls: set of urls
+        :param key: iframely api key
+        :return: dict with embed html by url
         """
-        Get embed html from iframely service for provided url
+        embeds = {}
+        missing = []
+        for url in urls:
+            html = embed_cache.get(url)
+            if html is None:
+                missing.append(url)
+            else:
+                embeds[url] = html
+
+        if not missing:
+            return embeds
+
+        config = app.config
+        timeout = config.get('BELGA_IFRAMELY_TIMEOUT', 10)
+        ttl = config.get('BELGA_IFRAMELY_CACHE_TTL', 3600)
+        error_ttl = config.get('BELGA_IFRAMELY_ERROR_CACHE_TTL', 600)
+        session = get_session()
+        workers = min(config.get('BELGA_IFRAMELY_WORKERS', 4), len(missing))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {url: executor.submit(self._fetch_embed, session, url, key, timeout) for url in missing}
+            for url, future in futures.items():
+                try:
+                    html, status_code = future.result()
+                except requests.RequestException as ex:
+                    # don't cache, url will be tried again with next tweet
+                    logger.warning('Can not get embed for {}: {}'.format(url, ex))
+                    embeds[url] = ''
+                    continue
+                if status_code == 200:
+                    embed_cache.set(url, html, ttl)
+                elif status_code == 417:
+                    embed_cache.set(url, html, error_ttl)
+                else:
+                    # transient error, url will be tried again with next tweet
+                    logger.warning('Can not get embed for {}: iframely returned {}'.format(url, status_code))
+                embeds[url] = html
+        return embeds
+
+    def _fetch_embed(self, session, url, key, timeout):
+        """Get embed html from iframely service for provided url.
+
+        :return: tuple of embed html and response status code
         """
-        response = requests.get('https://iframe.ly/api/oembed?url={}&api_key={}'.format(url, key))
-        content = response.json()
+        response = session.get('https://iframe.ly/api/oembed?url={}&api_key={}'.format(url, key), timeout=timeout)
         if response.status_code == 200:
-            return content.get('html', '')
+            return response.json().get('html', ''), response.status_code
         elif response.status_code == 403:
             raise IngestTwitterBelgaError.TwitterInvalidIframelyKey()
         # when turn off setting: On URL errors, don't repeat it as HTTP status (use code 200 instead)
         # iframely will return 417 response on URL error
-        return ''
+        return '', response.status_code
+
+    def _create_embed(self, url, key):
+        """
+        Get embed html from iframely service for provided url
+        """
+        html, _status_code = self._fetch_embed(get_session(), url, key, app.config.get('BELGA_IFRAMELY_TIMEOUT', 10))
+        return html
 
 
 register_feeding_service(TwitterBelgaFeedingService)
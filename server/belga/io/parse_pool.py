@@ -0,0 +1,154 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Parse files of an ingest provider in a pool of worker threads or processes."""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app as app
+from lxml import etree
+
+from superdesk.errors import SuperdeskIngestError
+from superdesk.io.feed_parsers import XMLFeedParser
+from superdesk.io.registry import registered_feed_parsers
+
+from .feed_parsers.parse_context import ParseContextMixin
+
+logger = logging.getLogger(__name__)
+
+
+class ParseResult:
+    """Result of parsing a single file.
+
+    Exceptions raised by parsers can't be reliably pickled, so only their
+    description is sent back from a worker.
+    """
+
+    def __init__(self, file_path, items=None, error=None):
+        self.file_path = file_path
+        self.items = items
+        self.error = error
+
+
+# default number of workers when ``BELGA_INGEST_PARSE_WORKERS`` is not set
+THREAD_WORKERS = 4
+PROCESS_WORKERS = 2
+
+
+def use_processes():
+    """Parse files in forked processes, opt-in using ``BELGA_INGEST_PARSE_PROCESSES`` setting.
+
+    Not possible when the current process can't have children (e.g. a daemonic celery worker).
+    """
+    return bool(
+        app.config.get("BELGA_INGEST_PARSE_PROCESSES")
+        and not multiprocessing.current_process().daemon
+        and "fork" in multiprocessing.get_all_start_methods()
+    )
+
+
+def get_parse_workers():
+    """Number of workers used to parse files, ``0`` or ``1`` parse files in the current process."""
+    workers = app.config.get("BELGA_INGEST_PARSE_WORKERS")
+    if workers is None:
+        return PROCESS_WORKERS if use_processes() else THREAD_WORKERS
+    return int(workers)
+
+
+def parse_file(provider, file_path):
+    """Parse a file using the feed parser configured for the provider.
+
+    :param provider: ingest provider
+    :param file_path: path of a local file
+    :return: list of parsed items
+    """
+    parser = registered_feed_parsers.get(provider.get("feed_parser", ""))
+    if not parser:
+        raise SuperdeskIngestError.parserNotFoundError(provider=provider)
+
+    if isinstance(parser, XMLFeedParser):
+        with open(file_path, "rb") as f:
+            article = etree.parse(f).getroot()
+    else:
+        article = file_path
+
+    if not parser.can_parse(article):
+        raise SuperdeskIngestError.parserNotFoundError(provider=provider)
+
+    # parsers keeping their state in a parse context can be shared
+    if not isinstance(parser, ParseContextMixin):
+        parser = parser.__class__()
+
+    items = parser.parse(article, provider)
+    return items if isinstance(items, list) else [items]
+
+
+def parse_files(provider, file_paths, workers=None):
+    """Parse files in parallel and yield a :class:`ParseResult` for every file.
+
+    Results are yielded in the order of ``file_paths`` and an error while
+    parsing one file doesn't affect the other files.
+
+    Files are parsed in a thread pool, or in worker processes forked from
+    the current one when enabled by ``BELGA_INGEST_PARSE_PROCESSES`` setting.
+
+    :param provider: ingest provider
+    :param file_paths: list of local file paths
+    :param workers: number of workers, defaults to ``BELGA_INGEST_PARSE_WORKERS`` setting
+    """
+    if workers is None:
+        workers = get_parse_workers()
+    workers = min(workers, len(file_paths))
+
+    if workers <= 1:
+        for file_path in file_paths:
+            yield _parse_file(provider, file_path)
+        return
+
+    with _get_executor(workers) as executor:
+        futures = [executor.submit(_parse_file, provider, file_path) for file_path in file_paths]
+        for file_path, future in zip(file_paths, futures):
+            try:
+                result = future.result()
+            except Exception as ex:
+                # e.g. parsed items could not be sent back from the worker
+                logger.exception("Error while parsing {}".format(file_path))
+                result = ParseResult(file_path, error=str(ex))
+            yield result
+
+
+def _get_executor(workers):
+    flask_app = app._get_current_object()
+    if use_processes():
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(flask_app, True),
+        )
+    return ThreadPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(flask_app,))
+
+
+def _init_worker(flask_app, forked=False):
+    if forked:
+        # mongo and elastic clients are not fork safe, connect again
+        flask_app.data.init_app(flask_app)
+    # worker has no app context on its own
+    flask_app.app_context().push()
+
+
+def _parse_file(provider, file_path):
+    try:
+        return ParseResult(file_path, items=parse_file(provider, file_path))
+    except Exception as ex:
+        logger.exception("Error while parsing {}".format(file_path))
+        return ParseResult(file_path, error=str(ex))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013, 2014 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Cache of content profiles, vocabulary items and content filters used by macros and signals.
+
+Cached values are dropped when content profiles, vocabularies or content filters
+(and their filter conditions) are changed via api in this process. Other processes (eg. celery workers) are using
+cached values until ``BELGA_LOOKUP_CACHE_TTL`` expires.
+"""
+
+import time
+import logging
+import threading
+from copy import deepcopy
+
+import superdesk
+from flask import current_app as app
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = 'content_types'
+VOCABULARIES = 'vocabularies'
+CONTENT_FILTERS = 'content_filters'
+FILTER_CONDITIONS = 'filter_conditions'
+
+# cached values to drop when resource is changed
+INVALIDATES = {
+    CONTENT_TYPES: CONTENT_TYPES,
+    VOCABULARIES: VOCABULARIES,
+    CONTENT_FILTERS: CONTENT_FILTERS,
+    # content filters are compiled with their filter conditions
+    FILTER_CONDITIONS: CONTENT_FILTERS,
+}
+
+# seconds to keep cached values when ttl is not configured
+DEFAULT_TTL = 60
+
+MISSING = object()
+
+
+class LookupCache:
+    """Cache of lookup values by resource and key, with ttl."""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, resource, key, load, ttl=DEFAULT_TTL):
+        """Get cached value, using ``load`` to get it if it's not cached or expired.
+
+        :param resource: resource the value comes from, used for invalidation
+        :param key: value key within the resource
+        :param load: callable returning the value
+        :param ttl: seconds to keep the value
+        """
+        now = time.monotonic()
+        with self._lock:
+            expires, value = self._values.get((resource, key), (0, MISSING))
+        if value is not MISSING and expires > now:
+            return value
+        value = load()
+        with self._lock:
+            self._values[(resource, key)] = (now + ttl, value)
+        return value
+
+    def clear(self, resource=None):
+        """Drop cached values of the resource, or all values if there is no resource."""
+        with self._lock:
+            if resource is None:
+                self._values.clear()
+            else:
+                for key in [key for key in self._values if key[0] == resource]:
+                    del self._values[key]
+
+
+lookup_cache = LookupCache()
+
+
+def get_ttl():
+    return app.config.get('BELGA_LOOKUP_CACHE_TTL', DEFAULT_TTL)
+
+
+def get_profile_id(label):
+    """Get id of content profile with given label.
+
+    :param label: content profile label
+    :return: profile id or ``None`` if there is no such profile
+    """
+    def load():
+        profile = superdesk.get_resource_service(CONTENT_TYPES).find_one(req=None, label=label)
+        return profile[superdesk.config.ID_FIELD] if profile else None
+    return lookup_cache.get(CONTENT_TYPES, label, load, get_ttl())
+
+
+def get_vocabulary_item(vocabulary_id, qcode):
+    """Get item of vocabulary with given qcode.
+
+    Returns a copy so callers can modify it.
+
+    :param vocabulary_id: vocabulary id
+    :param qcode: item qcode
+    :return: vocabulary item or ``None`` if there is no vocabulary or item with such qcode
+    """
+    def load():
+        vocabulary = superdesk.get_resource_service(VOCABULARIES).find_one(req=None, _id=vocabulary_id)
+        if not vocabulary or not vocabulary.get('items'):
+            logger.warning('Vocabulary %s is not specified', vocabulary_id)
+            return {}
+        return {item.get('qcode'): item for item in vocabulary['items']}
+    items = lookup_cache.get(VOCABULARIES, vocabulary_id, load, get_ttl())
+    return deepcopy(items.get(qcode))
+
+
+def init_app(app):
+    for resource, cached in INVALIDATES.items():
+        def clear(*args, cached=cached):
+            lookup_cache.clear(cached)
+        for event in ('on_inserted_{}', 'on_updated_{}', 'on_replaced_{}', 'on_deleted_item_{}'):
+            hook = getattr(app, event.format(resource))
+            hook += clear
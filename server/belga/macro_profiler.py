@@ -0,0 +1,210 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013, 2014 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Profiling of macros replayed on sample items.
+
+Every macro call is timed and database calls made by the macro are counted
+by resource. Macros can write to the database (eg. create translations),
+so sample items are replayed using :func:`benchmark_app`, which runs them
+against temporary databases dropped afterwards. Profiling is replay only,
+macros run by ingest or routing are not profiled.
+"""
+
+import time
+import uuid
+import logging
+from copy import deepcopy
+from collections import Counter
+from contextlib import contextmanager
+
+import superdesk
+from flask import current_app as app
+
+from belga.io.benchmark import count_db_calls
+from belga.lookup_cache import lookup_cache
+
+logger = logging.getLogger(__name__)
+
+# resources copied to benchmark databases, macros use them to get metadata and destinations
+SEED_RESOURCES = ('vocabularies', 'desks', 'stages', 'content_types', 'content_filters', 'filter_conditions')
+
+# mongo databases of the app, as (config prefix, db name setting, uri setting)
+MONGO_DATABASES = (
+    ('MONGO', 'MONGO_DBNAME', 'MONGO_URI'),
+    ('ARCHIVED', 'ARCHIVED_DBNAME', 'ARCHIVED_URI'),
+    ('LEGAL_ARCHIVE', 'LEGAL_ARCHIVE_DBNAME', 'LEGAL_ARCHIVE_URI'),
+    ('CONTENTAPI_MONGO', 'CONTENTAPI_MONGO_DBNAME', 'CONTENTAPI_MONGO_URI'),
+)
+
+
+class MacroStats:
+    """Measurements of a single macro."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.db_calls = Counter()
+
+    @property
+    def ms_per_call(self):
+        return self.seconds * 1000 / self.calls if self.calls else 0.0
+
+    @property
+    def db_calls_per_call(self):
+        return sum(self.db_calls.values()) / self.calls if self.calls else 0.0
+
+    def to_dict(self):
+        return {
+            'macro': self.name,
+            'calls': self.calls,
+            'errors': self.errors,
+            'seconds': self.seconds,
+            'ms_per_call': self.ms_per_call,
+            'db_calls_per_call': self.db_calls_per_call,
+            'db_calls': dict(self.db_calls),
+        }
+
+
+class MacroProfiler:
+    """Run macros and record wall time and database calls per macro."""
+
+    def __init__(self):
+        self.stats = {}
+        self._db_calls = Counter()
+
+    @contextmanager
+    def profile(self):
+        """Count database calls of macros run while in the context."""
+        with count_db_calls(self._db_calls, resources=None):
+            yield self
+
+    def run(self, name, item, **kwargs):
+        """Run macro with given name on the item.
+
+        :param name: macro name
+        :param item: item passed to the macro
+        :return: macro result
+        """
+        macro = superdesk.get_resource_service('macros').get_macro_by_name(name)
+        if not macro:
+            raise ValueError('Unknown macro: {}'.format(name))
+
+        stats = self.stats.setdefault(name, MacroStats(name))
+        db_calls = self._db_calls.copy()
+        start = time.perf_counter()
+        try:
+            return macro['callback'](item, **kwargs)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.calls += 1
+            stats.db_calls.update(self._db_calls - db_calls)
+
+
+def run_macros(items, names, repeat=1, **kwargs):
+    """Replay items through the chain of macros.
+
+    Every macro gets the item returned by the previous one (or the same item
+    if it returns nothing). Errors are logged and the chain is stopped for
+    the item.
+
+    :param items: sample items, not modified
+    :param names: macro names in the order they are run
+    :param repeat: number of times the items are replayed
+    :param kwargs: arguments passed to macros, eg. ``dest_desk_id``
+    :return: tuple of profiler, number of processed items and seconds
+    """
+    macros_service = superdesk.get_resource_service('macros')
+    unknown = [name for name in names if not macros_service.get_macro_by_name(name)]
+    if unknown:
+        raise ValueError('Unknown macros: {}'.format(', '.join(unknown)))
+
+    profiler = MacroProfiler()
+    processed = 0
+    start = time.perf_counter()
+    with profiler.profile():
+        for _i in range(repeat):
+            for sample in items:
+                item = deepcopy(sample)
+                for name in names:
+                    try:
+                        result = profiler.run(name, item, **kwargs)
+                    except Exception:
+                        logger.exception('Macro {} failed for item {}'.format(name, (item or {}).get('guid')))
+                        break
+                    if isinstance(result, dict):
+                        item = result
+                processed += 1
+    return profiler, processed, time.perf_counter() - start
+
+
+def get_mongo_uri(uri, dbname):
+    """Replace database name in mongo uri, keeping its options."""
+    base, _sep, options = uri.partition('?')
+    hosts = base.rsplit('/', 1)[0] if base.count('/') > 2 else base
+    return '{}/{}{}'.format(hosts, dbname, '?' + options if options else '')
+
+
+def get_benchmark_config(config, suffix):
+    """Get config overrides pointing the app to databases and indexes with given suffix."""
+    overrides = {'CELERY_TASK_ALWAYS_EAGER': True}
+    for _prefix, dbname_key, uri_key in MONGO_DATABASES:
+        if not config.get(dbname_key):
+            continue
+        dbname = '{}_{}'.format(config[dbname_key], suffix)
+        overrides[dbname_key] = dbname
+        if config.get(uri_key):
+            overrides[uri_key] = get_mongo_uri(config[uri_key], dbname)
+    for key in ('ELASTICSEARCH_INDEX', 'CONTENTAPI_ELASTICSEARCH_INDEX'):
+        if config.get(key):
+            overrides[key] = '{}_{}'.format(config[key], suffix)
+    if config.get('ELASTICSEARCH_INDEXES'):
+        overrides['ELASTICSEARCH_INDEXES'] = {
+            resource: '{}_{}'.format(index, suffix) for resource, index in config['ELASTICSEARCH_INDEXES'].items()
+        }
+    return overrides
+
+
+@contextmanager
+def benchmark_app(app_factory, resources=SEED_RESOURCES):
+    """Create app using temporary databases, seeded with ``resources`` of the current app.
+
+    Databases and indexes are dropped when leaving the context.
+
+    :param app_factory: callable getting config overrides and returning new app
+    :param resources: resources copied from the current app
+    """
+    suffix = 'benchmark_{}'.format(uuid.uuid4().hex[:8])
+    seed = {}
+    for resource in resources:
+        source = app.data.datasource(resource)[0]
+        seed[resource] = (source, list(app.data.mongo.pymongo(resource).db[source].find()))
+
+    bench_app = app_factory(get_benchmark_config(app.config, suffix))
+    try:
+        with bench_app.app_context():
+            lookup_cache.clear()
+            bench_app.data.init_elastic(bench_app)
+            for resource, (source, docs) in seed.items():
+                if docs:
+                    bench_app.data.mongo.pymongo(resource).db[source].insert_many(docs)
+            yield bench_app
+    finally:
+        with bench_app.app_context():
+            lookup_cache.clear()
+            bench_app.data.elastic.drop_index()
+            for prefix, dbname_key, _uri_key in MONGO_DATABASES:
+                dbname = bench_app.config.get(dbname_key)
+                if dbname and dbname.endswith(suffix):
+                    bench_app.data.mongo.pymongo(prefix=prefix).cx.drop_database(dbname)
@@ -14,6 +14,8 @@ from superdesk.errors import StopDuplication, DocumentError
 from superdesk.text_utils import get_word_count
 from superdesk.utc import utcnow, utc_to_local
 
+from belga.lookup_cache import get_profile_id
+
 
 CREDITS = "credits"
 SOURCES = "sources"
@@ -35,12 +37,7 @@ logger = logging.getLogger(__name__)
 
 
 def _get_profile_id(label):
-    profile = superdesk.get_resource_service("content_types").find_one(
-        req=None, label=label
-    )
-    if profile:
-        return profile["_id"]
-    return None
+    return get_profile_id(label)
 
 
 def _find_subj(subject: List, scheme: str):
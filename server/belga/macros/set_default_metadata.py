@@ -65,8 +65,10 @@ def set_default_metadata(item, **kwargs):
     Products``, ``Language``, ``Distribution``, and ``Storytags (keywords)`` will be
     replaced (or created if they don't already exist) by the value set in desk's default
     content template
+
+    Content template can be passed as ``content_template`` if it's already loaded.
     """
-    content_template = get_default_content_template(item, **kwargs)
+    content_template = kwargs.get("content_template") or get_default_content_template(item, **kwargs)
     if not content_template:
         return
 
@@ -9,9 +9,17 @@
 # at https://www.sourcefabric.org/superdesk/license
 import logging
 from copy import deepcopy
+from eve.utils import config
 from superdesk import get_resource_service
 from superdesk.errors import StopDuplication
-from apps.archive.common import ITEM_DUPLICATE
+from superdesk.metadata.item import CONTENT_STATE, ITEM_STATE, SIGN_OFF
+from superdesk.signals import item_duplicate
+from apps.archive.common import ITEM_DUPLICATE, convert_task_attributes_to_objectId, set_sign_off
+from apps.auth import get_user_id
+from apps.content import push_content_notification
+from apps.tasks import send_to, apply_onstage_rule
+from belga.lookup_cache import get_vocabulary_item
+from belga.compiled_filters import get_compiled_filter
 from .set_default_metadata import get_default_content_template, set_default_metadata
 from .update_translation_metadata_macro import update_translation_metadata_macro
 
@@ -31,27 +39,14 @@ def set_belga_keywords(item):
     if brief_already_exists:
         return
 
-    # get Belga keywords
-    belga_keywords = get_resource_service("vocabularies").find_one(
-        req=None, _id="belga-keywords"
-    )
-
-    if not belga_keywords or not belga_keywords.get("items"):
-        logger.warning("Belga keywords are not specified")
-        return
-
     # get Brief value from Belga keywords
-    brief = [
-        keyword
-        for keyword in belga_keywords["items"]
-        if keyword.get("qcode") == "BRIEF"
-    ]
+    brief = get_vocabulary_item("belga-keywords", "BRIEF")
     if brief:
         subjects.append(
             {
-                "name": brief[0].get("name"),
-                "qcode": brief[0].get("qcode"),
-                "translations": brief[0].get("translations"),
+                "name": brief.get("name"),
+                "qcode": brief.get("qcode"),
+                "translations": brief.get("translations"),
                 "scheme": "belga-keywords",
             }
         )
@@ -64,9 +59,11 @@ def set_default_metadata_with_translate(item, **kwargs):
 
     This macro is the same as "Set Default Metadata" + adding a translation
     link to original item.
+
+    New item is created with its final metadata in the destination desk and stage,
+    so it's written only once instead of being moved and updated after creation.
     """
     archive_service = get_resource_service("archive")
-    move_service = get_resource_service("move")
     original_item = archive_service.find_one(None, _id=item["_id"])
 
     desk_id = kwargs.get("dest_desk_id")
@@ -87,61 +84,88 @@ def set_default_metadata_with_translate(item, **kwargs):
             :1
         ]  # only first if there is one
         internal_destination = kwargs.get("internal_destination", {})
-        content_filter_id = internal_destination.get("filter", "")
-        content_filter_service = get_resource_service("content_filters")
-        content_filter = content_filter_service.find_one(
-            req=None, _id=content_filter_id
+        content_filter_id = internal_destination.get("filter")
+        content_filter = (
+            get_compiled_filter(content_filter_id) if content_filter_id else None
         )
-        if content_filter and not content_filter_service.does_match(
-            content_filter, test_item, cache=False
-        ):
+        if content_filter and not content_filter.does_match(test_item):
             raise StopDuplication()
 
     # we first do the translation, we need destination language for that
     content_template = get_default_content_template(item, **kwargs)
     template_language = content_template["data"].get("language")
-    if not template_language:
-        logger.warning("no language set in default content template")
-        new_id = archive_service.duplicate_item(
-            original_doc=original_item, operation=ITEM_DUPLICATE
-        )
-    elif template_language == original_item.get("language"):
-        new_id = archive_service.duplicate_item(
-            original_doc=original_item, operation=ITEM_DUPLICATE
-        )
-    else:
-        new_item = deepcopy(original_item)
-        new_item["language"] = template_language
-        translate_service = get_resource_service("translate")
-        new_id = translate_service.create([new_item])[0]
-
-    # translation/duplication is done, we now move the item to the new desk
-    dest = {"task": {"desk": desk_id, "stage": stage_id}}
-    move_service.move_content(new_id, dest)
-
-    # and now we apply the update
-    new_item = archive_service.find_one(req=None, _id=new_id)
 
     # set overwrite_keywords to True to overwrite the keywords.
     if "overwrite_keywords" not in kwargs:
         kwargs["overwrite_keywords"] = False
+    kwargs["content_template"] = content_template
+
+    created = []
+
+    def prepare_new_item(sender, item, original, **signal_kwargs):
+        # duplicated refs of translated package are created as they are
+        if original.get(config.ID_FIELD) != original_item[config.ID_FIELD]:
+            return
+        send_to_destination(item, original, desk_id, stage_id)
+        set_new_item_metadata(item, **kwargs)
+        created.append(item)
+
+    with item_duplicate.connected_to(prepare_new_item):
+        if not template_language:
+            logger.warning("no language set in default content template")
+            new_id = archive_service.duplicate_item(
+                original_doc=original_item, operation=ITEM_DUPLICATE
+            )
+        elif template_language == original_item.get("language"):
+            new_id = archive_service.duplicate_item(
+                original_doc=original_item, operation=ITEM_DUPLICATE
+            )
+        else:
+            new_item = deepcopy(original_item)
+            new_item["language"] = template_language
+            translate_service = get_resource_service("translate")
+            new_id = translate_service.create([new_item])[0]
+
+    if created:
+        new_item = created[0]
+        push_content_notification([new_item])
+        # finally apply any on stage rules/macros, as moving the item would do
+        apply_onstage_rule(new_item, new_id)
 
-    set_default_metadata(new_item, **kwargs)
+    # no need for further treatment, we stop here internal_destinations workflow
+    raise StopDuplication()
+
+
+def send_to_destination(item, original, desk_id, stage_id):
+    """Set destination desk and stage of the new item the same way as moving it would do."""
+    send_to(doc=item, desk_id=desk_id, stage_id=stage_id, user_id=get_user_id())
+    if item[ITEM_STATE] not in {
+        CONTENT_STATE.PUBLISHED,
+        CONTENT_STATE.SCHEDULED,
+        CONTENT_STATE.KILLED,
+        CONTENT_STATE.RECALLED,
+        CONTENT_STATE.CORRECTION,
+    }:
+        item[ITEM_STATE] = CONTENT_STATE.SUBMITTED
+    get_resource_service("move").set_change_in_desk_type(item, original)
+    item.pop(SIGN_OFF, None)
+    set_sign_off(item, original=original)
+    convert_task_attributes_to_objectId(item)
+
+
+def set_new_item_metadata(item, **kwargs):
+    """Set metadata of the new item from default content template, before it's created."""
+    set_default_metadata(item, **kwargs)
 
     # untoggle coming up
-    if new_item.get("extra", {}).get("DueBy"):
-        del new_item["extra"]["DueBy"]
+    if item.get("extra", {}).get("DueBy"):
+        del item["extra"]["DueBy"]
 
     # Set the "Belga Keywords" field with the value "Brief" upon translation
-    set_belga_keywords(new_item)
+    set_belga_keywords(item)
 
     # Change the correspondent author role to editor on translation
-    update_translation_metadata_macro(new_item)
-
-    archive_service.put(new_id, new_item)
-
-    # no need for further treatment, we stop here internal_destinations workflow
-    raise StopDuplication()
+    update_translation_metadata_macro(item)
 
 
 name = "Set Default Metadata With Translate"
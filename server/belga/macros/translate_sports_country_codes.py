@@ -1,4 +1,7 @@
-from superdesk.editor_utils import replace_text
+import re
+from functools import lru_cache
+
+from superdesk.editor_utils import Editor3Content, ENTITY_MAP, ENTITY_RANGES, INLINE_STYLE_RANGES
 
 COUNTRIES = {
     "nl": [
@@ -640,19 +643,96 @@ COUNTRIES = {
 }
 
 
+@lru_cache(maxsize=None)
+def get_translation_table(language):
+    """Get pattern matching country codes to translate into ``language`` and their translations.
+
+    Codes are matched as ``(XXX)`` or ``(XXX/``. Translations are the same as when
+    replacing codes one by one, language by language, where a code translated
+    earlier can be replaced again by a later replacement.
+
+    :param language: target language
+    :return: tuple of compiled pattern and dict of translations by code
+    """
+    translated = COUNTRIES[language]
+    replacements = [
+        (country, translated[i])
+        for lang, countries in COUNTRIES.items() if lang != language
+        for i, country in enumerate(countries)
+    ]
+    table = {}
+    for code in set(country for country, _ in replacements):
+        current = code
+        for country, translation in replacements:
+            if current == country:
+                current = translation
+        table[code] = current
+    codes = '|'.join(re.escape(code) for code in sorted(table, key=len, reverse=True))
+    return re.compile(r'\(({})([)/])'.format(codes)), table
+
+
+def replace_codes(content_state, pattern, table):
+    """Replace all country codes in editor content state in a single pass over blocks.
+
+    Entity and inline style ranges are updated the same way as in
+    :func:`superdesk.editor_utils.replace_text`.
+    """
+    for block in content_state["blocks"]:
+        if block.get("type") == "atomic":
+            entity = content_state[ENTITY_MAP][str(block[ENTITY_RANGES][0]["key"])]
+            if entity["type"] == "TABLE":
+                cells = entity["data"]["data"]["cells"]
+                for row in cells.values():
+                    for cell in row.values():
+                        replace_codes(cell, pattern, table)
+            continue
+        if not block.get("text"):
+            continue
+
+        text = block["text"]
+        parts = []
+        last = shift = 0
+        for match in pattern.finditer(text):
+            old = match.group(0)
+            new = "({}{}".format(table[match.group(1)], match.group(2))
+            index = match.start() + shift
+            _update_ranges(content_state, block, index, index + len(old), len(new) - len(old))
+            parts.extend((text[last:match.start()], new))
+            last = match.end()
+            shift += len(new) - len(old)
+        if parts:
+            block["text"] = "".join(parts) + text[last:]
+
+
+def _update_ranges(content_state, block, index, end, diff):
+    for range_field in (ENTITY_RANGES, INLINE_STYLE_RANGES):
+        if not block.get(range_field):
+            continue
+        ranges = []
+        for range_ in block[range_field]:
+            range_end = range_["offset"] + range_["length"]
+            if range_["offset"] > end:  # starting after replaced, move it
+                range_["offset"] += diff
+                ranges.append(range_)
+            elif range_end <= index:  # starting before replaced text, keep it
+                ranges.append(range_)
+            elif range_["offset"] <= index and range_end >= end:  # contain the text, fix length
+                range_["length"] += diff
+                ranges.append(range_)
+            elif range_field == ENTITY_RANGES:
+                # remove ranges overlapping with replaced text
+                content_state[ENTITY_MAP].pop(str(range_["key"]))
+        block[range_field] = ranges
+
+
 def callback(item, **kwargs):
     if not item.get("language") or not COUNTRIES.get(item["language"]):
         return
 
-    translated = COUNTRIES[item["language"]]
-    tpls = ('({})', '({}/')
-
-    for lang in COUNTRIES:
-        if lang == item["language"]:
-            continue
-        for i, country in enumerate(COUNTRIES[lang]):
-            for tpl in tpls:
-                replace_text(item, "body_html", tpl.format(country), tpl.format(translated[i]))
+    pattern, table = get_translation_table(item["language"])
+    editor = Editor3Content(item, "body_html", True)
+    replace_codes(editor.content_state, pattern, table)
+    editor.update_item()
 
     return item
 
@@ -1,8 +1,111 @@
-from superdesk.utc import utc_to_local
-from flask import current_app as app
-from typing import List, Dict, Any, TypedDict
-from babel.dates import format_date
+from functools import wraps
+from flask import current_app as app, g, has_app_context
+from typing import Callable, Iterator, List, Dict, Any, Optional, Set, Tuple, TypedDict
+from eve.utils import config
 from superdesk import get_resource_service
+from .dates import get_local_datetime, format_local_date, format_local_time
+
+ID_FIELD = config.ID_FIELD
+
+TRANSLATED_FIELDS = (
+    "description_text",
+    "name",
+    "slugline",
+    "definition_long",
+    "definition_short",
+)
+
+
+def get_items_key(items: List[Dict[str, Any]]) -> Optional[Tuple]:
+    """Get key identifying given versions of items
+
+    Returns ``None`` if some item has no id, so it can't be identified.
+    """
+    key = []
+    for item in items:
+        if not item.get(ID_FIELD):
+            return None
+        key.append(
+            (
+                str(item[ID_FIELD]),
+                item.get("_etag") or item.get("version"),
+                item.get("_updated"),
+            )
+        )
+    return tuple(key)
+
+
+def memoize_export(func: Callable) -> Callable:
+    """Memoize formatter output for the current export
+
+    Export templates (eg. headline and body) are rendered within the same
+    app context, each calling the formatter with the same items, so the
+    result is stored on ``flask.g`` and reused until the context ends.
+    """
+
+    @wraps(func)
+    def wrapper(event_data: List[Dict[str, Any]], locale: str):
+        items_key = get_items_key(event_data)
+        if items_key is None or not has_app_context():
+            return func(event_data, locale)
+        memo = g.setdefault("belga_export_memo", {})
+        key = (func.__name__, locale, items_key)
+        if key not in memo:
+            memo[key] = func(event_data, locale)
+        return memo[key]
+
+    return wrapper
+
+
+class PreloadedData(TypedDict):
+    contacts: Dict[str, Dict[str, Any]]
+    planning: Dict[str, Dict[str, Any]]
+    locations: Dict[str, Dict[str, Any]]
+
+
+def preload_data(event_data: List[Dict[str, Any]]) -> PreloadedData:
+    """Load contacts, planning items and locations referenced by events
+
+    Every resource is loaded using a single query, so formatting events
+    doesn't need a query per event.
+    """
+    contact_ids: Set[str] = set()
+    planning_ids: Set[str] = set()
+    location_guids: Set[str] = set()
+    for event in event_data:
+        contact_ids.update(str(_id) for _id in event.get("event_contact_info") or [])
+        planning_ids.update(str(_id) for _id in event.get("planning_ids") or [])
+        location = event.get("location")
+        if location and location[0].get("qcode"):
+            location_guids.add(location[0]["qcode"])
+
+    return {
+        "contacts": _find_by(ID_FIELD, "contacts", contact_ids),
+        "planning": _find_by(ID_FIELD, "planning", planning_ids),
+        "locations": _find_by("guid", "locations", location_guids),
+    }
+
+
+def _find_by(field: str, resource: str, values: Set[str]) -> Dict[str, Dict[str, Any]]:
+    if not values:
+        return {}
+    docs = get_resource_service(resource).find({field: {"$in": list(values)}})
+    return {str(doc[field]): doc for doc in docs}
+
+
+class ExportGroups:
+    """Groups of formatted events, generated on every iteration
+
+    Templates render groups one by one, so formatted events of the whole
+    export don't need to be kept in memory.
+    """
+
+    def __init__(self, generate: Callable[..., Iterator[Dict[str, Any]]], *args):
+        self._generate = generate
+        self._args = args
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self._generate(*self._args)
 
 
 class FormattedContact(TypedDict):
@@ -48,13 +151,20 @@ def set_item_dates(item: Dict[str, Any], event: Dict[str, Any]):
     }
 
     tz = item["dates"]["tz"]
-    start_local = utc_to_local(tz, item["dates"]["start"])
-    item["local_time"] = start_local.strftime("%Hu%M")
+    start_local = get_local_datetime(tz, item["dates"]["start"])
+    if start_local is None:
+        item["local_time"] = ""
+        item["local_date_time"] = ""
+        return
+    item["local_time"] = format_local_time(start_local.time(), "%Hu%M")
     item["local_date_time"] = start_local.strftime("%Y%m%d")
 
 
 def get_item_location(
-    event: Dict[str, Any], locale: str, is_only_city_and_country: bool = False
+    event: Dict[str, Any],
+    locale: str,
+    is_only_city_and_country: bool = False,
+    preloaded: Optional[PreloadedData] = None,
 ) -> str:
     """Set the location to be used for sorting / displaying"""
     location = event.get("location")
@@ -66,9 +176,9 @@ def get_item_location(
 
     # find location on DB and then extract translation Name
     if location[0].get("qcode") and event_lang:
-        location_data = get_resource_service("locations").find_one(
-            req=None, guid=location[0].get("qcode")
-        )
+        if preloaded is None:
+            preloaded = preload_data([event])
+        location_data = preloaded["locations"].get(location[0]["qcode"])
         if location_data:
             translated_name = (
                 location_data.get("translations", {})
@@ -132,25 +242,30 @@ def get_subjects(event: Dict[str, Any], language: str):
 def format_datetime(event: Dict[str, Any], locale: str, format: str):
     tz = event.get("dates", {}).get("tz") or app.config.get("DEFAULT_TIMEZONE")
     start_time = event.get("dates", {}).get("start")
-    return format_date(utc_to_local(tz, start_time), format, locale=locale)
+    start_local = get_local_datetime(tz, start_time)
+    if start_local is None:
+        return ""
+    return format_local_date(start_local.date(), format, locale)
 
 
 def set_metadata(formatted_event: Dict[str, Any], event: Dict[str, Any], locale: str):
     formatted_event["links"] = event.get("links", "")
     set_item_dates(formatted_event, event)
-    set_event_translations_value(event, locale)
-    set_item_title(formatted_event, event)
-    set_item_description(formatted_event, event)
+    translated_event = get_translated_event(event, locale)
+    set_item_title(formatted_event, translated_event)
+    set_item_description(formatted_event, translated_event)
 
 
-def get_formatted_contacts(event: Dict[str, Any]) -> List[FormattedContact]:
+def get_formatted_contacts(
+    event: Dict[str, Any], preloaded: Optional[PreloadedData] = None
+) -> List[FormattedContact]:
     contacts = event.get("event_contact_info", [])
     formatted_contacts: List[FormattedContact] = []
+    if preloaded is None:
+        preloaded = preload_data([event])
 
     for contact_id in contacts:
-        contact_details = get_resource_service("contacts").find_one(
-            req=None, _id=contact_id
-        )
+        contact_details = preloaded["contacts"].get(str(contact_id))
         if contact_details:
             formatted_contact: FormattedContact = {
                 "name": " ".join(
@@ -183,12 +298,15 @@ def get_formatted_contacts(event: Dict[str, Any]) -> List[FormattedContact]:
     return formatted_contacts
 
 
-def get_coverages(event: Dict[str, Any], locale: str):
+def get_coverages(
+    event: Dict[str, Any], locale: str, preloaded: Optional[PreloadedData] = None
+):
     formatted_coverages = []
     planning_ids = event.get("planning_ids", [])
-    planning_service = get_resource_service("planning")
+    if preloaded is None:
+        preloaded = preload_data([event])
     for id in planning_ids:
-        planning_item = planning_service.find_one(req=None, _id=id)
+        planning_item = preloaded["planning"].get(str(id)) or {}
         for coverage in planning_item.get("coverages", []):
             cov_planning = coverage.get("planning", {})
             cov_type = cov_planning.get("g2_content_type", "").upper()
@@ -202,34 +320,20 @@ def get_coverages(event: Dict[str, Any], locale: str):
     return formatted_coverages
 
 
-def set_event_translations_value(event: Dict[str, Any], locale: str):
+def get_translated_event(event: Dict[str, Any], locale: str) -> Dict[str, Any]:
     """
-    set event translations value based on locale
+    get copy of event with translated values based on locale,
+    the event itself is not modified
     """
-    translations = event.get("translations")
-    translated_value = {}
-    if translations is not None:
-        translated_value.update(
-            {
-                entry["field"]: entry["value"]
-                for entry in translations or []
-                if entry["language"] == locale
-            }
-        )
-        event.update(
-            {
-                key: val
-                for key, val in translated_value.items()
-                if key
-                in (
-                    "description_text",
-                    "name",
-                    "slugline",
-                    "definition_long",
-                    "definition_short",
-                )
-            }
-        )
+    translated_event = dict(event)
+    translated_event.update(
+        {
+            entry["field"]: entry["value"]
+            for entry in event.get("translations") or []
+            if entry["language"] == locale and entry["field"] in TRANSLATED_FIELDS
+        }
+    )
+    return translated_event
 
 
 def reorder_address(address: str) -> str:
@@ -0,0 +1,50 @@
+"""Cached date formatting for planning exports
+
+Exported events often share timezones and dates (eg. recurring series),
+so timezone and locale objects, local datetimes and formatted values
+are cached and computed only once per distinct value.
+"""
+
+import datetime
+from functools import lru_cache
+from typing import Optional
+
+import pytz
+from babel import Locale
+from babel.dates import format_date
+
+
+@lru_cache(maxsize=None)
+def get_timezone(tz_name: str) -> pytz.BaseTzInfo:
+    return pytz.timezone(tz_name)
+
+
+@lru_cache(maxsize=None)
+def get_locale(locale: str) -> Locale:
+    return Locale.parse(locale)
+
+
+@lru_cache(maxsize=4096)
+def get_local_datetime(tz_name: str, utc_datetime: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """Convert utc datetime to local datetime, same as ``superdesk.utc.utc_to_local``
+
+    Returns ``None`` if there is no datetime or timezone.
+    """
+    if not utc_datetime or not tz_name:
+        return None
+    if not utc_datetime.tzinfo:
+        utc_datetime = utc_datetime.replace(tzinfo=pytz.utc)
+    local_tz = get_timezone(tz_name)
+    return local_tz.normalize(utc_datetime.astimezone(local_tz))
+
+
+@lru_cache(maxsize=1024)
+def format_local_date(local_date: datetime.date, format: str, locale: str) -> str:
+    """Format date using babel pattern, eg. day header ``EEEE d MMMM``"""
+    return format_date(local_date, format, locale=get_locale(locale))
+
+
+@lru_cache(maxsize=1024)
+def format_local_time(local_time: datetime.time, format: str) -> str:
+    """Format time using strftime format, eg. ``%H:%M``"""
+    return local_time.strftime(format)
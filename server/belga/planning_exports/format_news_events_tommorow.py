@@ -4,9 +4,13 @@ from .common import (
     get_formatted_contacts,
     get_coverages,
     get_item_location,
+    preload_data,
+    ExportGroups,
+    PreloadedData,
 )
-from typing import List, Dict, Any
-from superdesk.utc import utc_to_local
+from .dates import get_local_datetime, format_local_time
+from itertools import groupby
+from typing import Iterator, List, Dict, Any
 
 
 CALENDAR_ORDER = [
@@ -21,48 +25,52 @@ CALENDAR_ORDER = [
 ]
 
 
-def format_event_for_tommorow(
-    event_data: List[Dict[str, Any]], locale: str
-) -> List[Dict[str, Any]]:
-    events_list: List[Dict[str, Any]] = []
+def get_calendar(event: Dict[str, Any]) -> str:
+    return event["calendars"][0]["qcode"].capitalize() if event.get("calendars") else ""
 
-    # Sort events by calendar if calendars exist
+
+def format_event_for_tommorow(event_data: List[Dict[str, Any]], locale: str):
+    # Sort events by calendar order, filtering out events with calendar not present in CALENDAR_ORDER
     sorted_events = sorted(
-        event_data,
-        key=lambda x: x["calendars"][0]["qcode"] if x.get("calendars") else "",
+        (event for event in event_data if get_calendar(event) in CALENDAR_ORDER),
+        key=lambda x: (
+            CALENDAR_ORDER.index(get_calendar(x)),
+            x["calendars"][0]["qcode"],
+        ),
     )
+    return ExportGroups(generate_calendars, sorted_events, locale)
 
-    calendar = None
-    for event in sorted_events:
-        # Format event details
-        formatted_event = {
-            "subject": ",".join(get_subjects(event, "fr")),
-            "calendars": event["calendars"][0]["qcode"].capitalize()
-            if event.get("calendars")
-            else "",
-            "contacts": get_formatted_contacts(event),
-            "coverages": get_coverages(event, locale),
-            "location": get_item_location(event, locale),
-        }
-        set_metadata(formatted_event, event, locale)
 
-        # Format time in local timezone
-        dates = formatted_event["dates"]
-        start_local = utc_to_local(dates["tz"], dates["start"])
-        end_local = utc_to_local(dates["tz"], dates["end"])
-        formatted_event[
-            "time"
-        ] = f"{start_local.strftime('%H:%M')} - {end_local.strftime('%H:%M')}"
+def generate_calendars(
+    sorted_events: List[Dict[str, Any]], locale: str
+) -> Iterator[Dict[str, Any]]:
+    """Yield formatted events grouped by calendar, in order"""
+    preloaded = preload_data(sorted_events)
 
-        # Check if calendar has changed
-        if formatted_event["calendars"] != calendar:
-            calendar = formatted_event["calendars"]
-            events_list.append({"calendar": calendar, "events": []})
+    for calendar, events in groupby(sorted_events, key=get_calendar):
+        yield {
+            "calendar": calendar,
+            "events": [format_event(event, locale, preloaded) for event in events],
+        }
 
-        # Append formatted event to corresponding calendar group
-        events_list[-1]["events"].append(formatted_event)
 
-    # filter out events if calendar is not present in CALENDAR_ORDER
-    filtered_data = [item for item in events_list if item["calendar"] in CALENDAR_ORDER]
+def format_event(
+    event: Dict[str, Any], locale: str, preloaded: PreloadedData
+) -> Dict[str, Any]:
+    formatted_event = {
+        "subject": ",".join(get_subjects(event, "fr")),
+        "calendars": get_calendar(event),
+        "contacts": get_formatted_contacts(event, preloaded),
+        "coverages": get_coverages(event, locale, preloaded),
+        "location": get_item_location(event, locale, preloaded=preloaded),
+    }
+    set_metadata(formatted_event, event, locale)
 
-    return sorted(filtered_data, key=lambda x: CALENDAR_ORDER.index(x["calendar"]))
+    # Format time in local timezone
+    dates = formatted_event["dates"]
+    start_local = get_local_datetime(dates["tz"], dates["start"])
+    end_local = get_local_datetime(dates["tz"], dates["end"])
+    formatted_event["time"] = " - ".join(
+        format_local_time(local.time(), "%H:%M") for local in (start_local, end_local) if local is not None
+    )
+    return formatted_event
@@ -1,34 +1,53 @@
-from .common import set_metadata, get_subjects, format_datetime, get_item_location
-from typing import List, Dict, Any
+from .common import (
+    set_metadata,
+    get_subjects,
+    format_datetime,
+    get_item_location,
+    preload_data,
+    memoize_export,
+    ExportGroups,
+)
+from typing import Iterator, List, Dict, Any, Optional
 
 
+@memoize_export
 def format_event_for_week(event_data: List[Dict[str, Any]], locale: str):
-    events_list: List[Dict[str, Any]] = []
-
     sorted_events = sorted(event_data, key=lambda x: x["dates"]["start"])
 
+    return {
+        "events_list": ExportGroups(generate_days, sorted_events, locale),
+        "start_date": format_datetime(sorted_events[0], locale, "EEEE d"),
+        "end_date": format_datetime(sorted_events[-1], locale, "EEEE d"),
+        "month": format_datetime(sorted_events[0], locale, "MMMM"),
+    }
+
+
+def generate_days(
+    sorted_events: List[Dict[str, Any]], locale: str
+) -> Iterator[Dict[str, Any]]:
+    """Yield formatted events grouped by day and subject, in order"""
+    preloaded = preload_data(sorted_events)
+
+    day: Optional[Dict[str, Any]] = None
     current_date = None
     for event in sorted_events:
         subjects = get_subjects(event, locale)
         formatted_event = {
             "subject": subjects[0] if len(subjects) != 0 else "",
-            "location": get_item_location(event, locale, True),
+            "location": get_item_location(event, locale, True, preloaded),
         }
         set_metadata(formatted_event, event, locale)
 
-        if formatted_event["local_date_time"] != current_date:
+        if day is None or formatted_event["local_date_time"] != current_date:
+            if day is not None:
+                yield day
             current_date = formatted_event["local_date_time"]
             formatted_current_date = format_datetime(event, locale, "EEEE d MMMM")
-            events_list.append({"date": formatted_current_date, "subjects": {}})
+            day = {"date": formatted_current_date, "subjects": {}}
 
-        subject = formatted_event["subject"]
-        if subject not in events_list[-1]["subjects"]:
-            events_list[-1]["subjects"][subject] = []
-        events_list[-1]["subjects"][subject].append(formatted_event)
+        day["subjects"].setdefault(formatted_event["subject"], []).append(
+            formatted_event
+        )
 
-    return {
-        "events_list": events_list,
-        "start_date": format_datetime(sorted_events[0], locale, "EEEE d"),
-        "end_date": format_datetime(sorted_events[-1], locale, "EEEE d"),
-        "month": format_datetime(sorted_events[0], locale, "MMMM"),
-    }
+    if day is not None:
+        yield day
@@ -1,22 +1,42 @@
 from typing import Optional, Dict, Any, List
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import json
+import time
 import logging
+import threading
 
-from superdesk import get_resource_service
+from flask import current_app as app, g
+from eve.utils import ParsedRequest
+from superdesk import get_resource_service, config
+from apps.content import push_content_notification
 from apps.search_providers.proxy import PROXY_ENDPOINT
 from planning.types import Event, Planning, Assignment, EventRelatedItem
 
+from belga.lookup_cache import lookup_cache, get_ttl, CONTENT_TYPES
+
 
 logger = logging.getLogger(__name__)
 
+# seconds to wait for the content item to be created before adding late related items
+ITEM_CREATED_TIMEOUT = 30
+
 
-def _get_associated_event_from_planning(planning: Planning) -> Optional[Event]:
+def _get_associated_event_from_planning(
+    planning: Planning, projection: Optional[Dict[str, int]] = None
+) -> Optional[Event]:
     event_id = planning.get("event_item")
     if not event_id:
         # No Event associated with the Planning item, no need to continue
         return None
 
+    req = None
+    if projection:
+        req = ParsedRequest()
+        req.args = {}
+        req.projection = json.dumps(projection)
+
     try:
-        event = get_resource_service("events").find_one(req=None, _id=event_id)
+        event = get_resource_service("events").find_one(req=req, _id=event_id)
     except Exception:
         # Failed to retrieve the Event
         logger.exception("Exception raised while finding event")
@@ -31,6 +51,20 @@ def _get_associated_event_from_planning(planning: Planning) -> Optional[Event]:
 
 
 def _get_related_content_field_to_use(content_profile: Dict[str, Any]) -> Optional[str]:
+    profile_id = content_profile.get(config.ID_FIELD)
+    if not profile_id:
+        return _find_related_content_field(content_profile)
+
+    # profile schema doesn't change often, cached value is dropped when profiles are changed
+    return lookup_cache.get(
+        CONTENT_TYPES,
+        ("related_content_field", str(profile_id)),
+        lambda: _find_related_content_field(content_profile),
+        get_ttl(),
+    )
+
+
+def _find_related_content_field(content_profile: Dict[str, Any]) -> Optional[str]:
     related_content_fields = [
         field
         for field, schema in (content_profile.get("schema") or {}).items()
@@ -51,7 +85,8 @@ def _get_related_content_field_to_use(content_profile: Dict[str, Any]) -> Option
 
 
 def _get_related_items_from_planning(planning: Planning, language: Optional[str] = None) -> List[EventRelatedItem]:
-    event = _get_associated_event_from_planning(planning)
+    # only ``related_items`` of the event are needed, not the whole document
+    event = _get_associated_event_from_planning(planning, projection={"related_items": 1})
     if not event:
         return []
 
@@ -86,6 +121,80 @@ def _get_event_related_item_from_search_proxy(related_item: EventRelatedItem) ->
     return external_item
 
 
+def _init_worker(flask_app, user, role):
+    # worker has no app context on its own, user is set so privileges are checked like in the request
+    flask_app.app_context().push()
+    if user:
+        g.user = user
+        g.role = role
+
+
+def _fetch_related_items(related_items: List[EventRelatedItem]) -> List[Future]:
+    """Start fetching related items concurrently, returns futures in the order of ``related_items``"""
+    flask_app = app._get_current_object()
+    workers = min(app.config.get("BELGA_RELATED_ITEMS_WORKERS", 4), len(related_items))
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, workers),
+        initializer=_init_worker,
+        initargs=(flask_app, g.get("user"), g.get("role")),
+    )
+    futures = [
+        executor.submit(_get_event_related_item_from_search_proxy, related_item) for related_item in related_items
+    ]
+    # don't wait for running fetches, late items are added in background
+    executor.shutdown(wait=False)
+    return futures
+
+
+def _add_related_items(
+    associations: Dict[str, Any], related_content_field: str, external_items: List[Optional[Dict[str, Any]]]
+):
+    """Add related items after the ones already in ``associations``, ordered as in ``external_items``"""
+    prefix = f"{related_content_field}--"
+    content_index = 1 + max(
+        [int(key[len(prefix):]) for key in associations if key.startswith(prefix) and key[len(prefix):].isdigit()],
+        default=0,
+    )
+    for external_item in external_items:
+        if not external_item:
+            continue
+
+        # Add ``"order": content_index`` to related_item
+        external_item["order"] = content_index
+        associations[f"{prefix}{content_index}"] = external_item
+        content_index += 1
+
+
+def _add_late_related_items(flask_app, item: Dict[str, Any], related_content_field: str, futures: List[Future]):
+    """Add related items fetched after the deadline to the created content item"""
+    wait(futures, timeout=flask_app.config.get("BELGA_RELATED_ITEMS_LATE_TIMEOUT", 60))
+    external_items = [future.result() for future in futures if future.done()]
+    if not any(external_items):
+        return
+
+    # content item is created once the signal handlers are done
+    deadline = time.monotonic() + ITEM_CREATED_TIMEOUT
+    while not item.get(config.ID_FIELD) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    if not item.get(config.ID_FIELD):
+        logger.warning("Content item was not created, late related items not added")
+        return
+
+    with flask_app.app_context():
+        archive_service = get_resource_service("archive")
+        original = archive_service.find_one(req=None, _id=item[config.ID_FIELD])
+        if not original:
+            logger.warning("Content item not found, late related items not added")
+            return
+
+        associations = dict(original.get("associations") or {})
+        _add_related_items(associations, related_content_field, external_items)
+        # item is locked by the user working on it, update changes its etag
+        # so the client refetches it instead of overwriting the related items
+        archive_service.update(original[config.ID_FIELD], {"associations": associations}, original)
+        push_content_notification([original])
+
+
 def on_assignment_start_working(
     _sender: Any,
     assignment: Assignment,
@@ -104,17 +213,27 @@ def on_assignment_start_working(
         # No related items in the appropriate language attached, no need to continue
         return
 
-    # 3. Iterate over ``related_items`` and:
-    #   2.1. Get search provider details
-    #   2.2. Fetch entire related item from search provider
-    #   2.3. Add entire related item to content's related articles field
-    content_index = 1
-    for related_item in related_items:
-        external_item = _get_event_related_item_from_search_proxy(related_item)
-        if not external_item:
-            continue
-
-        # Add ``"order": content_index`` to related_item
-        external_item["order"] = content_index
-        item.setdefault("associations", {})[f"{related_content_field}--{content_index}"] = external_item
-        content_index += 1
+    # 3. Fetch entire related items from search providers concurrently, waiting until the deadline
+    futures = _fetch_related_items(related_items)
+    _done, pending = wait(futures, timeout=app.config.get("BELGA_RELATED_ITEMS_TIMEOUT", 5))
+
+    # 4. Add fetched related items to content's related articles field, in the order of ``related_items``
+    associations: Dict[str, Any] = {}
+    _add_related_items(
+        associations,
+        related_content_field,
+        [future.result() for future in futures if future not in pending],
+    )
+    if associations:
+        item.setdefault("associations", {}).update(associations)
+
+    # 5. Items fetched after the deadline are added once the content item is created
+    if pending:
+        logger.warning("%d related items not fetched in time, adding them later", len(pending))
+        flask_app = app._get_current_object()
+        thread = threading.Thread(
+            target=_add_late_related_items,
+            args=(flask_app, item, related_content_field, [future for future in futures if future in pending]),
+            daemon=True,
+        )
+        thread.start()
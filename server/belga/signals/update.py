@@ -1,8 +1,9 @@
-from superdesk import get_resource_service
 from superdesk.metadata.item import CONTENT_STATE
 from superdesk.utc import utcnow
 from datetime import timedelta
 
+from belga.lookup_cache import get_profile_id
+
 TEXT = 'TEXT'
 ALERT = 'ALERT'
 
@@ -10,12 +11,11 @@ DISTRIBUTION_ID = 'distribution'
 
 
 def handle_update(sender, item, original, **kwargs):
-    profile_service = get_resource_service('content_types')
-    alert = profile_service.find_one(req=None, label=ALERT)
-    if alert and str(item.get('profile')) == str(alert['_id']):
-        text = profile_service.find_one(req=None, label=TEXT)
+    alert = get_profile_id(ALERT)
+    if alert and str(item.get('profile')) == str(alert):
+        text = get_profile_id(TEXT)
         if text:
-            item['profile'] = text['_id']
+            item['profile'] = text
             item['urgency'] = 3
             item.setdefault('subject', [])
             subject = [subj for subj in item['subject'] if subj.get('scheme') != DISTRIBUTION_ID]
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     "belga.macros",
     "belga.signals",
     "belga.ai_proxy",
+    "belga.lookup_cache",
     #  'belga.schema',  try without custom search analyzer
     "superdesk.text_checkers.spellcheckers.default",
     "superdesk.text_checkers.spellcheckers.grammalecte",
@@ -356,6 +357,34 @@ DATE_FORMAT_SHORT = "%d/%m/%Y"
 
 BELGA_AI_URL = env("BELGA_AI_URL")
 
+# number of workers parsing files for file-belga and ftp-belga feeding services,
+# defaults to 4 threads or 2 processes, use 1 to parse files in the ingest worker
+BELGA_INGEST_PARSE_WORKERS = env("BELGA_INGEST_PARSE_WORKERS")
+# parse files in forked processes instead of threads
+BELGA_INGEST_PARSE_PROCESSES = env("BELGA_INGEST_PARSE_PROCESSES", "false").lower() in ("1", "true", "yes")
+
+# number of emails fetched from the server in a single request by email-belga feeding service
+BELGA_EMAIL_FETCH_BATCH_SIZE = int(env("BELGA_EMAIL_FETCH_BATCH_SIZE", 50))
+# max number of emails ingested by a single update, the rest is ingested by next updates
+BELGA_EMAIL_FETCH_LIMIT = int(env("BELGA_EMAIL_FETCH_LIMIT", 500))
+
+# iframely embeds for twitter_belga feeding service,
+# number of parallel requests, request timeout and cache ttl (seconds) for embeds and url errors
+BELGA_IFRAMELY_WORKERS = int(env("BELGA_IFRAMELY_WORKERS", 4))
+BELGA_IFRAMELY_TIMEOUT = int(env("BELGA_IFRAMELY_TIMEOUT", 10))
+BELGA_IFRAMELY_CACHE_TTL = int(env("BELGA_IFRAMELY_CACHE_TTL", 3600))
+BELGA_IFRAMELY_ERROR_CACHE_TTL = int(env("BELGA_IFRAMELY_ERROR_CACHE_TTL", 600))
+
+# seconds to cache content profile ids and vocabulary items used by macros and signals,
+# changes done in other processes are visible after this time
+BELGA_LOOKUP_CACHE_TTL = int(env("BELGA_LOOKUP_CACHE_TTL", 60))
+
+# related items of an event are fetched concurrently when starting to work on an assignment,
+# items not fetched within the timeout are added to the content item later
+BELGA_RELATED_ITEMS_WORKERS = int(env("BELGA_RELATED_ITEMS_WORKERS", 4))
+BELGA_RELATED_ITEMS_TIMEOUT = int(env("BELGA_RELATED_ITEMS_TIMEOUT", 5))
+BELGA_RELATED_ITEMS_LATE_TIMEOUT = int(env("BELGA_RELATED_ITEMS_LATE_TIMEOUT", 60))
+
 START_OF_WEEK = 1
 
 ASSIGNMENT_MAIL_ICAL_USE_EVENT_DATES = True
@@ -4,6 +4,7 @@ from superdesk.tests import TestCase as CoreTestCase
 from apps.prepopulate.app_populate import AppPopulateCommand
 
 import belga  # noqa
+from belga.lookup_cache import lookup_cache
 
 
 class TestCase(CoreTestCase):
@@ -16,6 +17,7 @@ class TestCase(CoreTestCase):
 
     def setUpForChildren(self):
         super().setUpForChildren()
+        lookup_cache.clear()
 
         # belga related configs
         self.app.config['OUTPUT_BELGA_URN_SUFFIX'] = 'tst'
@@ -7,9 +7,19 @@
 # For the full copyright and license information, please see the
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
+import io
 import os
+import json
+import tempfile
+from unittest import mock
 
-from belga.command.contacts_import import import_contacts_via_json_file
+import superdesk
+from belga.command import contacts_import
+from belga.command.contacts_import import (
+    import_contacts_via_json_file,
+    sync_contacts_via_json_file,
+    iter_json_array,
+)
 from .. import TestCase
 
 
@@ -19,9 +29,14 @@ class BelgaContactImportTestCase(TestCase):
     def setUp(self):
         dirname = os.path.dirname(os.path.realpath(__file__))
         fixture = os.path.normpath(os.path.join(dirname, './fixtures', self.filename))
-        self.items = import_contacts_via_json_file(fixture)
+        with mock.patch.object(superdesk.get_resource_service('contacts'), 'find',
+                               wraps=superdesk.get_resource_service('contacts').find) as find:
+            self.count = import_contacts_via_json_file(fixture, batch_size=1)
+        self.assertEqual(1, find.call_count)
+        self.items = list(superdesk.get_resource_service('contacts').find({}))
 
     def test_import(self):
+        self.assertEqual(self.count, 2)
         self.assertEqual(len(self.items), 2)
         item = self.items[0]
         self.assertEqual(item["schema"], {'is_active': True, 'public': True})
@@ -40,3 +55,91 @@ class BelgaContactImportTestCase(TestCase):
                          ['Rue M. Sandron 114\n\n5680 Doische', 'rue des Tilleuls 84\n\n5680 Romer¿e'])
         self.assertEqual(item["keywords"], "POLITICS ")
         self.assertEqual(item["original_id"], "11223")
+
+    def test_import_again(self):
+        dirname = os.path.dirname(os.path.realpath(__file__))
+        fixture = os.path.normpath(os.path.join(dirname, './fixtures', self.filename))
+        self.assertEqual(0, import_contacts_via_json_file(fixture))
+
+    def test_iter_json_array(self):
+        data = '[{"a": "],"}, 1, [2, 3], "x"]'
+        for chunk_size in (1, 3, 100):
+            self.assertEqual([{'a': '],'}, 1, [2, 3], 'x'], list(iter_json_array(io.StringIO(data), chunk_size)))
+
+
+class BelgaContactSyncTestCase(TestCase):
+    def sync(self, contacts, **kwargs):
+        with tempfile.NamedTemporaryFile('wt', suffix='.json', encoding='utf-8') as contacts_file:
+            json.dump(contacts, contacts_file)
+            contacts_file.flush()
+            return sync_contacts_via_json_file(contacts_file.name, **kwargs)
+
+    def test_sync(self):
+        contacts = [
+            {'contactId': 1, 'firstName': 'John', 'lastName': 'Doe', 'email': 'john@example.com'},
+            {'contactId': 2, 'company': 'ACME'},
+        ]
+        self.assertEqual({'created': 2, 'updated': 0, 'unchanged': 0, 'deactivated': 0}, self.sync(contacts))
+
+        service = superdesk.get_resource_service('contacts')
+        with mock.patch.object(service, 'patch', wraps=service.patch) as patch:
+            self.assertEqual({'created': 0, 'updated': 0, 'unchanged': 2, 'deactivated': 0}, self.sync(contacts))
+        patch.assert_not_called()
+
+        contacts[0]['function'] = 'Editor'
+        self.assertEqual(
+            {'created': 1, 'updated': 1, 'unchanged': 0, 'deactivated': 1},
+            self.sync([contacts[0], {'contactId': 3, 'company': 'Other'}], deactivate_missing=True),
+        )
+        self.assertEqual('Editor', service.find_one(req=None, original_id='1')['job_title'])
+        self.assertFalse(service.find_one(req=None, original_id='2')['is_active'])
+        self.assertEqual(3, len(list(service.find({}))))
+
+        # fields missing in belga contact are cleared, not set to None
+        del contacts[0]['email']
+        self.assertEqual(
+            {'created': 0, 'updated': 2, 'unchanged': 1, 'deactivated': 0},
+            self.sync(contacts + [{'contactId': 3, 'company': 'Other'}]),
+        )
+        john = service.find_one(req=None, original_id='1')
+        self.assertEqual([], john['contact_email'])
+        self.assertEqual('', john['twitter'])
+        # contact deactivated by sync is active again
+        self.assertTrue(service.find_one(req=None, original_id='2')['is_active'])
+
+    def test_sync_bulk_updates(self):
+        contacts = [{'contactId': i, 'company': 'Company {}'.format(i)} for i in range(5)]
+        self.sync(contacts)
+        for contact in contacts:
+            contact['function'] = 'Editor'
+
+        service = superdesk.get_resource_service('contacts')
+        with mock.patch.object(service, 'patch') as patch, \
+                mock.patch('belga.command.contacts_import.bulk_update_contacts',
+                           wraps=contacts_import.bulk_update_contacts) as bulk_update:
+            self.assertEqual(
+                {'created': 0, 'updated': 4, 'unchanged': 0, 'deactivated': 1},
+                self.sync(contacts[:4], batch_size=2, deactivate_missing=True),
+            )
+        patch.assert_not_called()
+        self.assertEqual([2, 2, 1], [len(call[0][0]) for call in bulk_update.call_args_list])
+        self.assertEqual(4, len(list(service.find({'job_title': 'Editor'}))))
+        self.assertFalse(service.find_one(req=None, original_id='4')['is_active'])
+
+    def test_sync_skips_missing_id(self):
+        contacts = [{'firstName': 'John', 'lastName': 'Doe'}, {'company': 'ACME'}]
+        self.assertEqual({'created': 0, 'updated': 0, 'unchanged': 0, 'deactivated': 0}, self.sync(contacts))
+        self.assertEqual(0, len(list(superdesk.get_resource_service('contacts').find({}))))
+
+    def test_sync_keeps_user_deactivated(self):
+        contacts = [{'contactId': 1, 'firstName': 'John', 'lastName': 'Doe'}]
+        self.sync(contacts)
+        service = superdesk.get_resource_service('contacts')
+        contact = service.find_one(req=None, original_id='1')
+        service.patch(contact['_id'], {'is_active': False})
+
+        contacts[0]['function'] = 'Editor'
+        self.assertEqual({'created': 0, 'updated': 1, 'unchanged': 0, 'deactivated': 0}, self.sync(contacts))
+        contact = service.find_one(req=None, original_id='1')
+        self.assertEqual('Editor', contact['job_title'])
+        self.assertFalse(contact['is_active'])
@@ -0,0 +1,73 @@
+import imaplib
+import threading
+from unittest import mock
+
+import superdesk
+
+from belga.command import email_idle
+from belga.io.feeding_services.email_belga import EmailBelgaFeedingService
+from tests import TestCase
+from tests.io.feeding_services.imap_server import IMAPServer
+
+
+class EmailIdleTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.provider = {
+            '_id': 'provider',
+            'name': 'Test',
+            'feeding_service': EmailBelgaFeedingService.NAME,
+            'config': {'persistent': True},
+        }
+        self.app.data.insert('ingest_providers', [self.provider])
+
+    def test_watch_provider_retries_and_stops_when_closed(self):
+        service = superdesk.get_resource_service('ingest_providers')
+        calls = []
+
+        def connect(provider):
+            calls.append(provider)
+            if len(calls) == 2:
+                service.system_update('provider', {'is_closed': True}, provider)
+            raise RuntimeError('unexpected')
+
+        with mock.patch.object(EmailBelgaFeedingService, '_connect', side_effect=connect), \
+                mock.patch.object(email_idle, '_wait') as wait:
+            with self.assertLogs('belga.command.email_idle', level='ERROR'):
+                email_idle.watch_provider(self.provider, 1)
+
+        self.assertEqual(2, len(calls))
+        self.assertEqual(
+            [mock.call(email_idle.RECONNECT_DELAY, None), mock.call(email_idle.RECONNECT_DELAY * 2, None)],
+            wait.call_args_list,
+        )
+
+    def test_watch_provider_backoff_when_idle_fails(self):
+        server = IMAPServer(reject_idle=True).start()
+        self.addCleanup(server.stop)
+
+        def connect(provider):
+            imap = imaplib.IMAP4('127.0.0.1', server.port)
+            imap.login('user', 'password')
+            imap.select('INBOX')
+            return imap
+
+        stop_event = threading.Event()
+        delays = []
+
+        def wait(seconds, _stop_event):
+            delays.append(seconds)
+            if len(delays) == 3:
+                stop_event.set()
+
+        with mock.patch.object(EmailBelgaFeedingService, '_connect', side_effect=connect), \
+                mock.patch.object(email_idle, '_wait', side_effect=wait):
+            with self.assertLogs('belga.command.email_idle', level='WARNING'):
+                email_idle.watch_provider(self.provider, 1, stop_event)
+
+        # connection failing before waiting for emails is not reused at once
+        self.assertEqual(3, server.mailbox.logins)
+        self.assertEqual(
+            [email_idle.RECONNECT_DELAY, email_idle.RECONNECT_DELAY * 2, email_idle.RECONNECT_DELAY * 4],
+            delays,
+        )
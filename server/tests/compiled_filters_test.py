@@ -0,0 +1,48 @@
+from bson import ObjectId
+
+from belga.compiled_filters import get_compiled_filter
+from belga.lookup_cache import lookup_cache
+from tests import TestCase
+
+
+class CompiledFiltersTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        lookup_cache.clear()
+        self.fc_ids = self.app.data.insert('filter_conditions', [
+            {'_id': ObjectId(), 'operator': 'in', 'field': 'services-products', 'value': 'BIN/ALG', 'name': 'alg'},
+            {'_id': ObjectId(), 'operator': 'in', 'field': 'services-products', 'value': 'BIN/ECO', 'name': 'eco'},
+        ])
+        self.app.data.insert('content_filters', [
+            {'_id': 'alg', 'name': 'alg', 'content_filter': [{'expression': {'fc': [self.fc_ids[0]]}}]},
+            {'_id': 'alg_or_eco', 'name': 'alg or eco', 'content_filter': [
+                {'expression': {'pf': ['alg']}},
+                {'expression': {'fc': [self.fc_ids[1]]}},
+            ]},
+        ])
+
+    def get_item(self, qcode):
+        return {'subject': [{'name': qcode, 'qcode': qcode, 'scheme': 'services-products'}]}
+
+    def test_does_match(self):
+        self.assertIsNone(get_compiled_filter('missing'))
+
+        content_filter = get_compiled_filter('alg_or_eco')
+        self.assertTrue(content_filter.does_match(self.get_item('BIN/ALG')))
+        self.assertTrue(content_filter.does_match(self.get_item('BIN/ECO')))
+        self.assertFalse(content_filter.does_match(self.get_item('BIN/SPO')))
+
+        # compiled filter is reused, matching needs no queries
+        self.assertIs(content_filter, get_compiled_filter('alg_or_eco'))
+
+    def test_invalidate(self):
+        self.assertFalse(get_compiled_filter('alg').does_match(self.get_item('BIN/ECO')))
+
+        # filter condition change drops compiled filters
+        self.app.data.update('filter_conditions', self.fc_ids[0], {'value': 'BIN/ECO'}, {})
+        self.app.on_updated_filter_conditions({'value': 'BIN/ECO'}, {'_id': self.fc_ids[0]})
+        self.assertTrue(get_compiled_filter('alg').does_match(self.get_item('BIN/ECO')))
+
+        self.app.data.remove('content_filters', {'_id': 'alg'})
+        self.app.on_deleted_item_content_filters({'_id': 'alg'})
+        self.assertIsNone(get_compiled_filter('alg'))
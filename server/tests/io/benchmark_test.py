@@ -0,0 +1,40 @@
+import shutil
+import tempfile
+from collections import Counter
+
+import superdesk
+
+from belga.io.benchmark import run_benchmark, count_db_calls, get_formats
+from tests import TestCase
+
+
+class IngestBenchmarkTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_run_benchmark(self):
+        results = run_benchmark(self.path, size=3, names=['afp', 'iptc7901_dpa', 'spreadsheet'])
+        self.assertEqual([result.name for result in results], ['afp', 'iptc7901_dpa', 'spreadsheet'])
+        for result in results:
+            self.assertEqual(result.errors, 0)
+            self.assertEqual(result.items, 3)
+            self.assertGreater(result.items_per_sec, 0)
+            self.assertGreater(result.peak_memory, 0)
+        # afp parser is mapping countries and sources using vocabularies
+        self.assertGreater(results[0].db_calls_per_item('vocabularies'), 0)
+        self.assertEqual(results[2].db_calls_per_item('vocabularies'), 0)
+
+    def test_count_db_calls(self):
+        counter = Counter()
+        with count_db_calls(counter):
+            superdesk.get_resource_service('vocabularies').find_one(req=None, _id='country')
+            superdesk.get_resource_service('users').find_one(req=None, username='foo')
+            list(superdesk.get_resource_service('vocabularies').find({}))
+        self.assertEqual(counter, Counter({'vocabularies': 2, 'users': 1}))
+        self.assertNotIn('find_one', vars(superdesk.get_backend()))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            get_formats(['foo'])
@@ -0,0 +1,46 @@
+import threading
+import unittest
+
+from belga.io.feed_parsers.parse_context import ParseContextMixin, context_attribute
+
+
+class DummyParser(ParseContextMixin):
+    _items = context_attribute("items")
+
+    def parse(self, name, provider=None, nested=None, barrier=None):
+        with self.new_parse_context(provider):
+            self.root = name
+            self._items = []
+            if barrier is not None:
+                barrier.wait()
+            if nested is not None:
+                self.parse(nested)
+            self._items.append(self.root)
+            return self._items, self._provider
+
+
+class ParseContextTestCase(unittest.TestCase):
+    def test_parse_is_reentrant(self):
+        parser = DummyParser()
+        items, provider = parser.parse("outer", {"name": "test"}, nested="inner")
+        self.assertEqual(items, ["outer"])
+        self.assertEqual(provider, {"name": "test"})
+        self.assertIsNone(parser.root)
+
+    def test_parse_in_threads(self):
+        parser = DummyParser()
+        barrier = threading.Barrier(4)
+        results = {}
+
+        def run(name):
+            results[name] = parser.parse(name, {"name": name}, barrier=barrier)
+
+        threads = [threading.Thread(target=run, args=(str(i),)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for name, (items, provider) in results.items():
+            self.assertEqual(items, [name])
+            self.assertEqual(provider, {"name": name})
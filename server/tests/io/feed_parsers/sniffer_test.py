@@ -0,0 +1,27 @@
+import os
+import unittest
+from unittest.mock import MagicMock
+
+from belga.io.feed_parsers import sniffer
+
+
+class SnifferTestCase(unittest.TestCase):
+    def setUp(self):
+        dirname = os.path.dirname(os.path.realpath(__file__))
+        self.fixture = os.path.normpath(os.path.join(dirname, '../fixtures', 'dpa.txt'))
+        with open(self.fixture, 'rb') as f:
+            self.content = f.read()
+
+    def test_sniff_once(self):
+        detect = MagicMock(return_value='dpa')
+        self.assertEqual(sniffer.sniff(self.fixture, 'test', detect), 'dpa')
+        self.assertEqual(sniffer.sniff(self.fixture, 'test', detect), 'dpa')
+        detect.assert_called_once_with(self.content[:sniffer.HEADER_SIZE])
+
+    def test_first_line(self):
+        self.assertEqual(sniffer.first_line(sniffer.read_header(self.fixture)), self.content.splitlines(True)[0])
+
+    def test_map_file(self):
+        with sniffer.map_file(self.fixture) as buf:
+            self.assertEqual(buf[:], self.content)
+            self.assertEqual(buf.readline(), self.content.splitlines(True)[0])
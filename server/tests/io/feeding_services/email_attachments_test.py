@@ -0,0 +1,48 @@
+import io
+import os
+import hashlib
+from email import encoders, message_from_bytes
+from email.mime.application import MIMEApplication
+from unittest import mock
+
+from belga.io.feeding_services import email_attachments
+from tests import TestCase
+
+
+def get_part(data, encoder=encoders.encode_base64):
+    part = MIMEApplication(data, _encoder=encoder)
+    part.add_header('Content-Disposition', 'attachment', filename='file.bin')
+    return message_from_bytes(part.as_bytes())
+
+
+class EmailAttachmentsTestCase(TestCase):
+    def test_decode_payload(self):
+        data = os.urandom(10000)
+        for encoder in (encoders.encode_base64, encoders.encode_quopri):
+            part = get_part(data, encoder)
+            out = io.BytesIO()
+            with mock.patch.object(email_attachments, 'CHUNK_SIZE', 1000):
+                digest, length = email_attachments.decode_payload(part, out)
+            self.assertEqual(out.getvalue(), data)
+            self.assertEqual(length, len(data))
+            self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+
+    def test_save_attachment_dedupe(self):
+        data = os.urandom(1000)
+        first = email_attachments.save_attachment(get_part(data), 'file.bin')
+        self.assertIsNotNone(first)
+
+        # same content creates new attachment using the same media
+        second = email_attachments.save_attachment(get_part(data), 'other.bin')
+        self.assertNotEqual(first, second)
+
+        # same name and length but different content
+        other = email_attachments.save_attachment(get_part(os.urandom(1000)), 'file.bin')
+
+        attachments = {_id: self.app.data.find_one('attachments', req=None, _id=_id) for _id in (first, second, other)}
+        self.assertEqual(attachments[first]['media'], attachments[second]['media'])
+        self.assertNotEqual(attachments[first]['media'], attachments[other]['media'])
+        self.assertEqual(attachments[first]['sha256'], hashlib.sha256(data).hexdigest())
+        self.assertEqual(attachments[first]['length'], 1000)
+        self.assertEqual(attachments[first]['filename'], 'file.bin')
+        self.assertEqual(attachments[second]['filename'], 'other.bin')
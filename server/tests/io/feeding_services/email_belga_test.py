@@ -10,6 +10,8 @@
 
 
 import os
+import imaplib
+from unittest import mock
 
 import superdesk
 from superdesk import get_resource_service
@@ -17,8 +19,10 @@ from superdesk.io.feed_parsers.rfc822 import EMailRFC822FeedParser
 from superdesk.tests import setup
 from superdesk.users.services import UsersService
 
-from belga.io.feeding_services.email_belga import EmailBelgaFeedingService
+from belga.io.feeding_services.email_belga import EmailBelgaFeedingService, get_uid_set
+from belga.io.feeding_services.imap_pool import connection_pool
 from tests import TestCase
+from .imap_server import IMAPServer
 
 
 class EmailBelgaIngestServiceTest(TestCase):
@@ -59,3 +63,114 @@ class EmailBelgaIngestServiceTest(TestCase):
         self.assertEqual(data["filename"], "attachment.txt")
         self.assertEqual(data["mimetype"], "text/plain")
         self.assertEqual(data["length"], 5)
+
+
+class EmailBelgaBatchFetchTest(TestCase):
+    filename = 'email_attachment_belga.txt'
+
+    def setUp(self):
+        super().setUp()
+        dirname = os.path.dirname(os.path.realpath(__file__))
+        with open(os.path.normpath(os.path.join(dirname, '../fixtures', self.filename)), mode='rb') as f:
+            self.message = f.read()
+        self.provider = {
+            'name': 'Test',
+            'feeding_service': EmailBelgaFeedingService.NAME,
+            'feed_parser': EMailRFC822FeedParser.NAME,
+            'config': {'server': 'localhost', 'mailbox': 'INBOX'},
+        }
+        self.app.config['BELGA_EMAIL_FETCH_BATCH_SIZE'] = 2
+
+    def _uid(self, command, *args):
+        if command == 'search':
+            return 'OK', [b'7 1 2 3 5']
+        if command == 'fetch':
+            data = []
+            for uid in args[0].split(','):
+                start, _, end = uid.partition(':')
+                for num in range(int(start), int(end or start) + 1):
+                    if num % 2:
+                        data.append(('{} (UID {} BODY[] {{1}}'.format(num, num).encode(), self.message))
+                        data.append(b')')
+                    else:
+                        # UID after the message
+                        data.append(('{} (BODY[] {{1}}'.format(num).encode(), self.message))
+                        data.append(' UID {})'.format(num).encode())
+            return 'OK', data
+        return 'OK', [None]
+
+    def test_update(self):
+        with mock.patch('belga.io.feeding_services.email_belga.imaplib.IMAP4_SSL') as imap_class:
+            imap = imap_class.return_value
+            imap.select.return_value = ('OK', [b'5'])
+            imap.uid.side_effect = self._uid
+            items = EmailBelgaFeedingService()._update(self.provider, {})
+
+        self.assertEqual(len(items), 5)
+        self.assertEqual(imap.uid.call_args_list, [
+            mock.call('search', None, '(UNSEEN)'),
+            mock.call('fetch', '1:2', '(UID BODY.PEEK[])'),
+            mock.call('fetch', '3,5', '(UID BODY.PEEK[])'),
+            mock.call('fetch', '7', '(UID BODY.PEEK[])'),
+            mock.call('store', '1:3,5,7', '+FLAGS', '\\Seen'),
+        ])
+        imap.fetch.assert_not_called()
+        imap.store.assert_not_called()
+
+    def test_update_limit(self):
+        self.app.config['BELGA_EMAIL_FETCH_LIMIT'] = 3
+        with mock.patch('belga.io.feeding_services.email_belga.imaplib.IMAP4_SSL') as imap_class:
+            imap = imap_class.return_value
+            imap.select.return_value = ('OK', [b'5'])
+            imap.uid.side_effect = self._uid
+            items = EmailBelgaFeedingService()._update(self.provider, {})
+
+        self.assertEqual(len(items), 3)
+        imap.uid.assert_called_with('store', '1:3', '+FLAGS', '\\Seen')
+
+    def test_fetch_missing_uid(self):
+        imap = mock.Mock()
+        imap.uid.return_value = ('OK', [(b'1 (BODY[] {1}', self.message), b')'])
+        with self.assertLogs('belga.io.feeding_services.email_belga', level='WARNING'):
+            self.assertEqual([], EmailBelgaFeedingService()._fetch_messages(imap, [1]))
+
+    def test_get_uid_set(self):
+        self.assertEqual(get_uid_set([8, 1, 2, 3, 5, 7]), '1:3,5,7:8')
+        self.assertEqual(get_uid_set([4]), '4')
+
+
+class EmailBelgaPersistentConnectionTest(TestCase):
+    filename = 'email_attachment_belga.txt'
+
+    def setUp(self):
+        super().setUp()
+        self.server = IMAPServer().start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(connection_pool.close)
+        dirname = os.path.dirname(os.path.realpath(__file__))
+        with open(os.path.normpath(os.path.join(dirname, '../fixtures', self.filename)), mode='rb') as f:
+            self.message = f.read()
+        self.provider = {
+            '_id': 'email-test',
+            'name': 'Test',
+            'feeding_service': EmailBelgaFeedingService.NAME,
+            'feed_parser': EMailRFC822FeedParser.NAME,
+            'config': {
+                'server': '127.0.0.1', 'port': self.server.port, 'user': 'user', 'password': 'password',
+                'mailbox': 'INBOX', 'persistent': True,
+            },
+        }
+
+    def test_update(self):
+        service = EmailBelgaFeedingService()
+        with mock.patch('belga.io.feeding_services.email_belga.imaplib.IMAP4_SSL', imaplib.IMAP4):
+            self.server.mailbox.add(self.message)
+            self.assertEqual(len(service._update(self.provider, {})), 1)
+            self.assertEqual(service._update(self.provider, {}), [])
+            self.server.mailbox.add(self.message)
+            self.server.mailbox.add(self.message)
+            self.assertEqual(len(service._update(self.provider, {})), 2)
+
+        # single login for all updates
+        self.assertEqual(self.server.mailbox.logins, 1)
+        self.assertTrue(all(message['seen'] for message in self.server.mailbox.messages))
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from superdesk.errors import ParserError
+
+from belga.io.feeding_services.file_belga import FileBelgaFeedingService
+from belga.io.parse_pool import parse_files, get_parse_workers, use_processes, THREAD_WORKERS
+from tests import TestCase
+
+
+class FileBelgaFeedingServiceTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        dirname = os.path.dirname(os.path.realpath(__file__))
+        for filename in ('ats.txt', 'dpa.txt'):
+            shutil.copy2(os.path.normpath(os.path.join(dirname, '../fixtures', filename)), self.path)
+        with open(os.path.join(self.path, 'broken.txt'), 'w') as f:
+            f.write('<broken/>')
+        self.provider = {'name': 'test', 'feed_parser': 'belgaiptc7901', 'config': {'path': self.path}}
+
+    def test_parse_files_keeps_order(self):
+        file_paths = [os.path.join(self.path, filename) for filename in ('dpa.txt', 'broken.txt', 'ats.txt')]
+        results = list(parse_files(self.provider, file_paths, workers=2))
+        self.assertEqual([result.file_path for result in results], file_paths)
+        self.assertEqual(results[0].items[0]['original_source'], 'eca')
+        self.assertIsNone(results[1].items)
+        self.assertIsNotNone(results[1].error)
+        self.assertEqual(results[2].items[0]['original_source'], 'bsf')
+
+    def test_update(self):
+        self.app.config['BELGA_INGEST_PARSE_WORKERS'] = 2
+        generator = FileBelgaFeedingService()._update(self.provider, {})
+        items = []
+        with self.assertRaises(ParserError):
+            items.extend(next(generator))
+            while True:
+                items.extend(generator.send(False))
+
+        self.assertEqual(sorted(item['original_source'] for item in items), ['bsf', 'eca'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.path, '_PROCESSED'))), ['ats.txt', 'dpa.txt'])
+        # broken file is moved to error folder at once
+        self.assertEqual(os.listdir(os.path.join(self.path, '_ERROR')), ['broken.txt'])
+        self.assertFalse(os.path.exists(os.path.join(self.path, 'broken.txt')))
+
+    def test_parse_workers_default(self):
+        config = {'BELGA_INGEST_PARSE_WORKERS': None, 'BELGA_INGEST_PARSE_PROCESSES': False}
+        with mock.patch.dict(self.app.config, config):
+            self.assertFalse(use_processes())
+            self.assertEqual(THREAD_WORKERS, get_parse_workers())
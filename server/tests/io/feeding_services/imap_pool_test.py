@@ -0,0 +1,78 @@
+import imaplib
+import threading
+import unittest
+from unittest import mock
+from typing import Tuple
+
+from belga.io.feeding_services.imap_pool import IMAPConnectionPool, wait_for_mail
+from .imap_server import IMAPServer
+
+
+class IMAPPoolTestCase(unittest.TestCase):
+    capabilities: Tuple[str, ...] = ('IMAP4rev1', 'IDLE')
+
+    def setUp(self):
+        self.server = IMAPServer(self.capabilities).start()
+        self.addCleanup(self.server.stop)
+        self.provider = {'_id': 'provider', 'config': {'server': '127.0.0.1', 'port': self.server.port}}
+
+    def connect(self, provider):
+        imap = imaplib.IMAP4('127.0.0.1', self.server.port)
+        imap.login('user', 'password')
+        imap.select('INBOX')
+        return imap
+
+    def test_wait_for_mail(self):
+        pool = IMAPConnectionPool()
+        self.addCleanup(pool.close)
+        with pool.connection(self.provider, self.connect) as imap:
+            self.assertFalse(wait_for_mail(imap, 0.2, noop_interval=0.05))
+            threading.Timer(0.1, self.server.mailbox.add, [b'Subject: test\r\n\r\ntest']).start()
+            self.assertTrue(wait_for_mail(imap, 5, noop_interval=0.05))
+            # connection is still usable
+            self.assertEqual(imap.uid('search', None, '(UNSEEN)'), ('OK', [b'1']))
+
+    def test_connection_reused(self):
+        pool = IMAPConnectionPool()
+        self.addCleanup(pool.close)
+        with pool.connection(self.provider, self.connect) as imap:
+            pass
+        with pool.connection(self.provider, self.connect) as reused:
+            self.assertIs(reused, imap)
+        self.assertEqual(self.server.mailbox.logins, 1)
+
+        # connection is dropped after an error
+        with self.assertRaises(ValueError):
+            with pool.connection(self.provider, self.connect):
+                raise ValueError()
+        with pool.connection(self.provider, self.connect) as new:
+            self.assertIsNot(new, imap)
+        self.assertEqual(self.server.mailbox.logins, 2)
+
+        # config change needs a new connection, old one is logged out
+        self.provider['config']['user'] = 'foo'
+        with pool.connection(self.provider, self.connect) as changed:
+            pass
+        self.assertEqual(self.server.mailbox.logins, 3)
+        self.assertEqual('LOGOUT', new.state)
+
+        # password is not kept in the pool
+        self.provider['config']['password'] = 'secret'
+        with pool.connection(self.provider, self.connect):
+            pass
+        self.assertNotIn('secret', repr(pool._connections))
+        self.assertEqual('LOGOUT', changed.state)
+
+    def test_idle_connections_logged_out(self):
+        pool = IMAPConnectionPool()
+        self.addCleanup(pool.close)
+        with pool.connection(self.provider, self.connect) as imap:
+            pass
+        with mock.patch('belga.io.feeding_services.imap_pool.MAX_IDLE_TIME', -1):
+            with pool.connection({'_id': 'other', 'config': {}}, self.connect):
+                pass
+        self.assertEqual('LOGOUT', imap.state)
+
+
+class IMAPPoolNoopTestCase(IMAPPoolTestCase):
+    capabilities = ('IMAP4rev1',)
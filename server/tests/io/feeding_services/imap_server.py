@@ -0,0 +1,131 @@
+"""Local IMAP server standing in for a real mail server in tests.
+
+It implements only the commands used by email ingest, for a single mailbox.
+"""
+
+import re
+import select
+import threading
+import socketserver
+
+
+class Mailbox:
+    def __init__(self):
+        self.messages = []
+        self.changed = threading.Condition()
+        self.logins = 0
+
+    def add(self, data):
+        with self.changed:
+            self.messages.append({'uid': len(self.messages) + 1, 'data': data, 'seen': False})
+            self.changed.notify_all()
+
+
+class IMAPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        mailbox = self.server.mailbox
+        self.known = 0
+        self.send('* OK IMAP4rev1 stand-in ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, command, args = (line.decode().rstrip('\r\n').split(' ', 2) + [''])[:3]
+            command = command.upper()
+            if command == 'CAPABILITY':
+                self.send('* CAPABILITY ' + ' '.join(self.server.capabilities))
+            elif command == 'LOGIN':
+                mailbox.logins += 1
+            elif command == 'SELECT':
+                self.known = len(mailbox.messages)
+                self.send('* {} EXISTS'.format(self.known))
+                self.send('* 0 RECENT')
+                self.send('{} OK [READ-WRITE] SELECT completed'.format(tag))
+                continue
+            elif command == 'NOOP':
+                self.send_exists()
+            elif command == 'UID':
+                self.handle_uid(args)
+            elif command == 'IDLE':
+                self.handle_idle(tag)
+                continue
+            elif command == 'LOGOUT':
+                self.send('* BYE')
+                self.send('{} OK LOGOUT completed'.format(tag))
+                return
+            elif command != 'CLOSE':
+                self.send('{} BAD unknown command'.format(tag))
+                continue
+            self.send('{} OK {} completed'.format(tag, command))
+
+    def handle_uid(self, args):
+        command, args = (args.split(' ', 1) + [''])[:2]
+        command = command.upper()
+        messages = self.server.mailbox.messages
+        if command == 'SEARCH':
+            uids = [str(message['uid']) for message in messages if 'UNSEEN' not in args.upper() or not message['seen']]
+            self.send('* SEARCH ' + ' '.join(uids))
+            return
+
+        uid_set, args = args.split(' ', 1)
+        uids = set()
+        for part in uid_set.split(','):
+            start, _, end = part.partition(':')
+            uids.update(range(int(start), int(end or start) + 1))
+        for num, message in enumerate(messages, 1):
+            if message['uid'] not in uids:
+                continue
+            if command == 'FETCH':
+                self.wfile.write('* {} FETCH (BODY[] {{{}}}\r\n'.format(num, len(message['data'])).encode() +
+                                 message['data'] + ' UID {})\r\n'.format(message['uid']).encode())
+            elif command == 'STORE' and re.search(r'\\Seen', args, re.I):
+                message['seen'] = True
+                self.send('* {} FETCH (UID {} FLAGS (\\Seen))'.format(num, message['uid']))
+
+    def handle_idle(self, tag):
+        mailbox = self.server.mailbox
+        if self.server.reject_idle:
+            self.send('{} NO IDLE not allowed'.format(tag))
+            return
+        self.send('+ idling')
+        while True:
+            if self.known != len(mailbox.messages):
+                self.send_exists()
+            readable, _, _ = select.select([self.connection], [], [], 0.05)
+            if readable:
+                self.rfile.readline()  # DONE
+                self.send('{} OK IDLE terminated'.format(tag))
+                return
+
+    def send_exists(self):
+        count = len(self.server.mailbox.messages)
+        if count != self.known:
+            self.known = count
+            self.send('* {} EXISTS'.format(count))
+
+    def send(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+
+class IMAPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, capabilities=('IMAP4rev1', 'IDLE'), reject_idle=False):
+        super().__init__(('127.0.0.1', 0), IMAPHandler)
+        self.capabilities = capabilities
+        self.reject_idle = reject_idle
+        self.mailbox = Mailbox()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -1,7 +1,26 @@
 import time
 
+from httmock import all_requests, HTTMock
+
+from belga.io.feeding_services.rss_belga import STATE_KEY
 from tests import TestCase
 
+feed = '''<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>ANP</title>
+  <id>http://example.com/feed</id>
+  <updated>2019-01-27T07:15:16+01:00</updated>
+  {}
+</feed>'''
+
+entry = '''<entry>
+    <title>{id}</title>
+    <id>http://example.com/{id}</id>
+    <link href="http://example.com/{id}" />
+    <updated>{updated}</updated>
+    <content type="html">Body {id}</content>
+  </entry>'''
+
 
 dataset = {
     'title': "'Duizenden banen weg bij Britse super Tesco'",
@@ -128,3 +147,56 @@ class RSSBelgaTestCase(RssBelgaIngestServiceTest):
         self.assertEqual(item["word_count"], "197")
         self.assertEqual(item["authors"], [
             {'uri': None, 'parent': None, 'name': 'Marijn Wellink (wki)', 'role': None, 'jobtitle': None}])
+
+
+class RSSBelgaUpdateTestCase(RssBelgaIngestServiceTest):
+    """Tests for the _update() method."""
+
+    def setUp(self):
+        super().setUp()
+        self.entries = [
+            entry.format(id='foo', updated='2019-01-27T07:15:16+01:00'),
+            entry.format(id='bar', updated='2019-01-27T07:15:16+01:00'),
+        ]
+        self.requests = []
+        self.provider = {'name': 'anp', 'config': {'url': 'http://example.com/feed'}}
+        self.instance.provider = self.provider
+
+    def update(self):
+        @all_requests
+        def feed_mock(url, request):
+            self.requests.append(request)
+            if request.headers.get('If-None-Match') == '"{}"'.format(len(self.entries)):
+                return {'status_code': 304}
+            return {
+                'status_code': 200,
+                'headers': {'ETag': '"{}"'.format(len(self.entries))},
+                'content': feed.format(''.join(self.entries)).encode('utf-8'),
+            }
+
+        update = {}
+        with HTTMock(feed_mock):
+            items = self.instance._update(self.provider, update)[0]
+        self.provider.update(update)
+        return items
+
+    def test_skip_ingested_entries(self):
+        self.assertEqual(['foo', 'bar'], [item['headline'] for item in self.update()])
+        self.assertEqual(
+            ['http://example.com/bar', 'http://example.com/foo'],
+            self.provider['private'][STATE_KEY]['ids'],
+        )
+
+        # entry with the same updated time is not lost
+        self.entries.append(entry.format(id='baz', updated='2019-01-27T07:15:16+01:00'))
+        self.entries.append(entry.format(id='old', updated='2019-01-27T07:15:00+01:00'))
+        self.assertEqual(['baz'], [item['headline'] for item in self.update()])
+
+        self.entries.append(entry.format(id='new', updated='2019-01-27T07:16:00+01:00'))
+        self.assertEqual(['new'], [item['headline'] for item in self.update()])
+        self.assertEqual(['http://example.com/new'], self.provider['private'][STATE_KEY]['ids'])
+
+    def test_not_modified(self):
+        self.assertEqual(2, len(self.update()))
+        self.assertEqual([], self.update())
+        self.assertEqual('"2"', self.requests[-1].headers['If-None-Match'])
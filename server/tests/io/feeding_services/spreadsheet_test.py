@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+import superdesk
+
+from belga.io.feed_parsers.belga_spreadsheet import BelgaSpreadsheetParser
+from belga.io.feeding_services.spreadsheet import SpreadsheetFeedingService, FINGERPRINTS_KEY
+from tests import TestCase
+
+
+def get_item(guid, status='', **kwargs):
+    item = {
+        'guid': guid,
+        'type': 'event',
+        'name': 'Event {}'.format(guid),
+        'status': status,
+        'location': [{
+            'name': 'Name',
+            'address': {'line': ['Address'], 'locality': 'City', 'area': 'State', 'country': 'Country'},
+        }],
+        'contact': {
+            'honorific': 'Honorific',
+            'first_name': 'First name',
+            'last_name': 'Last name',
+            'organisation': 'Organisation',
+            'contact_email': ['email@mail.com'],
+            'contact_address': ['Point of Contact'],
+            'contact_phone': [{'number': 'Phone', 'public': False, 'usage': 'Business'}],
+        },
+    }
+    item.update(kwargs)
+    return item
+
+
+def get_data():
+    titles = BelgaSpreadsheetParser.titles + BelgaSpreadsheetParser.generate_fields
+    row = [''] * len(titles)
+    for title, value in (
+        ('Start date', '2019-06-20'), ('Start time', '7:00'), ('End date', '2019-06-20'), ('End time', '15:00'),
+        ('All day', 'FALSE'), ('Timezone', 'Europe/Brussels'), ('Event name', 'Event'), ('Calendars', 'Culture'),
+    ):
+        row[titles.index(title)] = value
+    return [titles, [], row, list(row)]
+
+
+class SpreadsheetFeedingServiceTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = SpreadsheetFeedingService()
+        self.provider = {'name': 'test'}
+
+    def test_new_items(self):
+        items = self.service._process_event_items([get_item('foo'), get_item('bar')], self.provider)
+        self.assertEqual(['foo', 'bar'], [item['guid'] for item in items])
+
+        # new contact is created for every new row
+        contacts = list(superdesk.get_resource_service('contacts').find({}))
+        self.assertEqual(2, len(contacts))
+        self.assertEqual(
+            [[contact['_id']] for contact in contacts],
+            [item['event_contact_info'] for item in items],
+        )
+
+        # but the same location is created only once
+        locations = list(superdesk.get_resource_service('locations').find({}))
+        self.assertEqual(1, len(locations))
+        for item in items:
+            self.assertEqual(locations[0]['guid'], item['location'][0]['qcode'])
+        self.assertIn('firstcreated', items[0])
+
+    def test_updated_items(self):
+        self.service._process_event_items([get_item('foo')], self.provider)
+        superdesk.get_resource_service('events').post([{
+            'guid': 'foo',
+            'name': 'Event foo',
+            'dates': {'start': datetime.now(), 'end': datetime.now() + timedelta(hours=1), 'tz': 'UTC'},
+        }])
+        contact_id = superdesk.get_resource_service('contacts').find_one(req=None)['_id']
+
+        updated = get_item('foo', status='UPDATED', name='Updated')
+        updated['contact']['honorific'] = 'Dr.'
+        with mock.patch.object(superdesk.get_resource_service('locations'), 'patch') as patch_location:
+            items = self.service._process_event_items([
+                updated,
+                get_item('bar', status='UPDATED', contact=None, location=None),  # not existing event
+            ], self.provider)
+        patch_location.assert_not_called()
+
+        self.assertEqual(1, len(items))
+        self.assertEqual('Updated', items[0]['name'])
+        self.assertIn('_id', items[0])
+        self.assertEqual([contact_id], items[0]['event_contact_info'])
+        contact = superdesk.get_resource_service('contacts').find_one(req=None, _id=contact_id)
+        self.assertEqual('Dr.', contact['honorific'])
+
+    def test_no_items(self):
+        self.assertEqual([], self.service._process_event_items([], self.provider))
+
+    def test_update_changed_rows(self):
+        data = get_data()
+        worksheet = mock.Mock(col_count=len(data[0]))
+        worksheet.get_all_values.side_effect = lambda: [list(values) for values in data]
+
+        def update_cells(cells):
+            for cell in cells:
+                data[cell.row - 1][cell.col - 1] = cell.value
+        worksheet.update_cells.side_effect = update_cells
+
+        with mock.patch.object(self.service, '_get_worksheet', return_value=worksheet):
+            update = {}
+            items = list(self.service._update(self.provider, update))[0]
+            self.assertEqual(2, len(items))
+            self.assertEqual('DONE', data[2][data[0].index('_STATUS')])
+            self.assertEqual(2, len(update['private'][FINGERPRINTS_KEY]))
+
+            # nothing changed since last update
+            self.provider['private'] = update['private']
+            with mock.patch.object(BelgaSpreadsheetParser, 'parse') as parse:
+                items = list(self.service._update(self.provider, {}))
+            parse.assert_not_called()
+            self.assertEqual([[]], items)
+
+            # only changed row is parsed
+            data[3][data[0].index('Event name')] = 'Changed'
+            data[3][data[0].index('_STATUS')] = ''
+            data[3][data[0].index('_GUID')] = ''
+            worksheet.update_cells.reset_mock()
+            update = {}
+            items = list(self.service._update(self.provider, update))
+            self.assertEqual(['Changed'], [item['name'] for item in items[0]])
+            cells = worksheet.update_cells.call_args[0][0]
+            self.assertEqual({4}, {cell.row for cell in cells})
@@ -1,9 +1,10 @@
+import copy
 import datetime
 import json
 
 from httmock import HTTMock, urlmatch
 
-from belga.io.feeding_services.twitter_belga import TwitterBelgaFeedingService
+from belga.io.feeding_services.twitter_belga import TwitterBelgaFeedingService, embed_cache
 from tests import TestCase
 
 
@@ -39,6 +40,7 @@ def iframely_mock(url, request):
 class TwitterBelgaServiceTestCase(TestCase):
 
     def setUp(self):
+        embed_cache.clear()
         provider = {
             "config": {
                 "iframely_key": "abcdef",
@@ -71,3 +73,61 @@ class TwitterBelgaServiceTestCase(TestCase):
                 '>'
             )
         self.assertEqual(item["body_html"], expected_body)
+
+
+class TwitterBelgaEmbedCacheTestCase(TestCase):
+
+    def setUp(self):
+        embed_cache.clear()
+        self.addCleanup(embed_cache.clear)
+        self.provider = {'config': {'iframely_key': 'abcdef', 'embed_tweet': True}}
+        self.requests = []
+
+    def get_items(self, count):
+        tweets = []
+        for i in range(count):
+            item = copy.deepcopy(items[0])
+            item['guid'] = '{}:{}'.format(item['guid'], i)
+            tweets.append(item)
+        return tweets
+
+    def test_embed_cached(self):
+        @urlmatch(scheme='https', netloc='iframe.ly', path='/api/oembed')
+        def mock(url, request):
+            self.requests.append(url)
+            return json.dumps({'html': '<div>embed</div>'})
+
+        with HTTMock(mock):
+            parsed = TwitterBelgaFeedingService().parse_twitter_belga(self.get_items(3), self.provider)[0]
+            TwitterBelgaFeedingService().parse_twitter_belga(self.get_items(1), self.provider)
+
+        self.assertEqual(len(self.requests), 1)
+        for item in parsed:
+            self.assertTrue(item['body_html'].endswith(
+                '<!-- EMBED START Twitter --><div>embed</div><!-- EMBED END Twitter -->'))
+
+    def test_url_error_cached(self):
+        @urlmatch(scheme='https', netloc='iframe.ly', path='/api/oembed')
+        def mock(url, request):
+            self.requests.append(url)
+            return {'status_code': 417, 'content': json.dumps({'error': 'url error'})}
+
+        with HTTMock(mock):
+            parsed = TwitterBelgaFeedingService().parse_twitter_belga(self.get_items(2), self.provider)[0]
+            TwitterBelgaFeedingService().parse_twitter_belga(self.get_items(2), self.provider)
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertNotIn('EMBED', parsed[0]['body_html'])
+
+    def test_server_error_not_cached(self):
+        @urlmatch(scheme='https', netloc='iframe.ly', path='/api/oembed')
+        def mock(url, request):
+            self.requests.append(url)
+            return {'status_code': 503, 'content': 'unavailable'}
+
+        with HTTMock(mock):
+            parsed = TwitterBelgaFeedingService().parse_twitter_belga(self.get_items(2), self.provider)[0]
+            TwitterBelgaFeedingService().parse_twitter_belga(self.get_items(2), self.provider)
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertNotIn('EMBED', parsed[0]['body_html'])
@@ -0,0 +1,37 @@
+from superdesk import get_resource_service
+
+from belga.lookup_cache import lookup_cache, get_profile_id, get_vocabulary_item, CONTENT_TYPES
+from tests import TestCase
+
+
+class LookupCacheTestCase(TestCase):
+    def test_profile_id(self):
+        ids = self.app.data.insert('content_types', [{'label': 'TEXT'}])
+        self.assertEqual(ids[0], get_profile_id('TEXT'))
+        self.assertIsNone(get_profile_id('BRIEF'))
+
+        # cached until the resource is changed
+        self.app.data.remove('content_types', {})
+        self.assertEqual(ids[0], get_profile_id('TEXT'))
+        self.app.on_deleted_item_content_types({'_id': ids[0]})
+        self.assertIsNone(get_profile_id('TEXT'))
+
+    def test_ttl(self):
+        calls = []
+        self.assertEqual(1, lookup_cache.get(CONTENT_TYPES, 'foo', lambda: calls.append(1) or 1))
+        self.assertEqual(1, lookup_cache.get(CONTENT_TYPES, 'foo', lambda: calls.append(1) or 1))
+        self.assertEqual(1, len(calls))
+        self.assertEqual(1, lookup_cache.get(CONTENT_TYPES, 'foo', lambda: calls.append(1) or 1, ttl=0))
+        self.assertEqual(2, len(calls))
+
+    def test_vocabulary_item(self):
+        brief = get_vocabulary_item('belga-keywords', 'BRIEF')
+        self.assertEqual('BRIEF', brief['qcode'])
+        brief['name'] = 'changed'
+        self.assertNotEqual('changed', get_vocabulary_item('belga-keywords', 'BRIEF')['name'])
+        self.assertIsNone(get_vocabulary_item('belga-keywords', 'foo'))
+
+        vocabulary = get_resource_service('vocabularies').find_one(req=None, _id='belga-keywords')
+        self.app.on_updated_vocabularies({'items': []}, vocabulary)
+        self.app.data.update('vocabularies', 'belga-keywords', {'items': []}, vocabulary)
+        self.assertIsNone(get_vocabulary_item('belga-keywords', 'BRIEF'))
@@ -0,0 +1,52 @@
+from belga.macro_profiler import MacroProfiler, run_macros, get_benchmark_config
+from tests import TestCase
+
+PREFIX_MACRO = 'Add prefix BELG to headline macro'
+TIPS_MACRO = 'TIPS ingest macro'
+
+
+class MacroProfilerTestCase(TestCase):
+    def test_run_macros(self):
+        items = [{'guid': 'foo', 'headline': 'Foo'}, {'guid': 'bar', 'headline': 'Bar'}]
+        profiler, processed, seconds = run_macros(items, [PREFIX_MACRO, TIPS_MACRO], repeat=2)
+        self.assertEqual(4, processed)
+        self.assertGreater(seconds, 0)
+        self.assertEqual(4, profiler.stats[PREFIX_MACRO].calls)
+        self.assertEqual(0, profiler.stats[PREFIX_MACRO].errors)
+        self.assertEqual({}, dict(profiler.stats[PREFIX_MACRO].db_calls))
+        # tips macro is looking for the content profile
+        self.assertEqual({'content_types': 4}, dict(profiler.stats[TIPS_MACRO].db_calls))
+        self.assertEqual(1, profiler.stats[TIPS_MACRO].db_calls_per_call)
+        # sample items are not modified
+        self.assertEqual('Foo', items[0]['headline'])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            run_macros([], ['unknown macro'])
+
+        profiler = MacroProfiler()
+        with self.assertRaises(TypeError):
+            profiler.run(TIPS_MACRO, None)
+        self.assertEqual(1, profiler.stats[TIPS_MACRO].errors)
+        self.assertEqual(1, profiler.stats[TIPS_MACRO].calls)
+
+        # failed item is counted, chain is stopped for it
+        _profiler, processed, _seconds = run_macros([None], [TIPS_MACRO])
+        self.assertEqual(1, processed)
+
+    def test_get_benchmark_config(self):
+        config = {
+            'MONGO_DBNAME': 'superdesk',
+            'MONGO_URI': 'mongodb://db:27017/superdesk?replicaSet=rs0',
+            'ARCHIVED_DBNAME': 'superdesk_archived',
+            'ARCHIVED_URI': 'mongodb://db',
+            'ELASTICSEARCH_INDEX': 'superdesk',
+            'ELASTICSEARCH_INDEXES': {'archive': 'superdesk_archive'},
+        }
+        overrides = get_benchmark_config(config, 'benchmark_x')
+        self.assertEqual('superdesk_benchmark_x', overrides['MONGO_DBNAME'])
+        self.assertEqual('mongodb://db:27017/superdesk_benchmark_x?replicaSet=rs0', overrides['MONGO_URI'])
+        self.assertEqual('mongodb://db/superdesk_archived_benchmark_x', overrides['ARCHIVED_URI'])
+        self.assertEqual('superdesk_benchmark_x', overrides['ELASTICSEARCH_INDEX'])
+        self.assertEqual({'archive': 'superdesk_archive_benchmark_x'}, overrides['ELASTICSEARCH_INDEXES'])
+        self.assertNotIn('LEGAL_ARCHIVE_DBNAME', overrides)
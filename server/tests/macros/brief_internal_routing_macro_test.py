@@ -6,6 +6,7 @@ from superdesk.utc import utcnow, utc_to_local, utc
 from superdesk.errors import StopDuplication
 from superdesk.metadata.item import CONTENT_STATE
 from apps.archive.common import SCHEDULE_SETTINGS
+from belga.lookup_cache import lookup_cache
 from belga.macros import brief_internal_routing as macro
 from belga.macros.brief_internal_routing import _get_product_subject, PRODUCTS
 
@@ -65,6 +66,7 @@ class MacroMetadataTestCase(unittest.TestCase):
 class BriefInternalRoutingMacroTestCase(tests.TestCase):
 
     def setUp(self):
+        lookup_cache.clear()
         self.profiles = self.app.data.insert(
             "content_types",
             [
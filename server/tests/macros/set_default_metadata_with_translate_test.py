@@ -1,13 +1,19 @@
+from unittest import mock
+
 from bson import ObjectId
 from superdesk import get_resource_service
 from superdesk.tests import TestCase
 from superdesk.errors import StopDuplication
+from belga.lookup_cache import lookup_cache
 from belga.macros.set_default_metadata_with_translate import (
     set_default_metadata_with_translate,
 )
 
 
 class SetDefaultMetadataWithTranslateTestCase(TestCase):
+    def setUp(self):
+        lookup_cache.clear()
+
     def test_no_destination_data(self):
         item = {
             "headline": "test headline",
@@ -266,19 +272,31 @@ class SetDefaultMetadataWithTranslateTestCase(TestCase):
             "language": "fr",
         }
         self.app.data.insert("archive", [item])
-        self.assertRaises(
-            StopDuplication,
-            set_default_metadata_with_translate,
-            item,
-            dest_desk_id=ObjectId("5d385f17fe985ec5e1a78b49"),
-            dest_stage_id=ObjectId("5d385f31fe985ec67a0ca583"),
-        )
         archive_service = get_resource_service("archive")
+        move_service = get_resource_service("move")
+        with mock.patch.object(archive_service, "put") as put, mock.patch.object(
+            move_service, "move_content"
+        ) as move_content:
+            self.assertRaises(
+                StopDuplication,
+                set_default_metadata_with_translate,
+                item,
+                dest_desk_id=ObjectId("5d385f17fe985ec5e1a78b49"),
+                dest_stage_id=ObjectId("5d385f31fe985ec67a0ca583"),
+            )
+        # new item is created with final metadata in destination
+        put.assert_not_called()
+        move_content.assert_not_called()
         new_item = archive_service.find_one(
             req=None,
             original_id="urn:newsml:localhost:5000:2019-12-10T14:43:46.224107:d13ac5ae-7f43-4b7f-89a5-2c6835389564",
         )
         self.assertEqual(new_item["translated_from"], item["guid"])
+        self.assertEqual(new_item["language"], "en")
+        self.assertEqual(new_item["task"]["desk"], ObjectId("5d385f17fe985ec5e1a78b49"))
+        self.assertEqual(new_item["task"]["stage"], ObjectId("5d385f31fe985ec67a0ca583"))
+        self.assertIn("INT/GENERAL", [subject["qcode"] for subject in new_item["subject"]])
+        self.assertEqual(new_item["keywords"], ["foo", "bar"])
 
     def test_keywords_not_to_overwrite(self):
         self.app.data.insert(
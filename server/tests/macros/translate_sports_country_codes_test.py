@@ -1,4 +1,8 @@
+import copy
 import unittest
+
+from superdesk.editor_utils import replace_text
+
 from belga.macros import translate_sports_country_codes as macro
 
 
@@ -53,3 +57,22 @@ class TranslateSportsCountryCodesTestCase(unittest.TestCase):
             '<p>29. Thomas Tumler (Zwi) 2:00.44 ( 59.67 + 1:00.77)</p>',
             item['body_html'],
         )
+
+    def test_same_as_replacing_one_by_one(self):
+        codes = [code for countries in macro.COUNTRIES.values() for code in countries]
+        body = ''.join(
+            '<p>{} (<b>{}</b>) ({}/1) ({})</p>'.format(i, code, code, code.lower())
+            for i, code in enumerate(codes)
+        )
+        for language in macro.COUNTRIES:
+            item = {'language': language, 'body_html': body}
+            expected = copy.deepcopy(item)
+            translated = macro.COUNTRIES[language]
+            for lang, countries in macro.COUNTRIES.items():
+                if lang == language:
+                    continue
+                for i, country in enumerate(countries):
+                    for tpl in ('({})', '({}/'):
+                        replace_text(expected, 'body_html', tpl.format(country), tpl.format(translated[i]))
+            macro.callback(item)
+            self.assertEqual(expected['body_html'], item['body_html'])
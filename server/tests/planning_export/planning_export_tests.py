@@ -1,8 +1,16 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 import datetime
 from flask import render_template
 from app import get_app
 from bson import ObjectId
+from superdesk import get_resource_service
+
+from belga.planning_exports.common import preload_data, format_datetime
+from belga.planning_exports.dates import format_local_date, get_local_datetime
+from belga.planning_exports.format_news_events_tommorow import (
+    format_event_for_tommorow,
+)
+from belga.planning_exports.format_news_events_week import format_event_for_week
 
 
 class PlanningExportTests(TestCase):
@@ -779,3 +787,82 @@ class PlanningExportTests(TestCase):
                 "<p>Oud Gerechtshof, Havermarkt 10, 3500 Hasselt, Belgium<br></p>",
                 dutch_data,
             )
+
+    def test_preload_data(self):
+        with self.app.app_context():
+            with mock.patch(
+                "belga.planning_exports.common.get_resource_service",
+                wraps=get_resource_service,
+            ) as get_service:
+                preloaded = preload_data(self.events_for_tommorow)
+                list(format_event_for_tommorow(self.events_for_tommorow, "fr"))
+
+            self.assertEqual(
+                ["contacts", "planning", "locations", "contacts", "planning", "locations"],
+                [call[0][0] for call in get_service.call_args_list],
+            )
+            self.assertEqual(
+                {"5ab491271d41c88e98ad9336", "6618415a1704a42950a4eb62"},
+                set(preloaded["contacts"]),
+            )
+            self.assertEqual({"6618415a1704a42950a4eb64"}, set(preloaded["planning"]))
+            self.assertIn("460fa29d-abc7-45f6-888f-b123ba044567", preloaded["locations"])
+
+    def test_export_week_memo(self):
+        events = [
+            dict(event, _id="event%d" % i, _etag="etag")
+            for i, event in enumerate(self.events_for_week)
+        ]
+        with self.app.app_context():
+            with mock.patch(
+                "belga.planning_exports.format_news_events_week.format_datetime",
+                wraps=format_datetime,
+            ) as format_date:
+                french_data = format_event_for_week(events, "fr")
+                self.assertIs(french_data, format_event_for_week(events, "fr"))
+                self.assertEqual(3, format_date.call_count)
+
+                format_event_for_week(events, "nl")
+                self.assertEqual(6, format_date.call_count)
+
+                events[0] = dict(events[0], _etag="updated")
+                format_event_for_week(events, "fr")
+                self.assertEqual(9, format_date.call_count)
+
+            days = list(french_data["events_list"])
+            self.assertEqual(
+                "NExxxxt Sunday 21.04.2024 FR",
+                days[0]["subjects"]["REDWOLVES"][0]["title"],
+            )
+
+        # events are not modified by translations
+        self.assertEqual("NExxxxt Sunday 21.04.2024", self.events_for_week[2]["name"])
+
+    def test_export_week_recurring_dates(self):
+        start = datetime.datetime(2024, 4, 22, 8, 0, tzinfo=datetime.timezone.utc)
+        events = [
+            {
+                "name": "Recurring {}".format(i),
+                "dates": {
+                    "start": start + datetime.timedelta(days=i // 10),
+                    "end": start + datetime.timedelta(days=i // 10, hours=1),
+                    "tz": "Europe/Brussels",
+                },
+            }
+            for i in range(30)
+        ]
+        format_local_date.cache_clear()
+        with self.app.app_context():
+            days = list(format_event_for_week(events, "fr")["events_list"])
+        self.assertEqual(
+            ["lundi 22 avril", "mardi 23 avril", "mercredi 24 avril"],
+            [day["date"] for day in days],
+        )
+        self.assertEqual("10u00", days[0]["subjects"][""][0]["local_time"])
+        # headers, range and month are formatted once per distinct local date
+        self.assertEqual(6, format_local_date.cache_info().misses)
+
+    def test_missing_dates(self):
+        self.assertIsNone(get_local_datetime("Europe/Brussels", None))
+        with self.app.app_context():
+            self.assertEqual("", format_datetime({"dates": {"tz": "Europe/Brussels"}}, "fr", "EEEE d MMMM"))
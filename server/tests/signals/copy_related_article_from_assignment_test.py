@@ -1,5 +1,8 @@
+import time
+import flask
 from unittest import mock
 from copy import deepcopy
+from concurrent.futures import Future
 from bson import ObjectId
 
 from superdesk import get_resource_service
@@ -14,9 +17,12 @@ from belga.signals.copy_related_article_from_assignment import (
     _get_related_content_field_to_use,
     _get_related_items_from_planning,
     _get_event_related_item_from_search_proxy,
+    _add_late_related_items,
+    _fetch_related_items,
     on_assignment_start_working,
 )
 from belga.search_providers import Belga360ArchiveSearchProvider
+from belga.lookup_cache import lookup_cache
 
 
 def mock_raise_exception(*args, **kwargs):
@@ -117,6 +123,10 @@ def mock_search_provider_fetch(guid: str):
 
 
 class CopyRelatedArticleFromAssignmentTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        lookup_cache.clear()
+
     def test_get_associated_event_from_planning(self):
         self.assertIsNone(_get_associated_event_from_planning({}))
         self.assertIsNone(_get_associated_event_from_planning({"event_item": "non_existing_id"}))
@@ -160,6 +170,25 @@ class CopyRelatedArticleFromAssignmentTestCase(TestCase):
             }}),
         )
 
+    def test_get_related_content_field_cached(self):
+        profile = {"_id": "profile", "schema": {"belga_related_articles": {"type": "related_content"}}}
+        self.assertEqual("belga_related_articles", _get_related_content_field_to_use(profile))
+
+        profile["schema"] = {"other_articles": {"type": "related_content"}}
+        self.assertEqual("belga_related_articles", _get_related_content_field_to_use(profile))
+
+        lookup_cache.clear("content_types")
+        self.assertEqual("other_articles", _get_related_content_field_to_use(profile))
+
+    def test_get_related_items_from_planning_projection(self):
+        test_events = deepcopy(TEST_EVENTS)
+        self.app.data.insert("events", test_events)
+        events_service = get_resource_service("events")
+        with mock.patch.object(events_service, "find_one", wraps=events_service.find_one) as find_one:
+            related_items = _get_related_items_from_planning({"event_item": test_events[1]["_id"]}, "en")
+        self.assertEqual([test_events[1]["related_items"][0]], related_items)
+        self.assertEqual('{"related_items": 1}', find_one.call_args[1]["req"].projection)
+
     def test_get_related_items_from_planning(self):
         test_events = deepcopy(TEST_EVENTS)
         self.app.data.insert("events", test_events)
@@ -273,3 +302,75 @@ class CopyRelatedArticleFromAssignmentTestCase(TestCase):
         kwargs["item"] = item = {"language": "fr"}
         on_assignment_start_working(None, **kwargs)
         self.assertIsNone(item.get("associations"))
+
+    def test_fetch_related_items_user(self):
+        user = {"_id": ObjectId(), "username": "foo"}
+        role = {"_id": ObjectId()}
+        with self.app.test_request_context():
+            flask.g.user = user
+            flask.g.role = role
+            with mock.patch(
+                "belga.signals.copy_related_article_from_assignment._get_event_related_item_from_search_proxy",
+                side_effect=lambda related_item: (flask.g.get("user"), flask.g.get("role")),
+            ):
+                futures = _fetch_related_items([{"guid": "item-en-1"}])
+            self.assertEqual((user, role), futures[0].result())
+
+    def test_on_assignment_start_working_deadline(self):
+        test_events = deepcopy(TEST_EVENTS)
+        self.app.data.insert("events", test_events)
+        self.app.data.insert("search_providers", [{
+            "_id": SEARCH_PROVIDER_ID,
+            "search_provider": "belga_360archive",
+            "source": "sofab",
+            "config": {},
+            "name": "Test Search Provider",
+        }])
+
+        def slow_fetch(guid):
+            if guid == "item-en-1":
+                time.sleep(0.5)
+            return mock_search_provider_fetch(guid)
+
+        item = {}
+        with mock.patch.dict(self.app.config, {"BELGA_RELATED_ITEMS_TIMEOUT": 0.1}), \
+                mock.patch.object(Belga360ArchiveSearchProvider, "fetch", side_effect=slow_fetch), \
+                mock.patch("belga.signals.copy_related_article_from_assignment._add_late_related_items") as add_late:
+            on_assignment_start_working(
+                None,
+                assignment={},
+                planning={"event_item": test_events[1]["_id"]},
+                item=item,
+                content_profile={"schema": {"belga_related_articles": {"type": "related_content"}}},
+            )
+            self.assertEqual(["belga_related_articles--1"], list(item["associations"]))
+            self.assertEqual("item-de-1", item["associations"]["belga_related_articles--1"]["guid"])
+
+            for _ in range(50):
+                if add_late.called:
+                    break
+                time.sleep(0.1)
+            _app, _item, field, futures = add_late.call_args[0]
+            self.assertIs(item, _item)
+            self.assertEqual("belga_related_articles", field)
+            self.assertEqual(1, len(futures))
+            self.assertEqual("item-en-1", futures[0].result()["guid"])
+
+    def test_add_late_related_items(self):
+        self.app.data.insert("archive", [{
+            "_id": "content",
+            "guid": "content",
+            "type": "text",
+            "_etag": "etag",
+            "associations": {"belga_related_articles--1": {"guid": "item-de-1", "order": 1}},
+        }])
+        future = Future()
+        future.set_result(deepcopy(TEST_EXTERNAL_ITEMS[0]))
+        _add_late_related_items(self.app, {"_id": "content"}, "belga_related_articles", [future])
+
+        updated = get_resource_service("archive").find_one(req=None, _id="content")
+        self.assertNotEqual("etag", updated["_etag"])
+        associations = updated["associations"]
+        self.assertEqual("item-de-1", associations["belga_related_articles--1"]["guid"])
+        self.assertEqual("item-en-1", associations["belga_related_articles--2"]["guid"])
+        self.assertEqual(2, associations["belga_related_articles--2"]["order"])
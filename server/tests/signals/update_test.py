@@ -1,11 +1,13 @@
 
 from superdesk.tests import TestCase
+from belga.lookup_cache import lookup_cache
 from belga.signals.update import handle_update, ALERT, TEXT, handle_coming_up_field
 
 
 class UpdateAlertTestCase(TestCase):
 
     def setUp(self):
+        lookup_cache.clear()
         self.profiles = self.app.data.insert('content_types', [
             {'label': 'Foo'},
             {'label': ALERT},